@@ -0,0 +1,44 @@
+import argparse
+import gc
+import time
+import tracemalloc
+
+from fisdat.compact    import compact
+from fisdat.data_model import ManifestDesc
+
+from bench_turtle import synthetic_manifest
+
+'''
+Compare the memory taken by a manifest of the generated classes and by
+its compact form, and the time taken to convert the compact form back,
+against making the generated classes from scratch. For example,
+
+    python benchmarks/bench_compact.py --tables 1000 10000
+'''
+
+def measure (make):
+    gc.collect ()
+    tracemalloc.start ()
+    start  = time.perf_counter ()
+    obj    = make ()
+    took   = time.perf_counter () - start
+    (size, _) = tracemalloc.get_traced_memory ()
+    tracemalloc.stop ()
+    return (obj, size, took)
+
+def bench (n : int) -> None:
+    (manifest, size_desc, time_desc) = measure (lambda : synthetic_manifest (n))
+    # The compact form shares its strings with the manifest it is made
+    # from, so count them by making the manifest anew within `measure'
+    (small, size_compact, _)         = measure (lambda : compact (synthetic_manifest (n)))
+    (_, _, time_trusted)             = measure (lambda : small.to_desc ())
+    print (f"{n:>8} tables: generated {size_desc / 2**20:7.2f}MiB, compact {size_compact / 2**20:7.2f}MiB "
+           f"({size_desc / size_compact:4.1f}x smaller); "
+           f"constructing {time_desc:7.3f}s, from compact {time_trusted:7.3f}s ({time_desc / time_trusted:4.1f}x faster)")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser ("bench_compact")
+    parser.add_argument ("--tables", help = "Numbers of tables to benchmark with", type = int, nargs = "+", default = [1000, 10000])
+    args = parser.parse_args ()
+    for n in args.tables:
+        bench (n)
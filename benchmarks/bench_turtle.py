@@ -0,0 +1,85 @@
+from linkml_runtime.dumpers          import RDFLibDumper
+from linkml_runtime.loaders          import RDFLibLoader
+from linkml_runtime.utils.schemaview import SchemaView
+
+import argparse
+import rdflib
+from rdflib.compare import isomorphic
+import tempfile
+import time
+
+from fisdat.data_model import JobDesc, ManifestDesc, ScopeDesc, TableDesc
+from fisdat.turtle     import dump_turtle, load_turtle
+
+'''
+Compare writing a manifest with `RDFLibDumper' and with `dump_turtle',
+checking that both write the same graph, then reading it back with
+`RDFLibLoader' and with `load_turtle', checking that both read the same
+manifest. For example,
+
+    python benchmarks/bench_turtle.py --tables 1000 2000 5000
+'''
+
+prefixes = { "_base": "https://marine.gov.scot/metadata/saved/rap/"
+           , "rap"  : "https://marine.gov.scot/metadata/saved/rap/"
+           , "saved": "https://marine.gov.scot/metadata/saved/schema/" }
+
+def synthetic_manifest (n : int) -> ManifestDesc:
+    tables = [TableDesc (atomic_name      = f"table_{k}"
+                       , title            = f"Table {k}"
+                       , resource_path    = f"table_{k}.csv"
+                       , resource_hash    = f"{k:096x}"
+                       , schema_path_yaml = "schema.yaml") for k in range (n)]
+    jobs   = [JobDesc (atomic_name         = f"job_{k}"
+                      , job_type            = "density"
+                      , title               = f"Job {k}"
+                      , job_scope_collected = [ScopeDesc (column = "TOTAL", variable = "saved:lice_af_total", table = f"table_{k}")]
+                      , job_scope_modelled  = [ScopeDesc (column = "time", variable = "saved:time", table = f"table_{k + 1}")])
+              for k in range (0, n - 1, 10)]
+    return (ManifestDesc (atomic_name = "RootManifest", tables = tables, jobs = jobs, local_version = "0.7"))
+
+def bench (n : int, data_model_uri : str) -> None:
+    manifest = synthetic_manifest (n)
+    # The dumper adds the base to the view's prefixes, and a second dump
+    # with the same view writes a bad `@prefix', so use a fresh one
+    view     = SchemaView (data_model_uri)
+    with tempfile.TemporaryDirectory () as directory:
+        (path_rdflib, path_direct) = (f"{directory}/rdflib.ttl", f"{directory}/direct.ttl")
+
+        start = time.perf_counter ()
+        RDFLibDumper ().dump (manifest, path_rdflib, schemaview = view, prefix_map = dict (prefixes))
+        time_rdflib = time.perf_counter () - start
+
+        start = time.perf_counter ()
+        dump_turtle (manifest, path_direct, prefixes)
+        time_direct = time.perf_counter () - start
+
+        same = isomorphic (rdflib.Graph ().parse (path_rdflib), rdflib.Graph ().parse (path_direct))
+        print (f"{n:>8} tables: RDFLibDumper {time_rdflib:8.3f}s, dump_turtle {time_direct:8.3f}s, "
+               f"{time_rdflib / time_direct:6.1f}x faster, isomorphic: {same}")
+
+        start = time.perf_counter ()
+        loaded_rdflib = RDFLibLoader ().load (source = path_direct, target_class = ManifestDesc, schemaview = view)
+        time_rdflib   = time.perf_counter () - start
+
+        start = time.perf_counter ()
+        loaded_direct = load_turtle (path_direct, view)
+        time_direct   = time.perf_counter () - start
+
+        # The RDF loader reads the tables and jobs in no particular order
+        for k in [loaded_rdflib, loaded_direct]:
+            k.tables.sort (key = lambda t : t.atomic_name)
+            k.jobs.sort (key = lambda j : j.atomic_name)
+        same = loaded_rdflib == loaded_direct
+    print (f"{n:>8} tables: RDFLibLoader {time_rdflib:8.3f}s, load_turtle {time_direct:8.3f}s, "
+           f"{time_rdflib / time_direct:6.1f}x faster, same manifest: {same}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser ("bench_turtle")
+    parser.add_argument ("--tables", help = "Numbers of tables to benchmark with", type = int, nargs = "+", default = [100, 1000, 5000])
+    parser.add_argument ("--data-model-uri"
+                       , help    = "Data model YAML specification URI"
+                       , default = "https://marine.gov.scot/metadata/saved/schema/meta.yaml")
+    args = parser.parse_args ()
+    for n in args.tables:
+        bench (n, args.data_model_uri)
@@ -0,0 +1,135 @@
+from hashlib import sha384
+import json
+import logging
+from os      import stat
+from os.path import isdir, isfile
+from pathlib import PurePath
+from typing  import Optional
+
+import yaml
+
+from linkml_runtime.loaders import YAMLLoader
+
+from fisdat.canonical  import manifest_digest
+from fisdat.data_model import ManifestDesc
+from fisdat.fragments  import merge_to_file
+from fisdat.stats      import stats_path
+from fisdat.turtle     import load_turtle
+
+'''
+Bundle fingerprints.
+
+`fisup' converts schemata, writes the converted and annotated manifests
+and uploads everything, every time. The fingerprint of a bundle is the
+root of a Merkle tree over
+
+- each table: its name, recorded hash, and the size and modification
+  time of its data file, so a data file changed since it was hashed by
+  `fisdat' changes the fingerprint without being read again
+- each schema: the hash of its contents
+- the manifest: the digest of its canonical form, see `fisdat.canonical'
+- the command line options which change what is uploaded, or where
+
+After an upload, the fingerprint is recorded with the URL of the bundle,
+and its bucket and path, in a hidden file next to the manifest
+(`.manifest.yaml.bundle'). If the fingerprint is the same on the next
+run, there is nothing new to upload, and the earlier bundle is reported
+instead. A later upload `--based-on' that URL takes the bundle's bucket
+and path from the record.
+'''
+
+def record_path (manifest : str) -> PurePath:
+    manifest_path = PurePath (manifest)
+    return (manifest_path.with_name (f".{manifest_path.name}.bundle"))
+
+def load_record (manifest : str) -> Optional[dict]:
+    path = record_path (manifest)
+    if (not isfile (path)):
+        return (None)
+    try:
+        with open (path, "r") as fp:
+            return (json.load (fp))
+    except (OSError, ValueError) as e:
+        logging.info (f"Ignoring unreadable bundle record {path}: {e}")
+        return (None)
+
+def save_record (manifest    : str
+              , fingerprint : str
+              , uuid        : str
+              , url         : str
+              , bucket      : str
+              , path        : str) -> PurePath:
+    target = record_path (manifest)
+    with open (target, "w") as fp:
+        json.dump ({ "fingerprint": fingerprint, "uuid": uuid, "url": url, "bucket": bucket, "path": path }, fp, indent = 2)
+    return (target)
+
+def digest (data : bytes) -> bytes:
+    return (sha384 (data).digest ())
+
+def merkle_root (leaves : list[bytes]) -> str:
+    '''
+    The root of the Merkle tree over the hashes of `leaves', taken in
+    sorted order so the order they are given in doesn't matter. An odd
+    node out at any level is carried up as it is.
+    '''
+    level = sorted (digest (k) for k in leaves) or [digest (b"")]
+    while (len (level) > 1):
+        level = [digest (b"".join (level [k:k + 2])) if k + 1 < len (level) else level [k]
+                 for k in range (0, len (level), 2)]
+    return (level [0].hex ())
+
+def file_digest (path : str) -> str:
+    with open (path, "rb") as fp:
+        return (sha384 (fp.read ()).hexdigest ())
+
+def load_for_fingerprint (manifest : str, manifest_format : str) -> Optional[ManifestDesc]:
+    '''
+    Load the manifest without the data model, which takes far longer to
+    load than the rest of the fingerprint takes to work out.
+    '''
+    if (isdir (manifest)):
+        (manifest, manifest_format) = (str (merge_to_file (manifest)), "yaml")
+    if (manifest_format == "ttl"):
+        return (load_turtle (manifest))
+    return (YAMLLoader ().load (source = manifest, target_class = ManifestDesc))
+
+def bundle_fingerprint (manifest        : str
+                      , manifest_format : str
+                      , prefixes        : dict[str, str]
+                      , options         : dict[str, str]
+                      , fake_cwd        : str = "") -> Optional[str]:
+    '''
+    The fingerprint of the bundle for `manifest', with the command line
+    `options' which affect the objects uploaded, the manifest format and
+    earlier bundle among them, or `None' if it can't be worked out, say
+    because a file is missing, in which case `fisup' carries on as usual
+    and reports the problem.
+    '''
+    logging.debug (f"Called `bundle_fingerprint (manifest = {manifest}, manifest_format = {manifest_format}, prefixes = {prefixes}, options = {options})'")
+    try:
+        manifest_obj = load_for_fingerprint (manifest, manifest_format)
+        leaves       = [f"manifest {manifest_digest (manifest_obj, prefixes)}".encode ()]
+        leaves      += [f"option {k} {v}".encode () for (k, v) in sorted (options.items ())]
+        for table in manifest_obj.tables:
+            info = stat (f"{fake_cwd}{table.resource_path}")
+            leaves.append (f"table {table.atomic_name} {table.resource_hash} {info.st_size} {info.st_mtime_ns}".encode ())
+            sidecar = f"{fake_cwd}{stats_path (str (table.resource_path))}"
+            if (isfile (sidecar)):
+                leaves.append (f"stats {table.resource_path} {file_digest (sidecar)}".encode ())
+        for schema in sorted (set (str (table.schema_path_yaml) for table in manifest_obj.tables)):
+            leaves.append (f"schema {schema} {file_digest (f'{fake_cwd}{schema}')}".encode ())
+    except (OSError, ValueError, yaml.YAMLError) as e:
+        logging.info (f"Cannot fingerprint bundle for manifest {manifest}: {e}")
+        return (None)
+    return (merkle_root (leaves))
+
+def unchanged_bundle (manifest : str, fingerprint : Optional[str]) -> Optional[dict]:
+    '''
+    The record of the last upload of `manifest', if its fingerprint is
+    `fingerprint'.
+    '''
+    record = load_record (manifest)
+    if (fingerprint is None or record is None or record.get ("fingerprint") != fingerprint):
+        return (None)
+    return (record)
@@ -0,0 +1,74 @@
+from hashlib import sha384
+
+from linkml_runtime.dumpers import YAMLDumper
+
+from fisdat.compact    import Scope, compact
+from fisdat.data_model import ManifestDesc
+from fisdat.turtle     import PN_LOCAL, TurtleWriter
+
+'''
+Canonical manifests.
+
+The same manifest can be written in many ways: tables and jobs in any
+order, job scopes in any order, and names given plainly (`table'), as
+CURIEs (`rap:table') or as full IRIs, all meaning the same thing. The
+canonical form of a manifest has
+
+- names relative to the base where they can be, otherwise CURIEs with
+  the longest matching prefix, otherwise full IRIs
+- tables and jobs sorted by name, and job scopes by table, column and
+  variable
+
+so the YAML or Turtle written for manifests with the same content is the
+same, byte for byte. Scopes are written inline in Turtle, so there are
+no blank node labels to vary.
+'''
+
+def canonical_name (name : str, writer : TurtleWriter) -> str:
+    iri = writer.expand (name)
+    if (iri.startswith (writer.base)):
+        return (iri [len (writer.base):])
+    for (prefix, namespace) in sorted (writer.namespaces.items (), key = lambda k : (-len (k [1]), k [0])):
+        if (iri.startswith (namespace) and PN_LOCAL.match (iri [len (namespace):])):
+            return (f"{prefix}:{iri [len (namespace):]}")
+    return (iri)
+
+def canonical_scopes (scopes : list[Scope], writer : TurtleWriter) -> list[Scope]:
+    for scope in scopes:
+        scope.variable = canonical_name (scope.variable, writer)
+        scope.table    = canonical_name (scope.table, writer)
+    return (sorted (scopes, key = lambda k : (k.table, k.column, k.variable)))
+
+def canonical_manifest (manifest : ManifestDesc
+                      , prefixes : dict[str, str]) -> ManifestDesc:
+    '''
+    The canonical form of `manifest', which is left as it is.
+    '''
+    writer = TurtleWriter (prefixes)
+    result = compact (manifest)
+    result.atomic_name = canonical_name (result.atomic_name, writer)
+    for table in result.tables:
+        table.atomic_name = canonical_name (table.atomic_name, writer)
+    for job in result.jobs:
+        job.atomic_name = canonical_name (job.atomic_name, writer)
+        for k in job.lists:
+            setattr (job, k, canonical_scopes (getattr (job, k), writer))
+    result.tables.sort (key = lambda k : k.atomic_name)
+    result.jobs.sort (key = lambda k : k.atomic_name)
+    return (result.to_desc ())
+
+def canonical_yaml (manifest : ManifestDesc
+                  , prefixes : dict[str, str]) -> str:
+    return (YAMLDumper ().dumps (canonical_manifest (manifest, prefixes)))
+
+def canonical_turtle (manifest : ManifestDesc
+                    , prefixes : dict[str, str]) -> str:
+    return (TurtleWriter (prefixes).dumps (canonical_manifest (manifest, prefixes)))
+
+def manifest_digest (manifest : ManifestDesc
+                   , prefixes : dict[str, str]) -> str:
+    '''
+    A hash of the canonical Turtle of `manifest', the same for any two
+    manifests with the same content.
+    '''
+    return (sha384 (canonical_turtle (manifest, prefixes).encode ("utf-8")).hexdigest ())
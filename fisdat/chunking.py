@@ -0,0 +1,131 @@
+from hashlib import sha384
+import json
+import logging
+from pathlib import PurePath
+from typing  import Iterator
+import zlib
+
+from fisdat.storage import Storage
+
+'''
+Chunked uploads of large data files.
+
+Time series tables grow a little between uploads, but any change means
+uploading the whole file again. A large data file can instead be split
+into chunks at boundaries chosen by its contents, each chunk uploaded as
+an object named after its hash, under `chunks/' in the bucket, shared by
+every bundle. A chunk already in the bucket isn't uploaded again, so a
+file which has grown only uploads its last chunk or two.
+
+Data files are CSV, so chunks end at the end of a row, and the content
+which decides a boundary is the row itself: a row ends a chunk if its
+CRC-32 is below a threshold proportional to its length, so chunks are
+`average' bytes long on average, whatever the length of the rows, and
+are kept between `minimum' and `maximum' bytes (unless a row is longer).
+As with a rolling hash over a window of bytes, a boundary only depends
+on the row before it, so rows appended or changed only change the chunks
+around them.
+
+The file is then uploaded as a chunk index in place of the file proper:
+JSON giving the file name, size, hash, and the hash and size of each
+chunk in order, from which `reassemble' puts the file back together.
+'''
+
+## chunk sizes, in bytes
+CHUNK_MIN     = 1 << 20
+CHUNK_AVERAGE = 4 << 20
+CHUNK_MAX     = 16 << 20
+
+## data read buffer size, 1MB
+BUFSIZ = 1048576
+
+## extension of chunk index objects
+CHUNKS = "chunks"
+
+def chunk_key (chunk_hash : str) -> str:
+    return (f"{CHUNKS}/{chunk_hash}")
+
+def index_name (data : str) -> str:
+    return (f"{data}.{CHUNKS}")
+
+def read_rows (path : str) -> Iterator[bytes]:
+    with open (path, "rb") as fp:
+        rest = b""
+        for block in iter (lambda : fp.read (BUFSIZ), b""):
+            rows = (rest + block).split (b"\n")
+            rest = rows.pop ()
+            for row in rows:
+                yield (row + b"\n")
+        if (rest):
+            yield (rest)
+
+def chunks (path    : str
+          , average : int = CHUNK_AVERAGE
+          , minimum : int = CHUNK_MIN
+          , maximum : int = CHUNK_MAX) -> Iterator[bytes]:
+    '''
+    The chunks of the file `path', see above.
+    '''
+    spread  = max (average - minimum, 1)
+    current = []
+    size    = 0
+    for row in read_rows (path):
+        if (current and size + len (row) > maximum):
+            yield (b"".join (current))
+            (current, size) = ([], 0)
+        current.append (row)
+        size += len (row)
+        if (size >= minimum and zlib.crc32 (row) < (len (row) << 32) // spread):
+            yield (b"".join (current))
+            (current, size) = ([], 0)
+    if (current):
+        yield (b"".join (current))
+
+def upload_chunked (storage : Storage
+                  , data    : str
+                  , key     : str
+                  , **sizes : int) -> tuple[int, int]:
+    '''
+    Upload the chunks of `data' which aren't already in the bucket, then
+    its chunk index as `key'. Returns how many chunks there were, and how
+    many were uploaded.
+    '''
+    logging.debug (f"Called `upload_chunked (data = {data}, key = {key}, sizes = {sizes})'")
+    (whole, entries, uploaded) = (sha384 (), [], 0)
+    for chunk in chunks (data, **sizes):
+        whole.update (chunk)
+        chunk_hash = sha384 (chunk).hexdigest ()
+        entries.append ([chunk_hash, len (chunk)])
+        if (storage.digest (chunk_key (chunk_hash)) is None):
+            storage.write (chunk, chunk_key (chunk_hash))
+            uploaded += 1
+    index = { "file"  : PurePath (data).name
+            , "size"  : sum (k [1] for k in entries)
+            , "hash"  : whole.hexdigest ()
+            , "chunks": entries }
+    storage.write (json.dumps (index, indent = 1).encode ("utf-8"), key)
+    return (len (entries), uploaded)
+
+def reassemble (storage : Storage
+              , key     : str
+              , target  : str) -> bool:
+    '''
+    Put the file with the chunk index `key' back together as `target',
+    returning whether it was complete and has the hash in the index.
+    '''
+    logging.debug (f"Called `reassemble (key = {key}, target = {target})'")
+    text = storage.read (key)
+    if (text is None):
+        print (f"There is no chunk index {storage.url (key)}")
+        return (False)
+    index = json.loads (text)
+    whole = sha384 ()
+    with open (target, "wb") as fp:
+        for (chunk_hash, size) in index ["chunks"]:
+            chunk = storage.read (chunk_key (chunk_hash))
+            if (chunk is None or len (chunk) != size):
+                print (f"Chunk {chunk_hash} of {index ['file']} is missing")
+                return (False)
+            whole.update (chunk)
+            fp.write (chunk)
+    return (whole.hexdigest () == index ["hash"])
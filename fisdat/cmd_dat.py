@@ -1,22 +1,42 @@
 #from linkml.utils.schemaloader       import SchemaLoader
 from linkml_runtime.dumpers          import RDFLibDumper, YAMLDumper
-from linkml_runtime.loaders          import RDFLibLoader, YAMLLoader
+from linkml_runtime.loaders          import YAMLLoader
 from linkml_runtime.utils.schemaview import SchemaView
 
 import argparse
-from hashlib    import sha384
-from os.path    import isfile
-from pathlib    import PurePath
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib         import nullcontext
+from functools          import partial
+import csv
+from glob               import glob
+from os.path            import getsize, isfile, normpath
+from pathlib            import PurePath
+from types              import SimpleNamespace
+from typing             import Collection, Optional
 import logging
+import sys
+import time
 
 import rdflib.plugins.parsers.notation3
 import urllib.error
 import yaml.scanner
 
 import pkg_resources  # part of setuptools
-from fisdat.data_model import JobDesc, TableDesc, ManifestDesc
-from fisdat.ns         import CSVW
-from fisdat.utils      import extension_helper, job_table, schema_components_helper, validation_helper
+from fisdat.canonical   import canonical_manifest
+from fisdat.columnar    import columnar_writer, write_columnar
+from fisdat.data_model  import JobDesc, TableDesc, ManifestDesc
+from fisdat.fragments   import JOBS, TABLES, fragment_path, init_fragments, is_fragmented, set_local_version, write_fragment
+from fisdat.incremental import file_hash, incremental_helper
+from fisdat.ingest      import ingest_helper
+from fisdat.index       import ManifestIndex
+from fisdat.manifest    import fast_append
+from fisdat.ns          import CSVW
+from fisdat.projection  import projection_helper, scope_columns
+from fisdat.stats       import TableStats, table_stats, write_stats
+from fisdat.stream      import NA_VALUES
+from fisdat.tiered      import fast_fail_helper
+from fisdat.turtle      import turtle_loader, turtle_wrapper
+from fisdat.utils       import atomic_output, extension_helper, job_table, manifest_lock, schema_components_helper, validation_helper
 
 import pkg_resources
 __version__ = pkg_resources.require("fisdat")[0].version
@@ -25,7 +45,8 @@ def dump_wrapper (py_obj
                 , data_model_view : SchemaView
                 , output_path     : PurePath
                 , prefixes        : dict[str, str]
-                , mode            : str) -> bool:
+                , mode            : str
+                , canonical       : bool = False) -> bool:
     '''
     Given a Python object to serialise, and a SchemaView object derived
     from the data model, serialise RDF.
@@ -36,9 +57,17 @@ def dump_wrapper (py_obj
     `get_contexts' and provide the resulting context to the conexts
     argument.
     There was strange behaviour when calling RDFDumper.dumper directly,
-    which is why it's not called directly.
+    which is why it's not called directly. Manifests are now written as
+    Turtle directly, see `fisdat.turtle', with RDFLibDumper as fallback.
+    The output is written to a temporary file which then replaces
+    `output_path', so the manifest is never seen half-written.
+    With `canonical' set, the canonical form of the manifest is written,
+    see `fisdat.canonical'.
     '''
-    logging.debug (f"Called `dump_wrapper (py_obj = {py_obj}, data_model_view = {SchemaView}, output_path = {str(output_path)}, prefixes = {prefixes}, mode = {mode})'")
+    logging.debug (f"Called `dump_wrapper (py_obj = {py_obj}, data_model_view = {SchemaView}, output_path = {str(output_path)}, prefixes = {prefixes}, mode = {mode}, canonical = {canonical})'")
+
+    if (canonical):
+        py_obj = canonical_manifest (py_obj, prefixes)
 
     output_path_ext = extension_helper (output_path)
 
@@ -48,11 +77,9 @@ def dump_wrapper (py_obj
     if (mode == "ttl"):
         if (output_path_ext != "rdf" and output_path_ext != "ttl"):
             logging.info (f"Warning: target extension has a .{output_path_ext} extension, but will actually be serialised as RDF/TTL")
-        dumper = RDFLibDumper ()
-        
         logging.info (f"Dumping Python object to {output_path}")
-        # Hard-coded at the moment, need to fix this
-        dumper.dump (py_obj, output_path, schemaview = data_model_view, prefix_map = prefixes)
+        with atomic_output (str (output_path)) as staging:
+            turtle_wrapper (py_obj, staging, data_model_view, prefixes)
 
         return (True)            
         
@@ -62,7 +89,8 @@ def dump_wrapper (py_obj
         dumper = YAMLDumper ()
         
         logging.info (f"Dumping Python object to {output_path}")
-        dumper.dump (py_obj, output_path)
+        with atomic_output (str (output_path)) as staging:
+            dumper.dump (py_obj, staging)
 
         return (True)
     
@@ -70,6 +98,97 @@ def dump_wrapper (py_obj
         print (f"Unrecognised serialisation mode {mode} cannot dump object")
         return (False)
 
+def data_model_helper (data_model_uri : str) -> Optional[SchemaView]:
+    try:
+        return (SchemaView (data_model_uri))
+    except urllib.error.HTTPError as e:
+        print (f"HTTP error {e.code} trying data model URI `{e.url}'")
+        print ("If you've overridden the default using the `--data-model-uri' option, double-check that it's valid.")
+        return (None)
+
+def table_description (data      : str
+                     , schema    : str
+                     , data_hash : str) -> TableDesc:
+    logging.info ("Generating base table description")
+    data_path   = PurePath (data) # Necessary to only include the file name proper
+    schema_path = PurePath (schema) # ''
+
+    #schema_obj        = SchemaLoader (schema).schema
+    #schema_properties = schema_components_helper (schema_obj)
+
+    if (data_path.name != str(data_path)):
+        print ("Warning: Data file does not seem to be located in current working directory, need to move this here upon upload with `fisup'")
+    if (schema_path.name != str(schema_path)):
+        print ("Warning: Schema file does not seem to be located in current working directory, need to move this here upon upload with `fisup'")
+
+    return (TableDesc (
+        atomic_name      = data_path.stem
+      #, title            = schema_properties ["title"]
+      #, description      = schema_properties ["description"] # Partly for filling out a template, use even empty
+      , resource_path    = data_path.name
+      , schema_path_yaml = schema_path.name
+      , resource_hash    = data_hash
+    ))
+
+def example_job (table : TableDesc) -> JobDesc:
+    logging.info ("Generating base job description")
+    return (JobDesc (
+        atomic_name           = f"job_example_{table.atomic_name}"
+      , title                 = f"Empty job template for {table.atomic_name}"
+      , job_type              = "ignore"
+      , job_scope_descriptive = []
+      , job_scope_collected   = []
+      , job_scope_modelled    = []
+    ))
+
+def load_manifest (manifest        : str
+                 , serialise_mode  : str
+                 , data_model_view : SchemaView) -> Optional[ManifestDesc]:
+    manifest_path = PurePath (manifest)
+    logging.info (f"Reading existing manifest {manifest_path}")
+
+    if (serialise_mode == "ttl"):
+        try:
+            return (turtle_loader (manifest, data_model_view))
+        except rdflib.plugins.parsers.notation3.BadSyntax:
+            print (f"Cannot load file {manifest_path} with the RDF/TTL loader. Is your manifest a YAML manifest? (\"yaml\" `--manifest-format' option)")
+            return (None)
+        
+    elif (serialise_mode == "yaml"):
+        try:
+            loader = YAMLLoader ()
+            return (loader.load (source       = manifest
+                               , target_class = ManifestDesc))
+        except yaml.scanner.ScannerError: 
+            print (f"Cannot load file {manifest_path} with the YAML loader. Is your manifest an RDF/TTL manifest? (\"ttl\" `--manifest-format option)")
+            return (None)
+    else:
+        print ("Unrecognised serialisation mode for `append_job_manifest()', cannot load extant object")
+        return (None)
+
+def append_fragment (table         : TableDesc
+                    , manifest      : str
+                    , manifest_name : str
+                    , update_hash   : bool = False) -> bool:
+    '''
+    Add a table to a fragmented manifest (see `fisdat.fragments'),
+    creating it if need be. This only ever writes the table's own
+    fragment, so there's no need to load the manifest or data model.
+    '''
+    logging.debug (f"Called `append_fragment (table = {table}, manifest = {manifest}, manifest_name = {manifest_name}, update_hash = {update_hash})'")
+    if (init_fragments (manifest, manifest_name, __version__)):
+        logging.info (f"Initialised fragmented manifest {manifest}")
+        write_fragment (manifest, JOBS, example_job (table))
+    else:
+        set_local_version (manifest, __version__)
+
+    if (write_fragment (manifest, TABLES, table, replace = update_hash)):
+        print (job_table (SimpleNamespace (tables = [table]), fragment_path (manifest, TABLES, table.atomic_name), preamble = True))
+        return (True)
+    else:
+        print (f"Data-file {table.resource_path} was already in the table, cannot add!")
+        return (False)
+
 def append_job_manifest (data           : str
                        , schema         : str
                        , data_model_uri : str
@@ -77,61 +196,65 @@ def append_job_manifest (data           : str
                        , manifest_name  : str
                        , append_mode    : str
                        , serialise_mode : str
-                       , prefixes       : dict[str, str]) -> bool:
+                       , prefixes       : dict[str, str]
+                       , data_hash      : Optional[str]        = None
+                       , update_hash    : bool                 = False
+                       , fast           : bool                 = True
+                       , canonical      : bool                 = False
+                       , data_model     : Optional[SchemaView] = None) -> bool:
     '''
     Given a data file, a file schema, and the parent data model, build
     up a Python object which can be serialised to RDF.
     The data model is necessary as it provides JSON-LD contexts, which
     are ncessary when serialising JSON-LD and RDF. It can point to
     job.yaml or the meta-model which pulls it in at the top-level.
+
+    If the hash of the data file is already known (e.g. from incremental
+    validation) it may be passed in as `data_hash'. If `update_hash' is
+    set, a data file which is already in the manifest has its hash
+    updated rather than being refused, which is how a growing data file
+    is kept up to date.
+
+    When appending a new table, and unless `fast' is unset, the table is
+    written straight into the serialised manifest, without loading it or
+    the data model, see `fast_append'. If the manifest is a directory of
+    fragments, the table is written to a fragment of its own. With
+    `canonical' set, the manifest is always written in full, in its
+    canonical form.
+
+    The data model may be passed in as `data_model', already loaded, so
+    that the caller can load it before locking the manifest.
     '''
-    logging.debug (f"Called `append_job_manifest (data = {data}, schema = {schema}, data_model_uri = {data_model_uri}, manifest = {manifest}, manifest_name = {manifest_name}, append_mode = {append_mode}, serialise_mode = {serialise_mode}, prefixes = {prefixes})'")
+    logging.debug (f"Called `append_job_manifest (data = {data}, schema = {schema}, data_model_uri = {data_model_uri}, manifest = {manifest}, manifest_name = {manifest_name}, append_mode = {append_mode}, serialise_mode = {serialise_mode}, prefixes = {prefixes}, data_hash = {data_hash}, update_hash = {update_hash}, fast = {fast}, canonical = {canonical}, data_model = {data_model is not None})'")
     
     manifest_path   = PurePath (manifest)
     manifest_ext    = extension_helper (manifest_path)
     data_path       = PurePath (data) # Necessary to only include the file name proper
-    schema_path     = PurePath (schema) # ''
 
     # Note, even before calling this function, the file is known to exist
-    with open (data, "rb") as fp:
-        data_text = fp.read ()
-    data_hash = sha384 (data_text).hexdigest()
+    if (data_hash is None):
+        data_hash = file_hash (data)
 
-    try:
-        py_data_model_view = SchemaView (data_model_uri)
-    except urllib.error.HTTPError as e:
-        print (f"HTTP error {e.code} trying data model URI `{e.url}'")
-        print ("If you've overridden the default using the `--data-model-uri' option, double-check that it's valid.")
-        return (False)
-    
-    logging.info ("Generating base job description")
-    #schema_obj        = SchemaLoader (schema).schema
-    #schema_properties = schema_components_helper (schema_obj)
-    target_set_atomic = data_path.stem
+    staging_table = table_description (data, schema, data_hash)
 
-    if (data_path.name != str(data_path)):
-        print ("Warning: Data file does not seem to be located in current working directory, need to move this here upon upload with `fisup'")
-    if (schema_path.name != str(schema_path)):
-        print ("Warning: Schema file does not seem to be located in current working directory, need to move this here upon upload with `fisup'")
+    if (is_fragmented (manifest)):
+        return (append_fragment (staging_table, manifest, manifest_name, update_hash))
 
-    logging.info ("Generating base table description")
-    staging_table = TableDesc (
-        atomic_name      = target_set_atomic
-      #, title            = schema_properties ["title"]
-      #, description      = schema_properties ["description"] # Partly for filling out a template, use even empty
-      , resource_path    = data_path.name
-      , schema_path_yaml = schema_path.name
-      , resource_hash    = data_hash
-    )
+    if (append_mode != "initialise" and fast and not update_hash and not canonical):
+        appended = fast_append (manifest, manifest_name, serialise_mode, staging_table, __version__)
+        if (appended):
+            print (job_table (SimpleNamespace (tables = [staging_table]), manifest, preamble = True, mode = 'a'))
+            return (True)
+        elif (appended is not None):
+            print (f"Data-file {data} was already in the table, cannot add!")
+            return (False)
+        logging.info (f"Cannot append to manifest {manifest} in place, loading it in full")
 
-    initial_example_job = JobDesc (
-        atomic_name           = f"job_example_{target_set_atomic}"
-      , title                 = f"Empty job template for {target_set_atomic}"
-      , job_type              = "ignore"
-      , job_scope_descriptive = []
-      , job_scope_collected   = []
-      , job_scope_modelled    = []
-    )
+    py_data_model_view = data_model if data_model is not None else data_model_helper (data_model_uri)
+    if (py_data_model_view is None):
+        return (False)
+    
+    initial_example_job = example_job (staging_table)
     
     logging.info ("Proceeding with manifest initialise or append operation")
     if (append_mode == "initialise"):        
@@ -146,45 +269,43 @@ def append_job_manifest (data           : str
                              , data_model_view = py_data_model_view
                              , output_path     = manifest_path
                              , prefixes        = prefixes
-                             , mode            = serialise_mode)
+                             , mode            = serialise_mode
+                             , canonical       = canonical)
 
         # Important to catch this!
         if (result):
             print (job_table (manifest_skeleton, manifest_path, preamble = True))
 
     else:
-        logging.info (f"Reading existing manifest {manifest_path}")
-
-        if (serialise_mode == "ttl"):
-            try:
-                loader          = RDFLibLoader ()
-                extant_manifest = loader.load (source       = manifest
-                                             , target_class = ManifestDesc
-                                             , schemaview   = py_data_model_view)
-            except rdflib.plugins.parsers.notation3.BadSyntax:
-                print (f"Cannot load file {manifest_path} with the RDF/TTL loader. Is your manifest a YAML manifest? (\"yaml\" `--manifest-format' option)")
-                return (False)
-            
-        elif (serialise_mode == "yaml"):
-            try:
-                loader          = YAMLLoader ()
-                extant_manifest = loader.load (source       = manifest
-                                             , target_class = ManifestDesc)
-            except yaml.scanner.ScannerError: 
-                print (f"Cannot load file {manifest_path} with the YAML loader. Is your manifest an RDF/TTL manifest? (\"ttl\" `--manifest-format option)")
-                return (False)
-        else:
-            print ("Unrecognised serialisation mode for `append_job_manifest()', cannot load extant object")
+        extant_manifest = load_manifest (manifest, serialise_mode, py_data_model_view)
+        if (extant_manifest is None):
             return (False)
 
-            
         logging.info (f"Checking that data file {data} does not already exist in manifest")
-        extant_paths      = map (lambda k : PurePath (k.resource_path).name, extant_manifest.tables)
-        check_extant_path = data_path.name in extant_paths
+        index             = ManifestIndex (extant_manifest)
+        check_extant_path = index.table_for_path (data_path.name) is not None
+        check_extant_name = index.table (staging_table.atomic_name) is not None
         
-        if (check_extant_path):
+        if (check_extant_path and update_hash):
+            logging.info (f"Data-file {data} was already in manifest, updating its hash")
+            staging_manifest = extant_manifest
+            index.update_hash (data_path.name, data_hash)
+            staging_manifest.local_version = __version__
+
+            result = dump_wrapper (py_obj          = staging_manifest
+                                 , data_model_view = py_data_model_view
+                                 , output_path     = manifest_path
+                                 , prefixes        = prefixes
+                                 , mode            = serialise_mode
+                                 , canonical       = canonical)
+
+            print (job_table (staging_manifest, manifest, preamble = True))
+        elif (check_extant_path):
             print (f"Data-file {data} was already in the table, cannot add!")
-            result = (not check_extant_path) and (not check_extant_name)
+            result = False
+        elif (check_extant_name):
+            print (f"A table named {staging_table.atomic_name} is already in the manifest, cannot add data-file {data}!")
+            result = False
         else:
             logging.info (f"Data-file {data} was not in manifest, adding")
             '''
@@ -208,14 +329,15 @@ def append_job_manifest (data           : str
             string.
             '''
             staging_manifest = extant_manifest
-            staging_manifest.tables.append (staging_table)
+            index.add_table (staging_table)
             staging_manifest.local_version = __version__
             
             result = dump_wrapper (py_obj          = staging_manifest
                                  , data_model_view = py_data_model_view
                                  , output_path     = manifest_path
                                  , prefixes        = prefixes
-                                 , mode            = serialise_mode)
+                                 , mode            = serialise_mode
+                                 , canonical       = canonical)
 
             print (job_table (staging_manifest, manifest, preamble = True))
             
@@ -228,45 +350,180 @@ def manifest_wrapper (data           : str
                     , manifest_name  : str
                     , validate       : bool
                     , prefixes       : dict[str, str]
-                    , serialise_mode : str) -> bool:
+                    , serialise_mode : str
+                    , incremental    : bool                      = False
+                    , fast_fail      : bool                      = False
+                    , sample_rows    : int                       = 1000
+                    , background     : bool                      = False
+                    , max_errors     : int                       = 1
+                    , error_report   : Optional[str]             = None
+                    , na_values      : Optional[Collection[str]] = None
+                    , na_columns     : Optional[Collection[str]] = None
+                    , projected      : bool                      = False
+                    , rewrite        : bool                      = False
+                    , canonical      : bool                      = False
+                    , compress       : bool                      = False
+                    , stats          : bool                      = False
+                    , columnar       : bool                      = False) -> bool:
     '''
     Simple wrapper for the two modes of `append_job_manifest' based on
     whether the manifest file exists (optional) and whether the schema
     and data file exists (obviously mandatory).
+
+    With `incremental' set, only rows appended since the data file was
+    last validated are validated, and if the data file is already in
+    the manifest, its hash is updated.
+
+    With `fast_fail' set, the header and a sample of `sample_rows' rows
+    are checked before the full validation pass. With `background' set,
+    the full validation pass runs alongside hashing the data file.
+
+    By default the full validation pass stops at the first error. With
+    `max_errors' greater than one it carries on, collecting up to that
+    many errors, and `error_report' names a JSON file to write them to.
+
+    Fields holding one of the `na_values' tokens, in the `na_columns'
+    columns (or all columns) are treated as missing in every pass.
+
+    With `projected' set, the full pass only validates the columns used
+    by the job scopes of an existing YAML manifest, checking the rest
+    for structure only.
+
+    With `rewrite' set, the manifest is always loaded and written back
+    in full, rather than new tables being added to it in place. With
+    `canonical' set, it is also written in its canonical form.
+
+    A CSV file validated in full is read once, to validate and hash it
+    together. With `compress' set, a gzip-compressed copy is written
+    from the same read, see `fisdat.ingest'. With `stats' set, statistics
+    of each column are gathered from that read too (or from a read of
+    their own otherwise) and written to a sidecar, see `fisdat.stats'.
+    With `columnar' set, a typed columnar copy of the data file is
+    written the same way, see `fisdat.columnar'.
     '''
-    logging.debug (f"Called `manifest_wrapper (data = {data}, schema = {schema}, data_model_uri = {data_model_uri}, manifest = {manifest}, manifest_name = {manifest_name}, validate = {validate}, prefixes = {prefixes})'")
+    logging.debug (f"Called `manifest_wrapper (data = {data}, schema = {schema}, data_model_uri = {data_model_uri}, manifest = {manifest}, manifest_name = {manifest_name}, validate = {validate}, prefixes = {prefixes}, incremental = {incremental}, fast_fail = {fast_fail}, sample_rows = {sample_rows}, background = {background}, max_errors = {max_errors}, error_report = {error_report}, na_values = {na_values}, na_columns = {na_columns}, projected = {projected}, rewrite = {rewrite}, canonical = {canonical}, compress = {compress}, stats = {stats}, columnar = {columnar})'")
     logging.debug (f"Checking that input data {data} and schema {schema} files exist")
     
     prereq_check = isfile (data) and isfile (schema)
     
     if (isfile (data) and isfile (schema)):
-        if (validate):
-            validation_check = validation_helper (data, schema, "TableSchema")
-        else:
+        data_hash = None
+
+        na_options = { "na_values": na_values, "na_columns": na_columns }
+        columns    = None
+
+        if (projected and incremental):
+            print ("Validating only rows appended since the last run, rather than projecting onto the columns used by jobs")
+        elif (projected and not is_fragmented (manifest) and (serialise_mode != "yaml" or not isfile (manifest))):
+            print ("Projecting onto the columns used by jobs needs an existing YAML manifest, validating all columns")
+        elif (projected):
+            columns = scope_columns (data, manifest)
+            if (columns == []):
+                print (f"No jobs in {manifest} use columns of {data}, validating all columns")
+
+        # A CSV file validated in full is hashed as it is validated, see `fisdat.ingest'
+        single_pass = not incremental and not columns and extension_helper (PurePath (data)) == "csv"
+        if (compress and not (validate and single_pass)):
+            print (f"A compressed copy of {data} is only written when it is a CSV file validated in full")
+        column_stats = TableStats () if stats and validate and single_pass else None
+
+        def full_validation () -> tuple[bool, Optional[str]]:
+            if (incremental):
+                return (incremental_helper (data, schema, "TableSchema", max_errors = max_errors, report_path = error_report, **na_options))
+            elif (columns):
+                return (projection_helper (data, schema, "TableSchema", columns, max_errors = max_errors, report_path = error_report, **na_options), None)
+            elif (single_pass):
+                cache = columnar_writer (data, schema) if columnar else None
+                (valid, full_hash, _) = ingest_helper (data, schema, "TableSchema", max_errors = max_errors, report_path = error_report, compress = compress, columns = column_stats, cache = cache, **na_options)
+                return (valid, full_hash)
+            else:
+                return (validation_helper (data, schema, "TableSchema", max_errors = max_errors, report_path = error_report, **na_options), None)
+
+        if (not validate):
             logging.info (f"Validation of data-file {data} against schema {schema} disabled")
             validation_check = True
+        elif (fast_fail and not fast_fail_helper (data, schema, "TableSchema", rows = sample_rows, **na_options)):
+            validation_check = False
+        elif (background):
+            '''
+            Hashing the data file releases the GIL, so it carries on
+            alongside the full validation pass rather than after it.
+            '''
+            with ThreadPoolExecutor (max_workers = 1) as executor:
+                pending = executor.submit (full_validation)
+                print (f"Validating data-file {data} in the background")
+                if (not incremental and not single_pass):
+                    data_hash = file_hash (data)
+                (validation_check, full_hash) = pending.result ()
+                data_hash = full_hash or data_hash
+        else:
+            (validation_check, data_hash) = full_validation ()
+
+        if (validation_check and stats and extension_helper (PurePath (data)) != "csv"):
+            print (f"Statistics are only gathered for CSV files, not for {data}")
+        elif (validation_check and stats):
+            if (column_stats is None):
+                logging.info (f"Reading {data} again for its statistics")
+                column_stats = table_stats (data, **na_options)
+            if (data_hash is None):
+                data_hash = file_hash (data)
+            write_stats (data, column_stats, data_hash)
+        if (validation_check and columnar and extension_helper (PurePath (data)) != "csv"):
+            print (f"Columnar copies are only written of CSV files, not of {data}")
+        elif (validation_check and columnar):
+            if (data_hash is None):
+                data_hash = file_hash (data)
+            # Already there if written as the file was validated
+            write_columnar (data, schema, data_hash, **na_options)
             
         if (validation_check):
-            if (isfile (manifest)):
-                logging.info (f"Manifest exists, appending to manifest {manifest}")
-                result = append_job_manifest (data           = data
-                                            , schema         = schema
-                                            , data_model_uri = data_model_uri
-                                            , manifest       = manifest
-                                            , manifest_name  = manifest_name
-                                            , append_mode    = "append"
-                                            , serialise_mode = serialise_mode
-                                            , prefixes       = prefixes)
-            else:
-                logging.info (f"Manifest does not exist, creating new manifest {manifest}")
-                result = append_job_manifest (data           = data
-                                            , schema         = schema
-                                            , data_model_uri = data_model_uri
-                                            , manifest       = manifest
-                                            , manifest_name  = manifest_name
-                                            , append_mode    = "initialise"
-                                            , serialise_mode = serialise_mode
-                                            , prefixes       = prefixes)
+            '''
+            Validation, the slow part, is done by now, and the data file
+            hashed and the data model loaded, unless the table is to be
+            written straight into the manifest or a fragment, where it
+            isn't needed. So the manifest is only locked while it is
+            read, changed and written. Another process waiting on the
+            lock then reads the manifest as this one left it, so tables
+            added at the same time are merged rather than lost.
+            '''
+            if (data_hash is None):
+                data_hash = file_hash (data)
+            in_place   = is_fragmented (manifest) or (isfile (manifest) and not incremental and not rewrite and not canonical)
+            data_model = None if in_place else data_model_helper (data_model_uri)
+            if (not in_place and data_model is None):
+                return (False)
+            try:
+                with (nullcontext () if is_fragmented (manifest) else manifest_lock (manifest)):
+                    if (isfile (manifest)):
+                        logging.info (f"Manifest exists, appending to manifest {manifest}")
+                        result = append_job_manifest (data           = data
+                                                    , schema         = schema
+                                                    , data_model_uri = data_model_uri
+                                                    , manifest       = manifest
+                                                    , manifest_name  = manifest_name
+                                                    , append_mode    = "append"
+                                                    , serialise_mode = serialise_mode
+                                                    , prefixes       = prefixes
+                                                    , data_hash      = data_hash
+                                                    , update_hash    = incremental
+                                                    , fast           = not rewrite
+                                                    , canonical      = canonical
+                                                    , data_model     = data_model)
+                    else:
+                        logging.info (f"Manifest does not exist, creating new manifest {manifest}")
+                        result = append_job_manifest (data           = data
+                                                    , schema         = schema
+                                                    , data_model_uri = data_model_uri
+                                                    , manifest       = manifest
+                                                    , manifest_name  = manifest_name
+                                                    , append_mode    = "initialise"
+                                                    , serialise_mode = serialise_mode
+                                                    , prefixes       = prefixes
+                                                    , data_hash      = data_hash
+                                                    , data_model     = data_model)
+            except TimeoutError as e:
+                print (e)
+                return (False)
             return (result)
         else:
             '''
@@ -283,17 +540,256 @@ def manifest_wrapper (data           : str
             print (f"Schema file {schema} does not exist!")
         return (prereq_check)
 
+def expand_data (pattern : str) -> list[str]:
+    '''
+    The data files matching the glob `pattern', or `pattern' itself if it
+    names a file, such as `data[1].csv', or matches nothing.
+    '''
+    if (isfile (pattern)):
+        return ([pattern])
+    return (sorted (glob (pattern)) or [pattern])
+
+def unique_pairs (pairs : list[tuple[str, str]]) -> list[tuple[str, str]]:
+    '''
+    `pairs' with each data file once, with the first schema given for it.
+    '''
+    seen = {}
+    for (data, schema) in pairs:
+        first = seen.setdefault (normpath (data), (data, schema))
+        if (first [1] != schema):
+            print (f"Data file {data} is given with schemata {first [1]} and {schema}, using {first [1]}")
+    return (list (seen.values ()))
+
+def read_mapping (mapping : str) -> list[tuple[str, str]]:
+    '''
+    Read a mapping file for batch mode: a CSV file without a header, each
+    row of which holds a data file (or glob pattern) and its schema.
+    Blank lines and lines starting with `#' are ignored.
+    '''
+    pairs = []
+    with open (mapping, "r", newline = "") as fp:
+        for row in csv.reader (fp, skipinitialspace = True):
+            if (not row or row [0].startswith ("#")):
+                continue
+            elif (len (row) != 2):
+                print (f"Ignoring line of mapping file {mapping} which is not `data,schema': {','.join (row)}")
+                continue
+            pairs.extend ((data, row [1]) for data in expand_data (row [0]))
+    return (pairs)
+
+def ingest_file (data       : str
+               , schema     : str
+               , validate   : bool
+               , max_errors : int                       = 1
+               , na_values  : Optional[Collection[str]] = None
+               , na_columns : Optional[Collection[str]] = None
+               , compress   : bool                      = False
+               , stats      : bool                      = False
+               , columnar   : bool                      = False) -> tuple[bool, Optional[str], float]:
+    '''
+    Validate and hash one data file of a batch, see `batch_wrapper',
+    returning whether it passed, its hash and the seconds it took.
+    '''
+    start = time.time ()
+    if (not (isfile (data) and isfile (schema))):
+        print (f"Data file {data} and schema file {schema} must exist!")
+        return (False, None, 0)
+    is_csv       = extension_helper (PurePath (data)) == "csv"
+    column_stats = TableStats () if stats and is_csv else None
+    if (validate and is_csv):
+        cache = columnar_writer (data, schema) if columnar else None
+        (valid, data_hash, _) = ingest_helper (data, schema, "TableSchema", max_errors = max_errors, na_values = na_values, na_columns = na_columns, compress = compress, columns = column_stats, cache = cache)
+    elif (validate and not validation_helper (data, schema, "TableSchema", max_errors = max_errors, na_values = na_values, na_columns = na_columns)):
+        (valid, data_hash) = (False, None)
+    else:
+        (valid, data_hash) = (True, file_hash (data))
+    if (valid and columnar and is_csv):
+        write_columnar (data, schema, data_hash, na_values = na_values, na_columns = na_columns)
+    if (valid and column_stats is not None):
+        if (not validate):
+            column_stats = table_stats (data, na_values = na_values, na_columns = na_columns)
+        write_stats (data, column_stats, data_hash)
+    return (valid, data_hash, time.time () - start)
+
+def batch_wrapper (pairs          : list[tuple[str, str]]
+                 , data_model_uri : str
+                 , manifest       : str
+                 , manifest_name  : str
+                 , validate       : bool
+                 , prefixes       : dict[str, str]
+                 , serialise_mode : str
+                 , workers        : Optional[int]             = None
+                 , max_errors     : int                       = 1
+                 , na_values      : Optional[Collection[str]] = None
+                 , na_columns     : Optional[Collection[str]] = None
+                 , canonical      : bool                      = False
+                 , compress       : bool                      = False
+                 , stats          : bool                      = False
+                 , columnar       : bool                      = False) -> bool:
+    '''
+    Add many data files, each given with its schema in `pairs', to the
+    manifest in one go. Validation is bound by the CPU, so the data files
+    are validated and hashed in `workers' processes, each read once for
+    both (and for a compressed copy, with `compress'). The data model is
+    loaded once, and the manifest written once, with the files which
+    passed. A data file given more than once is only added once. Reports how
+    each file fared, and the overall throughput. Returns `True' only if
+    every file passed and was added, not refused as already being in the
+    manifest. With `stats' set, each
+    CSV file's column statistics are written to its sidecar as well, and
+    with `columnar', its columnar copy.
+    '''
+    logging.debug (f"Called `batch_wrapper (pairs = {pairs}, data_model_uri = {data_model_uri}, manifest = {manifest}, manifest_name = {manifest_name}, validate = {validate}, prefixes = {prefixes}, serialise_mode = {serialise_mode}, workers = {workers}, max_errors = {max_errors}, na_values = {na_values}, na_columns = {na_columns}, canonical = {canonical}, compress = {compress}, stats = {stats}, columnar = {columnar})'")
+
+    pairs  = unique_pairs (pairs)
+    ingest = partial (ingest_file
+                    , validate   = validate
+                    , max_errors = max_errors
+                    , na_values  = na_values
+                    , na_columns = na_columns
+                    , compress   = compress
+                    , stats      = stats
+                    , columnar   = columnar)
+
+    start = time.time ()
+    print (f"Ingesting {len (pairs)} data files")
+    with ProcessPoolExecutor (max_workers = workers) as executor:
+        results = list (executor.map (ingest, [data for (data, _) in pairs], [schema for (_, schema) in pairs]))
+
+    elapsed    = time.time () - start
+    total_size = sum (getsize (data) for ((data, _), (ok, _, _)) in zip (pairs, results) if ok)
+    for ((data, schema), (ok, _, seconds)) in zip (pairs, results):
+        print (f"{'OK    ' if ok else 'FAILED'} {data} ({schema}) in {round (seconds, 2)}s")
+    passed = [(data, schema, data_hash) for ((data, schema), (ok, data_hash, _)) in zip (pairs, results) if ok]
+    print (f"{len (passed)} of {len (pairs)} data files passed in {round (elapsed, 2)}s: "
+           f"{round (len (pairs) / max (elapsed, 1e-6), 1)} files/s, {round (total_size / 1048576 / max (elapsed, 1e-6), 1)} MB/s")
+
+    if (not passed):
+        return (False)
+
+    if (is_fragmented (manifest)):
+        tables = [table_description (data, schema, data_hash) for (data, schema, data_hash) in passed]
+        return (all ([append_fragment (table, manifest, manifest_name) for table in tables]) and len (passed) == len (pairs))
+
+    py_data_model_view = data_model_helper (data_model_uri)
+    if (py_data_model_view is None):
+        return (False)
+
+    tables  = [table_description (data, schema, data_hash) for (data, schema, data_hash) in passed]
+    refused = 0
+    try:
+        with manifest_lock (manifest):
+            if (isfile (manifest)):
+                staging_manifest = load_manifest (manifest, serialise_mode, py_data_model_view)
+                if (staging_manifest is None):
+                    return (False)
+                index = ManifestIndex (staging_manifest)
+                for table in tables:
+                    if (not index.add_table (table)):
+                        print (f"Data-file {table.resource_path}, or a table named {table.atomic_name}, was already in the manifest, cannot add!")
+                        refused += 1
+                staging_manifest.local_version = __version__
+            else:
+                logging.info (f"Manifest does not exist, creating new manifest {manifest}")
+                staging_manifest = ManifestDesc (
+                      atomic_name   = manifest_name
+                    , tables        = tables
+                    , jobs          = [example_job (tables [0])]
+                    , local_version = __version__
+                )
+
+            result = dump_wrapper (py_obj          = staging_manifest
+                                 , data_model_view = py_data_model_view
+                                 , output_path     = PurePath (manifest)
+                                 , prefixes        = prefixes
+                                 , mode            = serialise_mode
+                                 , canonical       = canonical)
+            if (result):
+                print (job_table (staging_manifest, manifest, preamble = True))
+    except TimeoutError as e:
+        print (e)
+        return (False)
+    if (refused > 0):
+        print (f"{refused} of {len (pairs)} data files were not added to the manifest")
+    return (result and len (passed) == len (pairs) and refused == 0)
+
+def positive_int (value : str) -> int:
+    '''
+    Argument type for counts which must be at least one.
+    '''
+    number = int (value)
+    if (number < 1):
+        raise argparse.ArgumentTypeError (f"{value} is not a positive number")
+    return (number)
+
 def cli () -> None:
     print (f"This is fisdat version {__version__}")
     
     parser = argparse.ArgumentParser ("fisdat")
     verbgr = parser.add_mutually_exclusive_group (required = False)
-    parser.add_argument ("schema"  , help = "Schema file/URI (YAML)", type = str)
-    parser.add_argument ("csvfile" , help = "CSV data file", type = str)
-    parser.add_argument ("manifest", help = "Target manifest file (will overwrite)", type = str)
+    parser.add_argument ("schema"  , help = "Schema file/URI (YAML)", type = str, nargs = "?")
+    parser.add_argument ("csvfile" , help = "CSV data file, or a quoted glob pattern of several to add in one go", type = str, nargs = "?")
+    parser.add_argument ("manifest", help = "Target manifest file (will overwrite), or directory of manifest fragments (e.g. `manifest.d')", type = str)
+    parser.add_argument ("-m", "--mapping"
+                       , help     = "Add the data files in a CSV file of `data,schema' rows in one go, in place of `schema' and `csvfile'"
+                       , type     = str
+                       , default  = None)
+    parser.add_argument ("-j", "--workers"
+                       , help     = "Number of processes validating and hashing data files when adding several, one per CPU if not given"
+                       , type     = positive_int
+                       , default  = None)
     parser.add_argument ("-n", "--no-validate"
                        , help     = "Disable validation"
                        , action   = "store_true")
+    parser.add_argument ("-i", "--incremental"
+                       , help     = "Only validate rows appended since the data file was last validated, and update its hash in the manifest"
+                       , action   = "store_true")
+    parser.add_argument ("-t", "--tiered", "--fast-fail"
+                       , help     = "Check the header, then a sample of rows, before validating the whole file"
+                       , action   = "store_true")
+    parser.add_argument ("--sample-rows"
+                       , help     = "Number of rows to validate in the sampling tier of `--tiered' validation"
+                       , type     = positive_int
+                       , default  = 1000)
+    parser.add_argument ("--background"
+                       , help     = "Validate the whole file alongside hashing it, rather than before"
+                       , action   = "store_true")
+    parser.add_argument ("--max-errors"
+                       , help     = "Carry on validating after the first error, collecting at most this many errors"
+                       , type     = positive_int
+                       , default  = 1)
+    parser.add_argument ("--error-report"
+                       , help     = "Write all validation errors found, with their positions, to this JSON file"
+                       , type     = str
+                       , default  = None)
+    parser.add_argument ("--na-values"
+                       , help     = "Treat these tokens as missing values when validating, or common ones (NA, #N/A, NULL, &c.) if none are given"
+                       , type     = str
+                       , nargs    = "*"
+                       , default  = None)
+    parser.add_argument ("--na-columns"
+                       , help     = "Only treat `--na-values' tokens as missing in these columns"
+                       , type     = str
+                       , nargs    = "+"
+                       , default  = None)
+    parser.add_argument ("-p", "--projected"
+                       , help     = "Only validate in full the columns used by jobs in the manifest, checking the structure of the rest"
+                       , action   = "store_true")
+    parser.add_argument ("--canonical"
+                       , help     = "Write the whole manifest in its canonical form (tables, jobs and scopes sorted, names normalised), so the same content gives the same bytes"
+                       , action   = "store_true")
+    parser.add_argument ("--compressed-copy"
+                       , help     = "Write a gzip-compressed copy of each CSV data file (e.g. `data.csv.gz') while validating and hashing it"
+                       , action   = "store_true")
+    parser.add_argument ("--stats"
+                       , help     = "Write statistics of each column of a CSV data file (counts, range, mean, variance, most common values) to a sidecar (e.g. `data.csv.stats.json') uploaded with it"
+                       , action   = "store_true")
+    parser.add_argument ("--columnar"
+                       , help     = "Write a typed columnar copy of each CSV data file (under `.columnar/'), which `fisdat.columnar.open_columns' memory-maps"
+                       , action   = "store_true")
+    parser.add_argument ("--rewrite"
+                       , help     = "Load and rewrite the whole manifest when adding to it, rather than adding the new table in place"
+                       , action   = "store_true")
     parser.add_argument ("--data-model-uri", "--data-model"
                        , help     = "Data model YAML specification URI"
                        , default  = "https://marine.gov.scot/metadata/saved/schema/meta.yaml")
@@ -326,10 +822,39 @@ def cli () -> None:
     logging.basicConfig (level  = args.log_level
                        , format = "%(levelname)s [%(asctime)s] [`%(filename)s\' `%(funcName)s\' (l.%(lineno)d)] ``%(message)s\'\'")
 
+    if (args.na_values is not None and len (args.na_values) == 0):
+        args.na_values = NA_VALUES
+
     prefixes = { "_base": args.base_prefix
                , "rap"  : "https://marine.gov.scot/metadata/saved/rap/"
                , "saved": "https://marine.gov.scot/metadata/saved/schema/" }
 
+    if (args.mapping is None and (args.schema is None or args.csvfile is None)):
+        parser.error ("the schema, csvfile and manifest arguments are required, unless `--mapping' is given")
+
+    if (args.mapping is not None or (not isfile (args.csvfile) and any (c in args.csvfile for c in "*?["))):
+        if (args.incremental or args.tiered or args.projected or args.error_report):
+            print ("Note: `--incremental', `--tiered', `--projected' and `--error-report' are not used when adding several data files")
+        pairs = read_mapping (args.mapping) if args.mapping is not None else [(k, args.schema) for k in expand_data (args.csvfile)]
+        added = batch_wrapper (pairs          = pairs
+                             , data_model_uri = args.data_model_uri
+                             , manifest       = args.manifest
+                             , manifest_name  = args.manifest_name
+                             , validate       = not args.no_validate
+                             , prefixes       = prefixes
+                             , serialise_mode = args.manifest_format
+                             , workers        = args.workers
+                             , max_errors     = args.max_errors
+                             , na_values      = args.na_values
+                             , na_columns     = args.na_columns
+                             , canonical      = args.canonical
+                             , compress       = args.compressed_copy
+                             , stats          = args.stats
+                             , columnar       = args.columnar)
+        if (not added):
+            sys.exit (1)
+        return
+
     manifest_wrapper (data           = args.csvfile
                     , schema         = args.schema
                     , data_model_uri = args.data_model_uri
@@ -337,5 +862,19 @@ def cli () -> None:
                     , manifest_name  = args.manifest_name
                     , validate       = not args.no_validate
                     , prefixes       = prefixes
-                    , serialise_mode = args.manifest_format)
+                    , serialise_mode = args.manifest_format
+                    , incremental    = args.incremental
+                    , fast_fail      = args.tiered
+                    , sample_rows    = args.sample_rows
+                    , background     = args.background
+                    , max_errors     = args.max_errors
+                    , error_report   = args.error_report
+                    , na_values      = args.na_values
+                    , na_columns     = args.na_columns
+                    , projected      = args.projected
+                    , rewrite        = args.rewrite
+                    , canonical      = args.canonical
+                    , compress       = args.compressed_copy
+                    , stats          = args.stats
+                    , columnar       = args.columnar)
 
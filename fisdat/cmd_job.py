@@ -1,15 +1,19 @@
 import argparse
 from itertools  import chain
-from os.path    import isfile
+from os.path    import isdir, isfile
 import logging
+from typing     import Optional
 
-from linkml_runtime.loaders          import RDFLibLoader, YAMLLoader
+from linkml_runtime.loaders          import YAMLLoader
 from linkml_runtime.dumpers          import YAMLDumper  , RDFLibDumper
 from linkml_runtime.utils.schemaview import SchemaView
 
 #from fisdat            import __version__, __commit__
 from fisdat.utils      import validation_helper
 from fisdat.data_model import ManifestDesc
+from fisdat.fragments  import JOBS, fragment_names, merge_fragments
+from fisdat.index      import ManifestIndex
+from fisdat.turtle     import turtle_loader, turtle_wrapper
 
 import pkg_resources
 __version__ = pkg_resources.require("fisdat")[0].version
@@ -37,13 +41,10 @@ def manifest_to_template (manifest       : str
     logging.debug (f"Called `generate_manifest_template (manifest = {manifest}, template = {template}, data_model_uri = {data_model_uri})'")
     py_data_model_view = SchemaView (data_model_uri)
 
-    loader = RDFLibLoader ()
-    dumper = YAMLDumper   ()
+    dumper = YAMLDumper ()
 
     logging.info ("Loading manifest")
-    staging_manifest = loader.load (source       = manifest
-                                  , target_class = ManifestDesc
-                                  , schemaview   = py_data_model_view)
+    staging_manifest = turtle_loader (manifest, py_data_model_view)
     
     logging.info (f"Dumping manifest to {template}")
     dumper.dump (staging_manifest, template)
@@ -53,10 +54,15 @@ def manifest_to_template (manifest       : str
 def template_to_manifest (template       : str
                         , manifest       : str
                         , data_model_uri : str
-                        , prefixes       : dict[str,str]) -> bool:
+                        , prefixes       : dict[str,str]
+                        , jobs           : Optional[list[str]] = None) -> bool:
     '''
     Generate a turtle manifest from an editable template
 
+    The template may also be a directory of manifest fragments, in which
+    case only the fragments needed are merged: those of `jobs', and the
+    tables their scopes refer to, or all of them if `jobs' isn't given.
+
     While the LinkML validation functions + command-line tools don't seem
     to trip up up on duplicate identifiers, the conversion scripts do. In
     this function, this would concern the call to the loader's `load()'
@@ -70,23 +76,39 @@ def template_to_manifest (template       : str
     For example, a table description with the identifier (`atomic_name')
     `sampling' is equivalent to `saved:sampling', and this will be
     serialised back to turtle silently dropping all duplicates excepting
-    the first.
+    the first. So repeated names are looked for, and refused, before
+    dumping.
     '''
-    logging.debug (f"Called `template_to_manifest (manifest = {manifest}, template = {template}, data_model_uri = {data_model_uri})'")
+    logging.debug (f"Called `template_to_manifest (manifest = {manifest}, template = {template}, data_model_uri = {data_model_uri}, jobs = {jobs})'")
+
+    unknown = [k for k in (jobs or []) if isdir (template) and k not in fragment_names (template, JOBS)]
+    if (unknown):
+        print (f"Job(s) {', '.join (unknown)} not in manifest fragments {template}!")
+        return (False)
     
     py_data_model_view  = SchemaView (data_model_uri)
         
     loader = YAMLLoader   ()
-    dumper = RDFLibDumper ()
 
-    logging.info ("Loading template file")
-    staging_template = loader.load (source       = template
-                                      , target_class = ManifestDesc)
+    if (isdir (template)):
+        logging.info ("Merging template fragments")
+        try:
+            staging_template = merge_fragments (template, jobs)
+        except FileNotFoundError as e:
+            # A job's scope refers to a table with no fragment
+            print (f"Manifest fragment {e.filename} does not exist!")
+            return (False)
+    else:
+        logging.info ("Loading template file")
+        staging_template = loader.load (source       = template
+                                          , target_class = ManifestDesc)
+
+    if (not ManifestIndex (staging_template).report (template)):
+        return (False)
 
     logging.info (f"Dumping template to {manifest}")
-    dumper.dump (staging_template, manifest
-                 , schemaview = py_data_model_view
-                 , prefix_map = prefixes)
+    turtle_wrapper (staging_template, manifest, py_data_model_view, prefixes)
+    return (True)
 
 def cli () -> None:
     print (f"This is fisjob version {__version__}")
@@ -116,6 +138,10 @@ def cli () -> None:
     parser.add_argument ("--base-prefix"
                        , help    = "@base prefix from which job manifest, job results, data and descriptive statistics may be served."
                        , default = "https://marine.gov.scot/metadata/saved/rap/")
+    parser.add_argument ("--jobs"
+                       , help  = "With a directory of manifest fragments as input, only include these jobs and the tables they use"
+                       , nargs = "+"
+                       , type  = str)
     verbgr.add_argument ("-v", "--verbose"
                        , help     = "Show more information about current running state"
                        , required = False
@@ -151,7 +177,7 @@ def cli () -> None:
     else:
         print (f"Converting editable YAML template {args.input} to RDF/TTL job manifest {args.output}")
         
-        if (not (isfile (args.input))):
+        if (not (isfile (args.input) or isdir (args.input))):
             print (f"Input editable YAML template {args.input} does not exist!")
         elif (isfile (args.output) and not (args.force)):
             print (f"Output RDF/TTL manifest {args.output} already exists. Overwrite by passing the -f flag.")
@@ -163,6 +189,7 @@ def cli () -> None:
             res_bool = template_to_manifest (template       = args.input
                                            , manifest       = args.output
                                            , data_model_uri = args.data_model_uri
-                                           , prefixes       = prefixes)
+                                           , prefixes       = prefixes
+                                           , jobs           = args.jobs)
             if (res_bool):
                 print (f"Converted editable YAML template {args.input} to RDF/TTL job manifest {args.output}")        
@@ -1,15 +1,14 @@
 from datetime          import datetime
-from google.cloud      import storage
 from google.cloud      import client as gc
-from hashlib           import sha384
 import argparse
 import codecs
-import copy
+import dataclasses
+from functools import partial
 import logging
-from os.path import isfile
+from os.path import getsize, isdir, isfile
 from pathlib import PurePath
 import time
-from typing import Optional
+from typing import Callable, Collection, Optional
 import uuid
 
 import rdflib.plugins.parsers.notation3
@@ -19,11 +18,24 @@ import yaml.scanner
 from linkml.generators.rdfgen        import RDFGenerator
 from linkml.utils.schemaloader       import SchemaLoader
 from linkml_runtime.dumpers          import RDFLibDumper, YAMLDumper
-from linkml_runtime.loaders          import RDFLibLoader, YAMLLoader
+from linkml_runtime.loaders          import YAMLLoader
 from linkml_runtime.utils.schemaview import SchemaView
 
-from fisdat.utils      import extension_helper, prefix_helper, job_table
-from fisdat.data_model import TableDesc, ManifestDesc
+from fisdat.utils       import extension_helper, prefix_helper, job_table
+from fisdat.bundle      import bundle_fingerprint, load_record, save_record, unchanged_bundle
+from fisdat.canonical   import canonical_manifest
+from fisdat.chunking    import index_name, upload_chunked
+from fisdat.commit      import commit_order, write_marker
+from fisdat.data_model  import TableDesc, ManifestDesc
+from fisdat.delta       import chunked_objects, reuse_plan
+from fisdat.fragments   import merge_to_file
+from fisdat.incremental import file_hash
+from fisdat.index       import ManifestIndex
+from fisdat.packing     import PACK, pack_files, small_files, unique_files
+from fisdat.pipeline    import JOBS, Pipeline
+from fisdat.stats       import stats_path, table_sidecar
+from fisdat.storage     import Storage, open_storage, url_path
+from fisdat.turtle      import turtle_loader, turtle_wrapper
 
 import pkg_resources
 __version__ = pkg_resources.require("fisdat")[0].version
@@ -31,39 +43,102 @@ __version__ = pkg_resources.require("fisdat")[0].version
 ## data read/write buffer size, 1MB
 BUFSIZ=1048576
 
+def bundle_path (args    : [str]
+                , owner   : str
+                , ts      : str
+                , jobuuid : str) -> str:
+    gen_path = lambda owner, ts, extra : owner + "/" + ts + "/" + extra
+    return (gen_path (owner, ts, args.directory) if args.directory is not None else gen_path (owner, ts, jobuuid))
+
+def upload_file (bucket  : Storage
+               , path    : str
+               , fname   : str
+               , dry_run : bool
+               , reuse   : Optional[dict[str, str]] = None
+               , chunked : Collection[str]          = ()) -> None:
+    '''
+    Upload `fname' to the bundle at `path', copying it within the bucket
+    if it is in `reuse', or in chunks if it is in `chunked'. A file in
+    both is copied from a chunk index, see `chunked_objects'.
+    '''
+    reuse  = reuse or {}
+    fpath  = path + "/" + fname
+    target = index_name (fpath) if fname in chunked else fpath
+    if (dry_run):
+        if (fname in chunked and fname not in reuse):
+            print (f"Would upload in chunks to {bucket.url (target)} ...")
+        else:
+            print (f"Would {'copy' if fname in reuse else 'upload'} to {bucket.url (target)} ...")
+        return
+    start = time.time ()
+    if (fname in reuse):
+        print (f"Copying {bucket.url (reuse [fname])} to {bucket.url (target)} ...")
+        bucket.copy (reuse [fname], target)
+    elif (fname in chunked):
+        print (f"Uploading {bucket.url (index_name (fpath))} in chunks ...")
+        (count, uploaded) = upload_chunked (bucket, fname, index_name (fpath))
+        print (f"Uploaded {uploaded} of {count} chunks of {fname}, the rest were already uploaded")
+    else:
+        print (f"Uploading {bucket.url (fpath)} ...")
+        bucket.upload (fname, fpath)
+    end = time.time ()
+    abs_time = end - start
+    if (abs_time < 1):
+        elapsed = round (abs_time, 2)
+    else:
+        elapsed = round (abs_time)
+    print (f"{'Copied' if fname in reuse else 'Uploaded'} {fname} in {elapsed}s")
+
 def upload_files (args    : [str]
                 , files   : [str]
                 , owner   : str
                 , ts      : str
-                , dry_run : bool) -> str:
-    logging.debug (f"Called `upload_files (args = {args}, files = {files}, owner = {owner}, ts = {ts})'")
+                , dry_run : bool
+                , reuse   : Optional[dict[str, str]] = None
+                , chunked : Collection[str]          = ()
+                , pack    : Optional[int]            = None
+                , jobuuid : Optional[str]            = None
+                , tables  : list[TableDesc]          = ()) -> tuple[str, str]:
+    '''
+    Upload `files' to a new bundle in the bucket `args.bucket', or to the
+    bundle `jobuuid' if given. Those in `reuse' are copied from the
+    objects it gives, within the bucket, rather than uploaded. Those in
+    `chunked' are uploaded in chunks, with a chunk index in place of the
+    file, see `fisdat.chunking', unless copied from a whole object. With
+    `pack' set, the rest of those smaller than `pack' bytes are packed
+    into one archive, see `fisdat.packing'. The files of each of `tables'
+    are uploaded first, each table followed by its completion marker, and
+    the rest, such as the manifests and index, last, see `fisdat.commit'.
+    Returns the bundle's UUID and its URL.
+    '''
+    logging.debug (f"Called `upload_files (args = {args}, files = {files}, owner = {owner}, ts = {ts}, reuse = {reuse}, chunked = {chunked}, pack = {pack}, jobuuid = {jobuuid}, tables = {len (tables)})'")
     
-    gen_path = lambda owner, ts, extra : owner + "/" + ts + "/" + extra
-    client   = storage.Client()
-    bucket   = client.bucket(args.bucket)
-    jobuuid  = str(uuid.uuid1())
-    path     = gen_path (owner, ts, args.directory) if args.directory is not None else gen_path (owner, ts, jobuuid)
-    if (not dry_run):
-        for fname in files:
-            if fname is not None:
-                fpath = path + "/" + fname
-                print (f"Uploading gs://{args.bucket}/{fpath} ...")
-                start = time.time ()
-                blob = bucket.blob(fpath)
-                blob.upload_from_filename (fname, timeout=86400)
-                end = time.time ()
-                abs_time = end - start
-                if (abs_time < 1):
-                    elapsed = round (abs_time, 2)
-                else:
-                    elapsed = round (abs_time)
-                print (f"Uploaded {fname} in {elapsed}s")
-    else:
-        for fname in files:
-            if fname is not None:
-                fpath = path + "/" + fname
-                print (f"Would upload to gs://{args.bucket}/{fpath} ...")
-    return (jobuuid, f"gs://{args.bucket}/{path}")
+    bucket   = open_storage (args.bucket)
+    jobuuid  = jobuuid or str(uuid.uuid1())
+    path     = bundle_path (args, owner, ts, jobuuid)
+    reuse    = reuse or {}
+    chunked  = chunked_objects (chunked, reuse)
+    files    = unique_files (files)
+    packed   = [] if pack is None else [k for k in small_files (files, pack) if k not in reuse and k not in chunked]
+    if (len (packed) < 2):
+        packed = []
+    in_pack  = []
+    for (table, group) in commit_order (tables, files):
+        for fname in group:
+            if (fname not in packed):
+                upload_file (bucket, path, fname, dry_run, reuse, chunked)
+        if (table is not None and any (k in packed for k in group)):
+            in_pack.append (table)
+        elif (table is not None):
+            write_marker (bucket, path, table, dry_run, chunked)
+    if (packed and dry_run):
+        print (f"Would upload to {bucket.url (path + '/' + PACK)}, packing {', '.join (packed)} ...")
+    elif (packed):
+        print (f"Uploading {bucket.url (path + '/' + PACK)}, packing {', '.join (packed)} ...")
+        bucket.write (pack_files (packed), path + "/" + PACK)
+    for table in in_pack:
+        write_marker (bucket, path, table, dry_run, chunked)
+    return (jobuuid, bucket.url (path))
 
 def source () -> str:
     logging.debug ("Called `source()'")
@@ -197,6 +272,9 @@ def coalesce_table (tab      : TableDesc
                   , convert  : bool
                   , stem     : str) -> (bool, TableDesc):
     '''
+    Check the data file of `tab' against its hash and convert its schema
+    to turtle. `tab' itself is left as it is: if the schema is converted,
+    a new table with the turtle schema path is returned in its place.
     '''
     logging.debug (f"Called `coalesce_table (tab = {tab}, fake_cwd = {fake_cwd}, force = {force}, convert = {convert}, stem = {stem})'")
     
@@ -208,13 +286,12 @@ def coalesce_table (tab      : TableDesc
         print (f"Error: target file {fake_table_uri} does not exist!")
         return (False, tab)
     else:
-        with open (fake_table_uri, "rb") as fp:
-            data = fp.read ()
-            hash = sha384  (data)
-                
-            if hash.hexdigest() != tab.resource_hash:
-                print (f"{fake_table_uri} has changed, please revalidate with `fisdat'")
-                return (False, tab)
+        if file_hash (fake_table_uri) != tab.resource_hash:
+            print (f"{fake_table_uri} has changed, please revalidate with `fisdat'")
+            return (False, tab)
+        sidecar = f"{fake_cwd}{stats_path (str (table_uri))}"
+        if (isfile (sidecar) and table_sidecar (tab, fake_cwd) is None):
+            print (f"Warning: statistics {sidecar} are out of date with {fake_table_uri}, not uploading them, rerun `fisdat' with `--stats' to update them")
         if convert:
             '''
             Setting force=True always is a hack for now because without
@@ -235,8 +312,8 @@ def coalesce_table (tab      : TableDesc
                                                         , quiet            = True
                                                         , conversion_stem  = stem)
             if (schema_success):
-                tab.schema_path_ttl = path_ttl.name
-            return (schema_success, tab)
+                return (True, dataclasses.replace (tab, schema_path_ttl = path_ttl.name))
+            return (False, tab)
         else:
             # Should return True here as manifest conversion is feasible
             # but we've just not subbed in the TTL conversion filename
@@ -253,6 +330,7 @@ def coalesce_manifest (manifest_path   : str
                      , convert_schema  : bool = True
                      , conversion_stem : str  = "converted"
                      , fake_cwd        : str  = ""
+                     , table_stage     : Optional[Callable] = None
     ) -> (bool, Optional[ManifestDesc], Optional[PurePath], Optional[PurePath], Optional[str]):
     '''
     The YAML files are provided and edited locally, but we can't process
@@ -269,16 +347,25 @@ def coalesce_manifest (manifest_path   : str
     4. Validate/convert tables in the manifest file, providing that
        neither `dry_run' is set nor `validate' is unset.
     5. Convert the manifest file to TTL
+
+    Step 4 is done by `table_stage', if given, which takes the manifest,
+    `fake_cwd' and `force', and gives whether each table succeeded and
+    the converted tables, such as `pipeline_tables', which uploads them
+    as it goes.
     '''
     logging.debug (f"Called `coalesce_manifest (manifest_path = {manifest_path}, data_model_uri = {data_model_uri}, prefixes = {prefixes}, gcp_source = {gcp_source})'")
 
     dumper_ttl = RDFLibDumper ()
     dumper_yml = YAMLDumper ()
-    loader_ttl = RDFLibLoader ()
     loader_yml = YAMLLoader ()
     '''
     1. Initial validation of arguments
+       A fragmented manifest is first merged into a single YAML manifest
     '''
+    if (isdir (manifest_path)):
+        manifest_path   = str (merge_to_file (manifest_path))
+        manifest_format = "yaml"
+
     if not isfile (manifest_path):
         print (f"Manifest file {manifest_path} does not exist!")
         return (False, None, None, None, None)
@@ -297,9 +384,7 @@ def coalesce_manifest (manifest_path   : str
     '''
     if (manifest_format == "ttl"):
         try:
-            manifest_obj = loader_ttl.load (source       = manifest_path
-                                          , target_class = ManifestDesc
-                                          , schemaview   = py_data_model_view)
+            manifest_obj = turtle_loader (manifest_path, py_data_model_view)
             (annotated_feasible, annotated_path_ttl) = convert_feasibility (
                 input_path = PurePath (manifest_path)
               , target_ext = "annotated.ttl"
@@ -348,15 +433,21 @@ def coalesce_manifest (manifest_path   : str
     4. Validate/convert tables in manifest file
 
     This bit is really annoying in the sense that we want to only update
-    the tables if all the schema converted successfully. Running the map
-    over the list is effectual so need to use the .copy() method to
-    create a new, isolated list.
+    the tables if all the schema converted successfully. Each table is
+    left as it is and a new one made where the schema is converted, so
+    the new tables are swapped in together only if all succeed.
     '''
+    if (manifest_feasible and not ManifestIndex (manifest_obj).report (manifest_path)):
+        print (f"Tables and jobs in manifest {manifest_path} must have unique names")
+        manifest_feasible = False
+
     if (manifest_feasible):
         logging.debug (f"Original manifest tables: {manifest_obj.tables}")
-        copied_obj   = copy.deepcopy (manifest_obj)
-        rough_tables = map (lambda t : coalesce_table(t, fake_cwd, dry_run, force, convert_schema, conversion_stem), copied_obj.tables)
-        tables_signals, tables_results = zip(*rough_tables)
+        if (table_stage is None):
+            rough_tables = map (lambda t : coalesce_table(t, fake_cwd, dry_run, force, convert_schema, conversion_stem), manifest_obj.tables)
+            tables_signals, tables_results = zip(*rough_tables)
+        else:
+            tables_signals, tables_results = table_stage (manifest_obj, fake_cwd, force)
         logging.debug (f"Table signals: {tables_signals}")
         logging.debug (f"Table results: {tables_results}")
 
@@ -382,18 +473,15 @@ def coalesce_manifest (manifest_path   : str
             print (f"Conversion of manifest from YAML {manifest_path_yaml} to TTL {manifest_path_ttl} would not have been feasible!")
     
     elif (manifest_feasible):
-        dumper_ttl = RDFLibDumper()
-        dumper_yml = YAMLDumper()
+        # Written in canonical form, so the same bundle gives the same bytes
+        manifest_obj = canonical_manifest (manifest_obj, prefixes)
+        dumper_yml   = YAMLDumper()
         if (manifest_format == "ttl"):
             dumper_yml.dump (manifest_obj, manifest_path_yaml)
-            dumper_ttl.dump (manifest_obj, manifest_path_ttl
-                           , schemaview = py_data_model_view
-                           , prefix_map = prefixes)
+            turtle_wrapper (manifest_obj, manifest_path_ttl, py_data_model_view, prefixes)
             return (True, manifest_obj, manifest_path_yaml, manifest_path_ttl, manifest_uri)
         else:
-            dumper_ttl.dump (manifest_obj, manifest_path_ttl
-                           , schemaview = py_data_model_view
-                           , prefix_map = prefixes)   
+            turtle_wrapper (manifest_obj, manifest_path_ttl, py_data_model_view, prefixes)
         print (job_table (manifest_obj, preamble = False, mode = 'r'))
     
     else:
@@ -405,6 +493,60 @@ def coalesce_manifest (manifest_path   : str
     return (manifest_feasible, manifest_obj, manifest_path_yaml, manifest_path_ttl, manifest_uri)
         
     
+def based_on_plan (args : [str], manifest_obj : ManifestDesc, files : list[str]) -> Optional[dict[str, str]]:
+    '''
+    Which of `files' to copy from the bundle `args.based_on', if given.
+    The bundle's bucket and path are those recorded when it was uploaded,
+    if it was the last upload of this manifest, see `fisdat.bundle'.
+    '''
+    if (args.based_on is None):
+        return (None)
+    record = load_record (args.manifest)
+    if (record is not None and record.get ("url") == args.based_on and "path" in record):
+        (based_bucket, based_path) = (record ["bucket"], record ["path"])
+    else:
+        (based_bucket, based_path) = (args.bucket, url_path (args.based_on, args.bucket))
+    if (based_bucket != args.bucket or based_path is None):
+        print (f"Bundle {args.based_on} is not in bucket {args.bucket}, uploading every file")
+        return (None)
+    reuse = reuse_plan (open_storage (args.bucket), based_path, args.index, manifest_obj, files)
+    print (f"{len (reuse)} files are unchanged since bundle {args.based_on}, and will be copied from it")
+    return (reuse)
+
+def chunked_files (args : [str], resources : list[str]) -> list[str]:
+    return ([] if args.chunked is None else [str (k) for k in resources if getsize (k) >= args.chunked * 1048576])
+
+def pipeline_tables (args           : [str]
+                   , path           : str
+                   , dry_run        : bool
+                   , no_upload      : bool
+                   , convert_schema : bool
+                   , manifest_obj   : ManifestDesc
+                   , fake_cwd       : str  = ""
+                   , force          : bool = False) -> (tuple[bool], tuple[TableDesc]):
+    '''
+    Check and convert the tables of `manifest_obj', uploading each to the
+    bundle at `path' as soon as it is ready, see `fisdat.pipeline'.
+    Converted turtle schemata are always uploaded, rather than copied
+    from `--based-on', and always overwritten, as by `coalesce_table'.
+    '''
+    logging.debug (f"Called `pipeline_tables (path = {path}, dry_run = {dry_run}, no_upload = {no_upload}, convert_schema = {convert_schema}, fake_cwd = {fake_cwd}, force = {force})'")
+    resources = [str (table.resource_path)    for table in manifest_obj.tables]
+    schemata  = [str (table.schema_path_yaml) for table in manifest_obj.tables]
+    stats     = [table_sidecar (table)        for table in manifest_obj.tables]
+    reuse     = based_on_plan (args, manifest_obj, resources + schemata + stats)
+    chunked   = chunked_objects (chunked_files (args, resources), reuse or {})
+    bucket    = open_storage (args.bucket)
+    # Overwriting the turtle schema left by an earlier run, as `coalesce_table' does
+    convert   = partial (coalesce_schema, dry_run = dry_run, force = True, quiet = True) if convert_schema else None
+    pipeline  = Pipeline (check    = partial (coalesce_table, fake_cwd = fake_cwd, dry_run = dry_run, force = force, convert = False, stem = "converted")
+                        , convert  = convert
+                        , transfer = partial (upload_file, bucket, path, dry_run = no_upload, reuse = reuse, chunked = chunked)
+                        , complete = partial (write_marker, bucket, path, dry_run = no_upload, chunked = chunked)
+                        , fake_cwd = fake_cwd
+                        , jobs     = args.pipeline)
+    return (pipeline.coalesce_tables (manifest_obj.tables))
+
 def cli () -> None:
     """
     Command line interface
@@ -421,14 +563,31 @@ def cli () -> None:
                        , help="Disable SSL validation")
     parser.add_argument ("-b", "--bucket"
                        , default="saved-fisdat"
-                       , help="Bucket to upload into")
+                       , help="Bucket to upload into, or a `file://' URL of a directory to use instead")
+    parser.add_argument ("--chunked"
+                       , help     = "Upload data files of this many MB or more (64 if not given) in chunks, only uploading chunks not already in the bucket"
+                       , type     = float
+                       , nargs    = "?"
+                       , const    = 64)
+    parser.add_argument ("--pack"
+                       , help     = "Pack files smaller than this many kB (1024 if not given), such as the manifests, index and schemata, into one archive to upload"
+                       , type     = float
+                       , nargs    = "?"
+                       , const    = 1024)
+    parser.add_argument ("--pipeline"
+                       , help     = f"Upload each table as soon as it has been checked, while the rest are still being checked, this many at a time ({JOBS} if not given), then the manifests and index last"
+                       , type     = int
+                       , nargs    = "?"
+                       , const    = JOBS)
+    parser.add_argument ("--based-on"
+                       , help     = "URL of an earlier bundle in the same bucket (as printed when it was uploaded), copying files unchanged since rather than uploading them")
     parser.add_argument ("-d", "--directory"
                        , help="Directory within bucket to upload into"
                        , default = None)
     parser.add_argument ("-s", "--source"
                        , help="Data source email"
                        , default = None)
-    parser.add_argument ("manifest", help="Manifest file")
+    parser.add_argument ("manifest", help="Manifest file, or directory of manifest fragments")
     parser.add_argument ("--index"
                        , help = "Name of hidden index file recording manifest file name"
                        , default = ".index")
@@ -459,6 +618,10 @@ def cli () -> None:
                        , help = "Forcibly overwrite files in case of conflicts"
                        , action = "store_true"
                        , default = False)
+    parser.add_argument ("--reupload"
+                       , help     = "Upload the bundle even if nothing has changed since it was last uploaded"
+                       , action   = "store_true"
+                       , default  = False)
     verbgr.add_argument ("-v", "--verbose"
                        , help     = "Show more information about current running state"
                        , required = False
@@ -505,6 +668,37 @@ def cli () -> None:
     dry_run        = args.dry_run
     no_upload      = args.dry_run or args.no_upload
 
+    '''
+    If nothing has changed since the bundle was last uploaded, say where
+    it is rather than converting and uploading it all again
+    '''
+    options     = { "bucket"          : args.bucket
+                  , "directory"       : args.directory
+                  , "source"          : data_source_email
+                  , "index"           : args.index
+                  , "data_model_uri"  : args.data_model_uri
+                  , "manifest_format" : args.manifest_format
+                  , "base_prefix"     : args.base_prefix
+                  , "convert_schema"  : convert_schema
+                  , "chunked"         : args.chunked
+                  , "pack"            : args.pack
+                  , "pipeline"        : args.pipeline
+                  , "based_on"        : args.based_on }
+    fingerprint = None if (no_upload or args.reupload) else bundle_fingerprint (args.manifest, args.manifest_format, prefixes, options)
+    record      = unchanged_bundle (args.manifest, fingerprint)
+    if (record is not None):
+        print (f"Nothing has changed since your data/job set/bundle was uploaded to {record ['url']}, not uploading it again (`--reupload' option to upload anyway)")
+        return
+
+    time_stamp  = datetime.today ().strftime ('%Y%m%d')
+    short_name  = data_source_email.split ('@') [0]
+    pack        = None if args.pack is None else int (args.pack * 1024)
+    jobuuid     = None
+    table_stage = None
+    if (args.pipeline is not None):
+        jobuuid     = str (uuid.uuid1 ())
+        table_stage = partial (pipeline_tables, args, bundle_path (args, short_name, time_stamp, jobuuid), dry_run, no_upload, convert_schema)
+
     (test_signal, manifest_obj, manifest_yaml, manifest_ttl, manifest_uri) = coalesce_manifest (
             manifest_path   = args.manifest
           , manifest_format = args.manifest_format
@@ -514,6 +708,7 @@ def cli () -> None:
           , dry_run         = dry_run
           , convert_schema  = convert_schema
           , force           = args.force
+          , table_stage     = table_stage
         )
     
     if (test_signal):
@@ -527,18 +722,24 @@ def cli () -> None:
         resources     = [table.resource_path    for table in manifest_obj.tables]
         schemata_ttl  = [table.schema_path_ttl  for table in manifest_obj.tables]
         schemata_yaml = [table.schema_path_yaml for table in manifest_obj.tables]
-        time_stamp    = datetime.today ().strftime ('%Y%m%d')
-        short_name    = data_source_email.split ('@') [0]
+        stats         = [table_sidecar (table)  for table in manifest_obj.tables]
 
-        staging_files = [str (manifest_yaml)
-                       , str (manifest_ttl)
-                       , index] + resources + schemata_yaml + schemata_ttl
-        
-        uuid, url = upload_files (args, staging_files, short_name, time_stamp, no_upload)
+        if (table_stage is not None):
+            # The tables are uploaded already, so the manifests and index complete the bundle
+            jobuuid, url = upload_files (args, [str (manifest_yaml), str (manifest_ttl), index], short_name, time_stamp, no_upload, pack = pack, jobuuid = jobuuid)
+        else:
+            staging_files = [str (manifest_yaml)
+                           , str (manifest_ttl)
+                           , index] + resources + schemata_yaml + schemata_ttl + stats
+            reuse         = based_on_plan (args, manifest_obj, resources + schemata_yaml + schemata_ttl + stats)
+            chunked       = chunked_files (args, resources)
+            jobuuid, url = upload_files (args, staging_files, short_name, time_stamp, no_upload, reuse, chunked, pack, tables = manifest_obj.tables)
 
         if (no_upload):
             print(f"Would have uploaded your data/job set/bundle to {url}")
         else:
             print(f"Successfully uploaded your data/job set/bundle to {url}")
-            print(f"Result should, within the next 5-10 minutes, appear at {tmploc}/rap/{uuid}/")
+            if (fingerprint is not None):
+                save_record (args.manifest, fingerprint, jobuuid, url, args.bucket, bundle_path (args, short_name, time_stamp, jobuuid))
+            print(f"Result should, within the next 5-10 minutes, appear at {tmploc}/rap/{jobuuid}/")
 
@@ -0,0 +1,402 @@
+import ast
+from array import array
+import json
+import logging
+import mmap
+import os
+from os.path import dirname, isdir, isfile, join
+from pathlib import PurePath
+import shutil
+import struct
+import sys
+import tempfile
+from typing  import Collection, Iterator, Optional, Sequence
+
+from linkml_runtime.linkml_model     import SchemaDefinition
+from linkml_runtime.loaders          import yaml_loader
+from linkml_runtime.utils.schemaview import SchemaView
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from fisdat.stats  import StatsLoader
+from fisdat.stream import CsvStreamLoader
+from fisdat.utils  import UMASK
+
+'''
+Columnar cache of validated tables.
+
+Reading a table means parsing its CSV text, every time. With
+`--columnar', `fisdat' also writes a typed copy of the table, one file
+per column, into `.columnar/<resource_hash>/' next to the data file, from
+the same read which validates it (see `fisdat.ingest'). Since it is
+keyed by the hash of the data, a copy is never stale: a changed file has
+a new hash, and so a new copy.
+
+The type of each column comes from the range of its slot in the schema:
+integers as 64-bit integers, floats, doubles and decimals as 64-bit
+floats, booleans as bytes, and everything else as UTF-8 text. Numbers
+are `.npy' files, which `numpy.load (..., mmap_mode = "r")' reads as they
+are. Text is a `.utf8' file of the values end to end, and a `.npy' of
+the offsets where each begins. Columns with missing values also have a
+`.valid.npy' of which rows have one, where the rest hold zero (or NaN).
+
+`open_columns' memory-maps the copy, and hands out each column as a
+`memoryview' of the mapping, without copying it or parsing it, or as a
+numpy array the same way, if numpy is installed. numpy isn't needed to
+write or read the copy.
+'''
+
+## directory of cached copies, next to the data file
+CACHE = ".columnar"
+
+## rows written at a time
+BATCH = 65536
+
+## storage of each schema type, as `.npy' descriptor and `array' code
+KINDS = { "integer": ("<i8", "q"), "float": ("<f8", "d"), "double": ("<f8", "d"), "decimal": ("<f8", "d"), "boolean": ("|b1", "B") }
+TEXT  = ("<i8", "q")
+
+## bytes taken by a `.npy' header, patched once the number of rows is known
+HEADER = 128
+
+def cache_path (data : str, resource_hash : str) -> str:
+    return (join (dirname (data), CACHE, resource_hash))
+
+def column_types (schema : str, target_class : str) -> Optional[dict[str, str]]:
+    '''
+    The base type (`integer', `string' &c.) of the range of each slot of
+    the target class, in order. As in `fisdat.tiered.schema_slots', the
+    schema file is tried on its own first, and its imports only resolved
+    if the class inherits its slots.
+    '''
+    logging.debug (f"Called `column_types (schema = {schema}, target_class = {target_class})'")
+    schema_obj = yaml_loader.load (schema, target_class = SchemaDefinition)
+    class_obj  = schema_obj.classes.get (target_class)
+
+    if (class_obj is None):
+        return (None)
+    elif (class_obj.is_a is None and not class_obj.mixins):
+        names   = list (class_obj.slots) + list (class_obj.attributes)
+        local   = lambda k : class_obj.slot_usage.get (k) or schema_obj.slots.get (k) or class_obj.attributes.get (k)
+        ranges  = { k: (local (k) and local (k).range) or schema_obj.default_range or "string" for k in names }
+        typeofs = { k: v.typeof for (k, v) in schema_obj.types.items () }
+    else:
+        logging.info (f"Class {target_class} inherits slots, resolving schema imports")
+        view    = SchemaView (schema)
+        ranges  = { s.name: s.range or view.schema.default_range or "string" for s in view.class_induced_slots (target_class) }
+        typeofs = { k: v.typeof for (k, v) in view.all_types ().items () }
+    return ({ k: base_type (v, typeofs) for (k, v) in ranges.items () })
+
+def base_type (name : str, typeofs : dict[str, Optional[str]]) -> str:
+    seen = set ()
+    while (typeofs.get (name) is not None and name not in seen):
+        seen.add (name)
+        name = typeofs [name]
+    return (str (name))
+
+def npy_header (descr : str, rows : int) -> bytes:
+    '''
+    A version 1.0 `.npy' header for `rows' values, padded to `HEADER'
+    bytes so it can be rewritten in place.
+    '''
+    text = f"{{'descr': '{descr}', 'fortran_order': False, 'shape': ({rows},), }}"
+    return (b"\x93NUMPY\x01\x00" + struct.pack ("<H", HEADER - 10) + text.ljust (HEADER - 11).encode ("latin1") + b"\n")
+
+def read_npy_header (fp) -> tuple[str, int, int]:
+    '''
+    The descriptor, number of rows and data offset of a `.npy' file.
+    '''
+    magic = fp.read (10)
+    if (magic [:6] != b"\x93NUMPY"):
+        raise ValueError (f"{fp.name} is not a .npy file")
+    if (magic [6] == 1):
+        (length,) = struct.unpack ("<H", magic [8:10])
+    else:
+        (length,) = struct.unpack ("<I", magic [8:10] + fp.read (2))
+    header    = ast.literal_eval (fp.read (length).decode ("latin1"))
+    return (header ["descr"], header ["shape"] [0], fp.tell ())
+
+class ColumnWriter (object):
+    '''
+    Writes the values of one column to its files in `directory', as
+    `name' (`0.npy' &c.).
+    '''
+    def __init__ (self, directory : str, name : str, kind : str) -> None:
+        (self.directory, self.name, self.kind) = (directory, name, kind)
+        (self.descr, self.code) = KINDS.get (kind, TEXT)
+        self.text   = kind not in KINDS
+        self.rows   = 0
+        self.offset = 0
+        self.nulls  = 0
+        self.values = self.open (f"{name}.npy", self.descr)
+        self.valid  = self.open (f"{name}.valid.npy", "|b1")
+        if (self.text):
+            self.blob = open (join (directory, f"{name}.utf8"), "wb")
+            array (self.code, [0]).tofile (self.values)
+
+    def open (self, name : str, descr : str):
+        fp = open (join (self.directory, name), "wb")
+        fp.write (npy_header (descr, 0))
+        return (fp)
+
+    def convert (self, value):
+        if (self.kind == "boolean"):
+            return (1 if str (value).lower () in ("true", "1", "yes") else 0)
+        elif (self.code == "q"):
+            return (int (value))
+        return (float (value))
+
+    def update (self, values : list) -> None:
+        mask        = bytes (k is not None for k in values)
+        self.nulls += len (values) - sum (mask)
+        self.rows  += len (values)
+        self.valid.write (mask)
+        if (self.text):
+            encoded = [b"" if k is None else str (k).encode ("utf-8") for k in values]
+            offsets = array (self.code)
+            for k in encoded:
+                self.offset += len (k)
+                offsets.append (self.offset)
+            self.blob.write (b"".join (encoded))
+            self.write (offsets)
+        else:
+            empty = float ("nan") if self.code == "d" else 0
+            self.write (array (self.code, [empty if k is None else self.convert (k) for k in values]))
+
+    def write (self, values : array) -> None:
+        if (sys.byteorder == "big"):
+            values.byteswap ()
+        values.tofile (self.values)
+
+    def close (self) -> dict:
+        '''
+        Finish the files, returning the description of the column.
+        '''
+        for (fp, descr, rows) in ((self.values, self.descr, self.rows + self.text), (self.valid, "|b1", self.rows)):
+            fp.seek (0)
+            fp.write (npy_header (descr, rows))
+            fp.close ()
+        if (self.text):
+            self.blob.close ()
+        if (not self.nulls):
+            os.remove (join (self.directory, f"{self.name}.valid.npy"))
+        return ({ "file": self.name, "type": self.kind, "nulls": self.nulls })
+
+class ColumnarWriter (object):
+    '''
+    Writes the instances of a table, as they are validated, to a staging
+    directory, which becomes the cached copy of the table once its hash
+    is known, see `commit'. Instances are taken as `TableStats' takes
+    them, so `StatsLoader' hands them over.
+    '''
+    def __init__ (self, data : str, types : dict[str, str]) -> None:
+        self.data    = data
+        self.root    = join (dirname (data), CACHE)
+        os.makedirs (self.root, exist_ok = True)
+        self.staging = tempfile.mkdtemp (prefix = f".{PurePath (data).name}.", dir = self.root)
+        os.chmod (self.staging, 0o777 & ~UMASK)
+        self.columns = { k: ColumnWriter (self.staging, str (n), v) for (n, (k, v)) in enumerate (types.items ()) }
+        self.header  = list (types)
+        self.batch   = []
+        self.failed  = False
+
+    def add (self, instance : dict) -> None:
+        if (self.failed):
+            return
+        self.batch.append (instance)
+        if (len (self.batch) >= BATCH):
+            self.flush ()
+
+    def flush (self, header : Optional[list[str]] = None) -> None:
+        if (header is not None):
+            self.header = header
+        for (name, column) in ([] if self.failed else self.columns.items ()):
+            try:
+                column.update ([k.get (name) for k in self.batch])
+            except OverflowError:
+                # Valid for the schema, but too large for a 64-bit column
+                print (f"Column {name} of {self.data} has an integer out of the range of 64 bits, not writing a columnar copy")
+                self.abandon ()
+                break
+        self.batch = []
+
+    def commit (self, resource_hash : str) -> Optional[str]:
+        '''
+        Finish the copy, and make it the cached copy of the data with hash
+        `resource_hash', returning its directory, or `None' if the copy
+        was given up on.
+        '''
+        self.flush ()
+        if (self.failed):
+            return (None)
+        columns = { k: v.close () for (k, v) in self.columns.items () }
+        # Slots of the schema not in the file
+        columns = { k: v for (k, v) in columns.items () if k in self.header }
+        rows    = max ([v.rows for v in self.columns.values ()], default = 0)
+        with open (join (self.staging, "columns.json"), "w") as fp:
+            json.dump ({ "file": PurePath (self.data).name, "resource_hash": resource_hash, "rows": rows, "columns": columns }, fp, indent = 1)
+        target = cache_path (self.data, resource_hash)
+        try:
+            os.rename (self.staging, target)
+        except OSError:
+            # Already cached, by an earlier run with the same data
+            logging.info (f"Columnar copy of {self.data} is already at {target}")
+            self.abandon ()
+            return (target if isdir (target) else None)
+        print (f"Wrote columnar copy of {self.data} to {target}")
+        return (target)
+
+    def abandon (self) -> None:
+        self.failed = True
+        for column in self.columns.values ():
+            for fp in (column.values, column.valid) + ((column.blob,) if column.text else ()):
+                fp.close ()
+        shutil.rmtree (self.staging, ignore_errors = True)
+
+def columnar_writer (data : str, schema : str) -> Optional[ColumnarWriter]:
+    types = column_types (schema, "TableSchema")
+    if (types is None):
+        print (f"Schema {schema} has no `TableSchema' class, not writing a columnar copy of {data}")
+        return (None)
+    return (ColumnarWriter (data, types))
+
+def write_columnar (data          : str
+                  , schema        : str
+                  , resource_hash : str
+                  , na_values     : Optional[Collection[str]] = None
+                  , na_columns    : Optional[Collection[str]] = None) -> Optional[str]:
+    '''
+    The columnar copy of `data' in a pass of its own, for when it isn't
+    validated in full.
+    '''
+    logging.debug (f"Called `write_columnar (data = {data}, schema = {schema}, resource_hash = {resource_hash}, na_values = {na_values}, na_columns = {na_columns})'")
+    if (isdir (cache_path (data, resource_hash))):
+        return (cache_path (data, resource_hash))
+    writer = columnar_writer (data, schema)
+    if (writer is None):
+        return (None)
+    try:
+        for _ in StatsLoader (CsvStreamLoader (data, na_values = na_values, na_columns = na_columns), writer).iter_instances ():
+            pass
+    except BaseException:
+        writer.abandon ()
+        raise
+    return (writer.commit (resource_hash))
+
+class TextColumn (Sequence):
+    '''
+    The values of a text column, decoded as they are looked up.
+    '''
+    def __init__ (self, offsets : memoryview, blob : memoryview) -> None:
+        (self.offsets, self.blob) = (offsets, blob)
+
+    def __len__ (self) -> int:
+        return (len (self.offsets) - 1)
+
+    def __getitem__ (self, row):
+        if (isinstance (row, slice)):
+            return ([self [k] for k in range (*row.indices (len (self)))])
+        if (row < 0):
+            row += len (self)
+        if (not 0 <= row < len (self)):
+            raise IndexError (row)
+        return (str (self.blob [self.offsets [row] : self.offsets [row + 1]], "utf-8"))
+
+class ColumnarTable (object):
+    '''
+    A cached copy of a table, memory-mapped, see `open_columns'.
+    '''
+    def __init__ (self, directory : str) -> None:
+        self.directory = directory
+        with open (join (directory, "columns.json"), "r") as fp:
+            self.meta = json.load (fp)
+        self.rows  = self.meta ["rows"]
+        self.names = list (self.meta ["columns"])
+        self.maps  = []
+
+    def __enter__ (self) -> "ColumnarTable":
+        return (self)
+
+    def __exit__ (self, *exc) -> None:
+        self.close ()
+
+    def close (self) -> None:
+        '''
+        Unmap the files, unless columns handed out are still in use, in
+        which case they are unmapped once those are let go of.
+        '''
+        for k in self.maps:
+            try:
+                k.close ()
+            except BufferError:
+                pass
+        self.maps = []
+
+    def mapping (self, name : str) -> memoryview:
+        with open (join (self.directory, name), "rb") as fp:
+            if (os.fstat (fp.fileno ()).st_size == 0):
+                return (memoryview (b""))
+            self.maps.append (mmap.mmap (fp.fileno (), 0, access = mmap.ACCESS_READ))
+        return (memoryview (self.maps [-1]))
+
+    def npy (self, name : str) -> memoryview:
+        with open (join (self.directory, name), "rb") as fp:
+            (descr, rows, offset) = read_npy_header (fp)
+        code = { "<i8": "q", "<f8": "d", "|b1": "B" } [descr]
+        data = self.mapping (name) [offset : offset + rows * array (code).itemsize]
+        if (sys.byteorder == "big" and code != "B"):
+            # Not in the machine's order, so this one is copied
+            values = array (code, data.tobytes ())
+            values.byteswap ()
+            return (memoryview (values))
+        return (data.cast (code))
+
+    def column (self, name : str) -> Sequence:
+        '''
+        The values of column `name', as a `memoryview' of the mapping for
+        numbers (`B' for booleans), or a `TextColumn' for text.
+        '''
+        entry = self.meta ["columns"] [name]
+        if (entry ["type"] in KINDS):
+            return (self.npy (f"{entry ['file']}.npy"))
+        return (TextColumn (self.npy (f"{entry ['file']}.npy"), self.mapping (f"{entry ['file']}.utf8")))
+
+    def valid (self, name : str) -> Optional[memoryview]:
+        '''
+        Which rows of column `name' have a value, or `None' if all do.
+        '''
+        entry = self.meta ["columns"] [name]
+        return (self.npy (f"{entry ['file']}.valid.npy") if entry ["nulls"] else None)
+
+    def array (self, name : str):
+        '''
+        The values of number column `name' as a read-only numpy array,
+        mapped from the file like `column'.
+        '''
+        if (numpy is None):
+            raise ImportError ("numpy is needed for columns as arrays, use `column' instead")
+        entry = self.meta ["columns"] [name]
+        if (entry ["type"] not in KINDS):
+            raise TypeError (f"Column {name} holds text, not numbers")
+        return (numpy.load (join (self.directory, f"{entry ['file']}.npy"), mmap_mode = "r"))
+
+    def __iter__ (self) -> Iterator[str]:
+        return (iter (self.names))
+
+    def __getitem__ (self, name : str) -> Sequence:
+        return (self.column (name))
+
+def open_columns (data : str, resource_hash : str) -> Optional[ColumnarTable]:
+    '''
+    The cached copy of `data' with hash `resource_hash' (as given in the
+    manifest), or `None' if there isn't one.
+    '''
+    logging.debug (f"Called `open_columns (data = {data}, resource_hash = {resource_hash})'")
+    directory = cache_path (data, resource_hash)
+    if (not isfile (join (directory, "columns.json"))):
+        logging.info (f"No columnar copy of {data} at {directory}")
+        return (None)
+    return (ColumnarTable (directory))
@@ -0,0 +1,92 @@
+import json
+import logging
+from typing  import Collection, Optional
+
+from fisdat.chunking   import index_name
+from fisdat.data_model import TableDesc
+from fisdat.packing    import PACK
+from fisdat.stats      import table_sidecar
+from fisdat.storage    import Storage
+
+'''
+Bundle commits.
+
+Downstream processing can only start once a whole bundle has been
+uploaded, as nothing says which of its objects are complete. So each
+table's data file and schemata are uploaded first, then a completion
+marker for the table, `.complete/<table>.json' in the bundle, giving
+the table's name, data file and hash, and the objects it was uploaded
+as. Downstream processing can start on a table as soon as its marker is
+there, while later tables are still uploading.
+
+The manifests and `.index' are uploaded last, as the commit record: a
+bundle is complete once its `.index' is there. Tables packed into the
+bundle's archive (see `fisdat.packing') land with it, and their markers
+follow it.
+'''
+
+## directory of completion markers in a bundle
+MARKERS = ".complete"
+
+def marker_key (path : str, name : str) -> str:
+    return (f"{path}/{MARKERS}/{name}.json")
+
+def table_objects (table : TableDesc, chunked : Collection[str] = ()) -> list[str]:
+    '''
+    The objects `table' is uploaded as, its data file (or the chunk
+    index in its place), its schemata and its statistics sidecar, if it
+    has one, see `fisdat.stats'.
+    '''
+    data = str (table.resource_path)
+    objects = [index_name (data) if data in chunked else data, str (table.schema_path_yaml)]
+    if (table.schema_path_ttl is not None):
+        objects.append (str (table.schema_path_ttl))
+    if (table_sidecar (table) is not None):
+        objects.append (table_sidecar (table))
+    return (objects)
+
+def commit_order (tables : list[TableDesc], files : list[str]) -> list[tuple[Optional[TableDesc], list[str]]]:
+    '''
+    `files' grouped by table, in order, each with those of its files not
+    already in an earlier group, then the rest, such as the manifests and
+    `.index', in their order in `files', with no table.
+    '''
+    (groups, seen, wanted) = ([], set (), set (files))
+    for table in tables:
+        group = [k for k in dict.fromkeys (table_objects (table)) if k in wanted and k not in seen]
+        seen.update (group)
+        groups.append ((table, group))
+    groups.append ((None, [k for k in files if k not in seen]))
+    return (groups)
+
+def write_marker (storage : Storage
+                , path    : str
+                , table   : TableDesc
+                , dry_run : bool
+                , chunked : Collection[str] = ()) -> None:
+    key = marker_key (path, table.atomic_name)
+    if (dry_run):
+        print (f"Would mark table {table.atomic_name} complete at {storage.url (key)}")
+        return
+    marker = { "table"        : str (table.atomic_name)
+             , "resource_path": str (table.resource_path)
+             , "resource_hash": str (table.resource_hash)
+             , "objects"      : table_objects (table, chunked) }
+    storage.write (json.dumps (marker, indent = 1).encode ("utf-8"), key)
+    print (f"Marked table {table.atomic_name} complete")
+
+def read_marker (storage : Storage, path : str, name : str) -> Optional[dict]:
+    '''
+    The completion marker of table `name' in the bundle at `path', or
+    `None' if it hasn't been uploaded yet.
+    '''
+    logging.debug (f"Called `read_marker (path = {path}, name = {name})'")
+    data = storage.read (marker_key (path, name))
+    return (None if data is None else json.loads (data))
+
+def committed (storage : Storage, path : str, index : str = ".index") -> bool:
+    '''
+    Whether the bundle at `path' is complete, with its `.index' uploaded
+    on its own or in its archive.
+    '''
+    return (any (storage.digest (f"{path}/{k}") is not None for k in (index, PACK)))
@@ -0,0 +1,186 @@
+import dataclasses
+from functools import lru_cache
+import sys
+from typing    import Any, Optional, get_args, get_origin
+
+from linkml_runtime.utils.metamodelcore import URI
+from linkml_runtime.utils.yamlutils     import YAMLRoot
+
+from fisdat.data_model import ExtColumnDescAtomicName, JobDesc, JobDescAtomicName, JobType, ManifestDesc, ManifestDescAtomicName, ScopeDesc, TableDesc, TableDescAtomicName, slots
+
+'''
+Compact manifests.
+
+The classes generated from the data model keep their attributes in a
+dictionary per object, and coerce and check every attribute each time
+an object is made, even when it is made from attributes which were
+checked when they were read. A manifest of many tables and jobs is
+instead held as objects of the classes here, which have `__slots__'
+rather than dictionaries, share one copy of strings repeated from table
+to table (schema paths, job types, variables and columns), and take
+their attributes as given.
+
+`compact' and `Compact.to_desc' convert to and from the generated
+classes, where a manifest is read or written with the linkml loaders and
+dumpers. `to_desc' trusts the attributes too, making the typed strings
+of the generated classes without checking them again, though it does
+check that the required ones are there.
+'''
+
+@lru_cache (maxsize = None)
+def range_types (name : str) -> tuple[type, ...]:
+    '''
+    The classes making up the range of slot `name' in the generated data
+    model, with the unions, lists and dictionaries in it taken apart.
+    '''
+    pending = [getattr (slots, name).range]
+    types   = []
+    while (pending):
+        k = pending.pop ()
+        pending.extend (get_args (k))
+        if (isinstance (get_origin (k) or k, type)):
+            types.append (get_origin (k) or k)
+    return (tuple (types))
+
+@lru_cache (maxsize = None)
+def required_slots (cls : type) -> tuple[str, ...]:
+    '''
+    The slots of the generated class `cls' holding one value which must
+    be given, those whose range isn't optional.
+    '''
+    return (tuple (k.name for k in dataclasses.fields (cls)
+                          if not {type (None), list, dict} & set (range_types (k.name))))
+
+def typed (cls : type, value : Optional[str]) -> Optional[str]:
+    '''
+    `value' as the string subclass `cls' of the generated data model,
+    without the checks (of URIs, say) made by `cls (value)'.
+    '''
+    if (value is None or type (value) is cls):
+        return (value)
+    node = str.__new__ (cls, value)
+    (node._s, node._len) = (None, None)
+    return (node)
+
+def trusted (cls : type, **attributes : Any) -> YAMLRoot:
+    '''
+    An object of the generated class `cls' with `attributes' as given,
+    without `__post_init__' coercing and checking them, save for raising
+    `ValueError' as it would if a required one is missing.
+    '''
+    for k in required_slots (cls):
+        if (attributes.get (k) is None):
+            raise ValueError (f"{k} must be supplied")
+    obj = cls.__new__ (cls)
+    obj.__dict__.update (attributes)
+    return (obj)
+
+class Compact (object):
+    '''
+    An object with the slots of the generated class `desc'. Attributes
+    not given are `None', or empty lists for `lists'. Those in `shared'
+    are interned.
+    '''
+    __slots__ = ()
+    desc      = None
+    lists     = ()
+    shared    = ()
+
+    def __init__ (self, **attributes : Any) -> None:
+        for name in self.__slots__:
+            value = attributes.pop (name, None)
+            if (value is None and name in self.lists):
+                value = []
+            elif (value is not None and name in self.shared):
+                value = sys.intern (str (value))
+            setattr (self, name, value)
+        if (attributes):
+            raise ValueError (f"{', '.join (attributes)} aren't slots of {self.desc.__name__}")
+
+    def __eq__ (self, other : Any) -> bool:
+        return (type (self) is type (other) and all (getattr (self, k) == getattr (other, k) for k in self.__slots__))
+
+    def __repr__ (self) -> str:
+        return (f"{self.__class__.__name__} ({', '.join (f'{k} = {getattr (self, k)!r}' for k in self.__slots__)})")
+
+    @classmethod
+    def from_desc (cls, desc : YAMLRoot) -> "Compact":
+        return (cls (**{ k: str (getattr (desc, k)) if getattr (desc, k) is not None else None for k in cls.__slots__ }))
+
+def desc_slots (desc : type) -> tuple[str, ...]:
+    return (tuple (k.name for k in dataclasses.fields (desc)))
+
+class Scope (Compact):
+    __slots__ = desc_slots (ScopeDesc)
+    desc      = ScopeDesc
+    shared    = __slots__
+
+    def to_desc (self) -> ScopeDesc:
+        return (trusted (ScopeDesc
+                       , column   = self.column
+                       , variable = typed (ExtColumnDescAtomicName, self.variable)
+                       , table    = typed (TableDescAtomicName, self.table)))
+
+class Table (Compact):
+    __slots__ = desc_slots (TableDesc)
+    desc      = TableDesc
+    shared    = ("schema_path_yaml", "schema_path_ttl")
+
+    def to_desc (self) -> TableDesc:
+        return (trusted (TableDesc
+                       , atomic_name      = typed (TableDescAtomicName, self.atomic_name)
+                       , resource_path    = typed (URI, self.resource_path)
+                       , resource_hash    = self.resource_hash
+                       , schema_path_yaml = typed (URI, self.schema_path_yaml)
+                       , title            = self.title
+                       , description      = self.description
+                       , schema_path_ttl  = typed (URI, self.schema_path_ttl)))
+
+class Job (Compact):
+    __slots__ = desc_slots (JobDesc)
+    desc      = JobDesc
+    lists     = ("job_scope_descriptive", "job_scope_collected", "job_scope_modelled")
+    shared    = ("job_type",)
+
+    def to_desc (self) -> JobDesc:
+        return (trusted (JobDesc
+                       , atomic_name           = typed (JobDescAtomicName, self.atomic_name)
+                       , job_type              = JobType (self.job_type)
+                       , title                 = self.title
+                       , job_scope_descriptive = [k.to_desc () for k in self.job_scope_descriptive]
+                       , job_scope_collected   = [k.to_desc () for k in self.job_scope_collected]
+                       , job_scope_modelled    = [k.to_desc () for k in self.job_scope_modelled]))
+
+    @classmethod
+    def from_desc (cls, desc : JobDesc) -> "Job":
+        return (cls (atomic_name = str (desc.atomic_name)
+                   , job_type    = str (desc.job_type)
+                   , title       = desc.title
+                   , **{ k: [Scope.from_desc (v) for v in getattr (desc, k)] for k in cls.lists }))
+
+class Manifest (Compact):
+    __slots__ = desc_slots (ManifestDesc)
+    desc      = ManifestDesc
+    lists     = ("tables", "jobs")
+
+    def to_desc (self) -> ManifestDesc:
+        return (trusted (ManifestDesc
+                       , atomic_name   = typed (ManifestDescAtomicName, self.atomic_name)
+                       , tables        = [k.to_desc () for k in self.tables]
+                       , jobs          = [k.to_desc () for k in self.jobs]
+                       , gcp_source    = self.gcp_source
+                       , local_version = self.local_version))
+
+    @classmethod
+    def from_desc (cls, desc : ManifestDesc) -> "Manifest":
+        return (cls (atomic_name   = str (desc.atomic_name)
+                   , tables        = [Table.from_desc (k) for k in desc.tables]
+                   , jobs          = [Job.from_desc (k) for k in desc.jobs]
+                   , gcp_source    = desc.gcp_source
+                   , local_version = desc.local_version))
+
+## the compact class for each generated class
+COMPACT = { k.desc: k for k in [Scope, Table, Job, Manifest] }
+
+def compact (manifest : ManifestDesc) -> Manifest:
+    return (Manifest.from_desc (manifest))
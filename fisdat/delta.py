@@ -0,0 +1,90 @@
+import logging
+from os.path import isfile
+from typing  import Collection, Optional
+
+import yaml
+
+from linkml_runtime.loaders import YAMLLoader
+
+from fisdat            import chunking
+from fisdat.data_model import ManifestDesc
+from fisdat.index      import ManifestIndex
+from fisdat.storage    import Storage, local_digest
+
+'''
+Delta bundles.
+
+A bundle based on an earlier one only uploads what has changed since.
+The earlier bundle's `.index' names its YAML manifest, which gives the
+hash of each of its data files: a data file with the same hash in both
+manifests is copied from the earlier bundle within the storage, rather
+than uploaded. Where the earlier bundle uploaded it in chunks, its
+chunk index is copied in its place, and where it was packed into the
+earlier bundle's archive, it is uploaded again. Schemata aren't hashed
+in the manifest, so they are compared with the digests the storage
+keeps of the earlier bundle's objects. The manifests and `.index' always describe the new bundle, so
+are always uploaded.
+'''
+
+def previous_manifest (storage    : Storage
+                     , path       : str
+                     , index_name : str) -> Optional[ManifestDesc]:
+    index = storage.read (f"{path}/{index_name}")
+    if (index is None):
+        print (f"There is no index {index_name} in bundle {storage.url (path)}")
+        return (None)
+    manifest_name = index.decode ("utf-8").split ("\n") [0]
+    text          = storage.read (f"{path}/{manifest_name}")
+    if (text is None):
+        print (f"There is no manifest {manifest_name} in bundle {storage.url (path)}")
+        return (None)
+    try:
+        return (YAMLLoader ().loads (text.decode ("utf-8"), target_class = ManifestDesc))
+    except (ValueError, yaml.YAMLError) as e:
+        print (f"Cannot read manifest {manifest_name} of bundle {storage.url (path)}: {e}")
+        return (None)
+
+def reuse_plan (storage    : Storage
+              , path       : str
+              , index_name : str
+              , manifest   : ManifestDesc
+              , files      : list[str]) -> dict[str, str]:
+    '''
+    For each of `files', the data files and schemata of the bundle of
+    `manifest', which is unchanged in the earlier bundle at `path', the
+    key of its object there, or of its chunk index. If the earlier bundle
+    can't be read, nothing is reused.
+    '''
+    logging.debug (f"Called `reuse_plan (path = {path}, index_name = {index_name}, files = {files})'")
+    previous = previous_manifest (storage, path, index_name)
+    if (previous is None):
+        print ("Uploading every file, rather than only those changed")
+        return ({})
+
+    plan       = {}
+    index      = ManifestIndex (previous)
+    data_files = set ()
+    for table in manifest.tables:
+        data_files.add (str (table.resource_path))
+        earlier = index.table_for_path (table.resource_path)
+        if (earlier is not None and earlier.resource_hash == table.resource_hash):
+            source = f"{path}/{earlier.resource_path}"
+            if (storage.digest (source) is not None):
+                plan [str (table.resource_path)] = source
+            elif (storage.digest (chunking.index_name (source)) is not None):
+                plan [str (table.resource_path)] = chunking.index_name (source)
+            else:
+                logging.info (f"Data file {earlier.resource_path} is packed in bundle {storage.url (path)}, uploading it again")
+
+    for name in set (str (k) for k in files if k is not None) - data_files:
+        if (isfile (name) and storage.digest (f"{path}/{name}") == local_digest (name)):
+            plan [name] = f"{path}/{name}"
+    return (plan)
+
+def chunked_objects (chunked : Collection[str], reuse : dict[str, str]) -> list[str]:
+    '''
+    The files which end up as chunk indexes in the bundle: those of
+    `chunked' uploaded in chunks, and those of `reuse' copied from a
+    chunk index, but not those of `chunked' copied from a whole object.
+    '''
+    return ([k for k in chunked if k not in reuse] + [k for (k, v) in reuse.items () if v.endswith (f".{chunking.CHUNKS}")])
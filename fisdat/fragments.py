@@ -0,0 +1,181 @@
+from linkml_runtime.dumpers import yaml_dumper
+
+from hashlib import sha384
+import logging
+import os
+from os.path import isdir, isfile, join
+from pathlib import PurePath
+import tempfile
+from typing  import Collection, Optional
+
+import yaml
+
+from fisdat.data_model import JobDesc, ManifestDesc, TableDesc
+from fisdat.utils      import atomic_output, file_mode
+
+'''
+Fragmented manifests.
+
+Rather than a single file, a manifest may be a directory (by convention
+named `manifest.d') laid out as follows:
+
+    manifest.d/manifest.yaml     the manifest's own attributes
+    manifest.d/tables/NAME.yaml  one file for each table
+    manifest.d/jobs/NAME.yaml    one file for each job
+
+Each fragment is the YAML of one object, as it would appear in a single
+file manifest. Adding a table writes one small file, whatever the size
+of the manifest, and the name of each fragment is the table or job's
+atomic name, so looking one up or checking it is already there needs no
+parsing. The fragments are only merged into a single manifest when one
+is needed, e.g. to upload, and then only those which are needed.
+'''
+
+ROOT   = "manifest.yaml"
+TABLES = "tables"
+JOBS   = "jobs"
+
+## first line of a merged manifest, followed by the digest of its fragments
+MERGED = "# Merged from fragments "
+
+def is_fragmented (manifest : str) -> bool:
+    return (isdir (manifest) or PurePath (manifest).suffix == ".d")
+
+def fragment_path (directory : str, kind : str, name : str) -> str:
+    return (join (directory, kind, f"{name}.yaml"))
+
+def fragment_names (directory : str, kind : str) -> list[str]:
+    '''
+    Names of the tables or jobs in a fragmented manifest, from the file
+    names alone.
+    '''
+    path = join (directory, kind)
+    if (not isdir (path)):
+        return ([])
+    return (sorted (k [:-len (".yaml")] for k in os.listdir (path) if k.endswith (".yaml") and not k.startswith (".")))
+
+def write_fragment (directory : str
+                  , kind      : str
+                  , obj
+                  , replace   : bool = False) -> bool:
+    '''
+    Write a table or job fragment. The fragment is written to a hidden
+    temporary file and then moved into place, so a fragment is never
+    seen half-written. Unless `replace' is set, an existing fragment of
+    the same name is left alone and `False' returned.
+    '''
+    logging.debug (f"Called `write_fragment (directory = {directory}, kind = {kind}, obj = {obj}, replace = {replace})'")
+    os.makedirs (join (directory, kind), exist_ok = True)
+    target = fragment_path (directory, kind, obj.atomic_name)
+    (handle, staging) = tempfile.mkstemp (prefix = ".", suffix = ".yaml", dir = join (directory, kind))
+    with os.fdopen (handle, "w") as fp:
+        fp.write (yaml_dumper.dumps (obj))
+    os.chmod (staging, file_mode (target))
+
+    try:
+        if (replace):
+            os.replace (staging, target)
+        else:
+            # Unlike a rename, a link fails if the target exists
+            os.link (staging, target)
+        return (True)
+    except FileExistsError:
+        return (False)
+    finally:
+        if (isfile (staging)):
+            os.remove (staging)
+
+def init_fragments (directory     : str
+                  , manifest_name : str
+                  , local_version : Optional[str] = None) -> bool:
+    '''
+    Create a fragmented manifest, if it doesn't already exist.
+    '''
+    logging.debug (f"Called `init_fragments (directory = {directory}, manifest_name = {manifest_name}, local_version = {local_version})'")
+    root = join (directory, ROOT)
+    if (isfile (root)):
+        return (False)
+    os.makedirs (join (directory, TABLES), exist_ok = True)
+    os.makedirs (join (directory, JOBS), exist_ok = True)
+    with atomic_output (root) as staging:
+        with open (staging, "w") as fp:
+            yaml.safe_dump ({ "atomic_name": manifest_name, "local_version": local_version }, fp, sort_keys = False)
+    return (True)
+
+def set_local_version (directory : str, local_version : str) -> None:
+    root = join (directory, ROOT)
+    with open (root, "r") as fp:
+        attributes = yaml.safe_load (fp) or {}
+    if (attributes.get ("local_version") != local_version):
+        attributes ["local_version"] = local_version
+        with atomic_output (root) as staging:
+            with open (staging, "w") as fp:
+                yaml.safe_dump (attributes, fp, sort_keys = False)
+
+def load_fragment (directory : str, kind : str, name : str):
+    with open (fragment_path (directory, kind, name), "r") as fp:
+        attributes = yaml.safe_load (fp)
+    return (TableDesc (**attributes) if kind == TABLES else JobDesc (**attributes))
+
+def merge_fragments (directory : str
+                   , jobs      : Optional[Collection[str]] = None) -> ManifestDesc:
+    '''
+    Merge the fragments of a manifest into one manifest. If `jobs' is
+    given, only those jobs are merged, along with the tables which their
+    scopes refer to. Other fragments aren't read at all.
+    '''
+    logging.debug (f"Called `merge_fragments (directory = {directory}, jobs = {jobs})'")
+    with open (join (directory, ROOT), "r") as fp:
+        attributes = yaml.safe_load (fp) or {}
+
+    job_names  = fragment_names (directory, JOBS) if jobs is None else list (jobs)
+    job_objs   = [load_fragment (directory, JOBS, k) for k in job_names]
+
+    if (jobs is None):
+        table_names = fragment_names (directory, TABLES)
+    else:
+        scopes      = [s for j in job_objs for s in j.job_scope_descriptive + j.job_scope_collected + j.job_scope_modelled]
+        table_names = sorted (set (str (s.table) for s in scopes))
+    table_objs = [load_fragment (directory, TABLES, k) for k in table_names]
+
+    logging.info (f"Merged {len (table_objs)} table and {len (job_objs)} job fragments from {directory}")
+    return (ManifestDesc (tables = table_objs, jobs = job_objs, **attributes))
+
+def merged_path (directory : str) -> PurePath:
+    return (PurePath (directory).with_suffix (".yaml"))
+
+def fragments_digest (directory : str) -> str:
+    '''
+    The digest of the names and contents of every fragment, which changes
+    whenever one is added, removed or changed, whatever its time stamp.
+    '''
+    hasher = sha384 ()
+    for (kind, name) in [(None, ROOT)] + [(kind, k) for kind in [TABLES, JOBS] for k in fragment_names (directory, kind)]:
+        path = join (directory, ROOT) if kind is None else fragment_path (directory, kind, name)
+        with open (path, "rb") as fp:
+            data = fp.read ()
+        hasher.update (f"{kind}/{name} {len (data)}\n".encode ("utf-8") + data)
+    return (hasher.hexdigest ())
+
+def merge_to_file (directory : str
+                 , target    : Optional[str] = None) -> PurePath:
+    '''
+    Merge all fragments into a single YAML manifest, next to the
+    directory by default (`manifest.d' becomes `manifest.yaml'). Its
+    first line is a comment with the digest of the fragments, and if
+    this is the digest of the fragments as they are, it is left as it is.
+    '''
+    logging.debug (f"Called `merge_to_file (directory = {directory}, target = {target})'")
+    target = merged_path (directory) if target is None else PurePath (target)
+    header = f"{MERGED}{fragments_digest (directory)}\n"
+    if (isfile (target)):
+        with open (target, "r") as fp:
+            if (fp.readline () == header):
+                logging.info (f"Merged manifest {target} is up to date")
+                return (target)
+
+    print (f"Merging manifest fragments in {directory} into {target}")
+    with atomic_output (str (target)) as staging:
+        with open (staging, "w") as fp:
+            fp.write (header + yaml_dumper.dumps (merge_fragments (directory)))
+    return (target)
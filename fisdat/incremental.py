@@ -0,0 +1,141 @@
+from hashlib import sha384
+import json
+import logging
+from os.path import getsize, isfile
+from pathlib import PurePath
+from typing  import Collection, Optional
+
+from fisdat.stream import CsvStreamLoader
+from fisdat.utils  import atomic_output, validation_helper
+
+'''
+Incremental validation of append-only data files.
+
+After a successful validation, a small state file is written next to the
+data file, recording the byte offset up to which the file was validated
+and the hash of the bytes up to that offset. On a later run, providing
+the schema has not changed, and the prefix of the file still hashes to
+the same value, only the rows after the recorded offset are validated.
+
+Python's hash objects cannot be serialised, so the state kept between
+runs is the prefix hash rather than the hash object proper. The prefix
+is re-read to check it, which is cheap compared to validating it, and
+the same hash object then carries on over the tail to give the new
+`resource_hash' without reading the file a second time.
+'''
+
+## data read buffer size, 1MB
+BUFSIZ = 1048576
+
+def state_path (data : str) -> PurePath:
+    '''
+    Hidden state file which sits next to the data file, in the same
+    spirit as the `.index' file written by `fisup'.
+    '''
+    data_path = PurePath (data)
+    return (data_path.with_name (f".{data_path.name}.validated"))
+
+def load_state (data : str) -> Optional[dict]:
+    path = state_path (data)
+    if (not isfile (path)):
+        return (None)
+    try:
+        with open (path, "r") as fp:
+            return (json.load (fp))
+    except (OSError, ValueError) as e:
+        logging.info (f"Ignoring unreadable validation state {path}: {e}")
+        return (None)
+
+def save_state (data : str, state : dict) -> PurePath:
+    '''
+    Replace the state file in one step, as the next run trusts the offset
+    and prefix hash it records.
+    '''
+    path = state_path (data)
+    with atomic_output (str (path)) as staging:
+        with open (staging, "w") as fp:
+            json.dump (state, fp, indent = 2)
+    return (path)
+
+def file_hash (path : str) -> str:
+    hasher = sha384 ()
+    with open (path, "rb") as fp:
+        for block in iter (lambda : fp.read (BUFSIZ), b""):
+            hasher.update (block)
+    return (hasher.hexdigest ())
+
+def hash_to (fp, hasher, position : int, target : Optional[int] = None) -> int:
+    '''
+    Feed the bytes of the open file `fp' from `position' up to `target'
+    (or the end of the file) into `hasher', returning the new position.
+    '''
+    fp.seek (position)
+    while (target is None or position < target):
+        size  = BUFSIZ if target is None else min (BUFSIZ, target - position)
+        block = fp.read (size)
+        if (not block):
+            break
+        hasher.update (block)
+        position += len (block)
+    return (position)
+
+def incremental_helper (data         : str
+                      , schema       : str
+                      , target_class : str
+                      , max_errors   : int                       = 1
+                      , report_path  : Optional[str]             = None
+                      , na_values    : Optional[Collection[str]] = None
+                      , na_columns   : Optional[Collection[str]] = None) -> tuple[bool, Optional[str]]:
+    '''
+    Validate `data' against `schema', skipping the part of the file which
+    an earlier run has already validated, if it is unchanged. Returns the
+    validation result along with the hash of the whole file, which is
+    `None' if validation failed. `max_errors', `report_path', `na_values'
+    and `na_columns' are as for `validation_helper'. A change to the NA
+    tokens changes what is valid, so the whole file is validated again.
+    '''
+    logging.debug (f"Called `incremental_helper (data = {data}, schema = {schema}, target_class = {target_class}, max_errors = {max_errors}, report_path = {report_path}, na_values = {na_values}, na_columns = {na_columns})'")
+    state       = load_state (data)
+    schema_hash = file_hash (schema)
+    na_state    = { "values" : sorted (na_values or [])
+                  , "columns": None if na_columns is None else sorted (na_columns) }
+    hasher      = sha384 ()
+    resumable   = state is not None \
+                  and state.get ("schema_hash")  == schema_hash \
+                  and state.get ("target_class") == target_class \
+                  and state.get ("na", na_state) == na_state \
+                  and state.get ("offset", 0) <= getsize (data)
+
+    with open (data, "rb") as fp:
+        if (resumable):
+            position = hash_to (fp, hasher, 0, state ["offset"])
+            if (hasher.hexdigest () == state ["prefix_hash"]):
+                print (f"Data file {data} unchanged up to byte {position}, only validating appended rows")
+                loader = CsvStreamLoader (data, start = position, header = state ["header"], na_values = na_values, na_columns = na_columns)
+            else:
+                print (f"Data file {data} has changed since it was last validated, validating the whole file")
+                hasher   = sha384 ()
+                position = 0
+                loader   = CsvStreamLoader (data, na_values = na_values, na_columns = na_columns)
+        else:
+            logging.info (f"No usable validation state for {data}, validating the whole file")
+            position = 0
+            loader   = CsvStreamLoader (data, na_values = na_values, na_columns = na_columns)
+
+        if (not validation_helper (data, schema, target_class, loader = loader, max_errors = max_errors, report_path = report_path)):
+            return (False, None)
+
+        position    = hash_to (fp, hasher, position, loader.boundary)
+        prefix_hash = hasher.hexdigest ()
+        position    = hash_to (fp, hasher, position)
+        data_hash   = hasher.hexdigest ()
+
+    path = save_state (data, { "schema_hash"  : schema_hash
+                             , "target_class" : target_class
+                             , "na"           : na_state
+                             , "header"       : loader.header
+                             , "offset"       : loader.boundary
+                             , "prefix_hash"  : prefix_hash
+                             , "resource_hash": data_hash })
+    logging.info (f"Recorded validation state up to byte {loader.boundary} in {path}")
+    return (True, data_hash)
@@ -0,0 +1,157 @@
+from collections import defaultdict
+import logging
+from pathlib     import PurePath
+import re
+from typing      import Iterator, Optional
+
+from fisdat.data_model import JobDesc, ManifestDesc, ScopeDesc, TableDesc
+
+'''
+Indexed manifests.
+
+The tables and jobs of a manifest are lists, so finding a table by name
+or data file, or the jobs which use a table, means a scan of the list.
+An index over a loaded manifest is built once, in one pass, and makes
+each of these lookups a dictionary lookup. It is kept up to date as
+tables and jobs are added through it.
+'''
+
+def path_key (resource_path : str) -> str:
+    '''
+    Data files are identified by their file name alone, as they are all
+    uploaded to the same place.
+    '''
+    return (PurePath (str (resource_path)).name)
+
+def name_key (name : str) -> str:
+    '''
+    Names loaded from RDF carry a prefix (`rap:table') or are full URIs,
+    while those in YAML usually don't, but the conversion to RDF treats
+    them all as the same, so they are indexed without.
+    '''
+    return (re.split ("[:/#]", str (name)) [-1])
+
+def job_scopes (job : JobDesc) -> Iterator[ScopeDesc]:
+    for scope in job.job_scope_descriptive + job.job_scope_collected + job.job_scope_modelled:
+        yield (scope)
+
+class ManifestIndex (object):
+    '''
+    Dictionaries over the tables and jobs of `manifest', by
+
+    - table `atomic_name' and data file name (unique)
+    - data file hash and schema path (several tables may share these)
+    - job `atomic_name' (unique)
+    - the table each job scope refers to, giving the jobs and scopes
+
+    Where names or data files are repeated, the first is indexed. Tables
+    and jobs repeating a name are recorded in `duplicates', and tables
+    with a name of their own but a data file name already used in
+    `shared'.
+    '''
+    def __init__ (self, manifest : ManifestDesc) -> None:
+        self.manifest   = manifest
+        self.tables     = {}
+        self.paths      = {}
+        self.hashes     = defaultdict (list)
+        self.schemata   = defaultdict (list)
+        self.jobs       = {}
+        self.references = defaultdict (list)
+        self.duplicates = []
+        self.shared     = []
+
+        for table in manifest.tables:
+            self.index_table (table)
+        for job in manifest.jobs:
+            self.index_job (job)
+        logging.info (f"Indexed {len (self.tables)} tables and {len (self.jobs)} jobs of manifest {manifest.atomic_name}")
+
+    def index_table (self, table : TableDesc) -> None:
+        name = name_key (table.atomic_name)
+        path = path_key (table.resource_path)
+        if (name in self.tables):
+            self.duplicates.append (table)
+        elif (path in self.paths):
+            self.shared.append (table)
+        self.tables.setdefault (name, table)
+        self.paths.setdefault (path, table)
+        self.hashes [table.resource_hash].append (table)
+        self.schemata [str (table.schema_path_yaml)].append (table)
+
+    def index_job (self, job : JobDesc) -> None:
+        name = name_key (job.atomic_name)
+        if (name in self.jobs):
+            self.duplicates.append (job)
+        self.jobs.setdefault (name, job)
+        for scope in job_scopes (job):
+            self.references [name_key (scope.table)].append ((job, scope))
+
+    def table (self, name : str) -> Optional[TableDesc]:
+        return (self.tables.get (name_key (name)))
+
+    def table_for_path (self, resource_path : str) -> Optional[TableDesc]:
+        return (self.paths.get (path_key (resource_path)))
+
+    def tables_for_hash (self, resource_hash : str) -> list[TableDesc]:
+        return (self.hashes.get (resource_hash, []))
+
+    def tables_for_schema (self, schema_path : str) -> list[TableDesc]:
+        return (self.schemata.get (str (schema_path), []))
+
+    def job (self, name : str) -> Optional[JobDesc]:
+        return (self.jobs.get (name_key (name)))
+
+    def jobs_for_table (self, name : str) -> list[tuple[JobDesc, ScopeDesc]]:
+        return (self.references.get (name_key (name), []))
+
+    def clash (self, table : TableDesc) -> Optional[TableDesc]:
+        '''
+        The table already in the manifest with the same data file, or
+        failing that, the same name as `table', if any.
+        '''
+        return (self.table_for_path (table.resource_path) or self.table (table.atomic_name))
+
+    def add_table (self, table : TableDesc) -> bool:
+        '''
+        Add `table' to the manifest unless it clashes with one already
+        there, returning whether it was added.
+        '''
+        if (self.clash (table) is not None):
+            return (False)
+        self.manifest.tables.append (table)
+        self.index_table (table)
+        return (True)
+
+    def update_hash (self, resource_path : str, resource_hash : str) -> Optional[TableDesc]:
+        '''
+        Set the hash of the table for the data file `resource_path',
+        returning the table, or `None' if there isn't one.
+        '''
+        table = self.table_for_path (resource_path)
+        if (table is not None):
+            self.hashes [table.resource_hash].remove (table)
+            table.resource_hash = resource_hash
+            self.hashes [resource_hash].append (table)
+        return (table)
+
+    def report (self, manifest : str) -> bool:
+        '''
+        Print repeated tables and jobs, which the RDF dumper would drop
+        silently, and warn of tables sharing a data file name, which are
+        uploaded to the same place, and of job scopes referring to tables
+        not in the manifest. Returns whether there were no repeats.
+        '''
+        for k in self.duplicates:
+            print (f"{k.__class__.__name__} {k.atomic_name} is in manifest {manifest} more than once")
+        for k in self.shared:
+            print (f"Warning: table {k.atomic_name} shares data file name {path_key (k.resource_path)} with table {self.table_for_path (k.resource_path).atomic_name} in manifest {manifest}")
+        for (job, scope) in self.dangling ():
+            print (f"Warning: job {job.atomic_name} uses column {scope.column} of table {scope.table}, which is not in manifest {manifest}")
+        return (not self.duplicates)
+
+    def dangling (self) -> list[tuple[JobDesc, ScopeDesc]]:
+        '''
+        Job scopes which refer to a table not in the manifest.
+        '''
+        return ([k for (name, refs) in self.references.items () if name not in self.tables
+                   for k in refs])
@@ -0,0 +1,119 @@
+import gzip
+from hashlib import sha384
+import logging
+from os.path import getsize
+from typing  import Collection, Optional
+
+from fisdat.columnar import ColumnarWriter
+from fisdat.stats    import StatsLoader, TableStats
+from fisdat.stream   import CsvStreamLoader
+from fisdat.utils    import atomic_output, validation_helper
+
+'''
+Single-pass ingest.
+
+Adding a data file otherwise reads it once to validate it, then again to
+hash it. Here the validator reads the file, and every block it reads is
+handed on, as it is read (a tee), to the hasher, to a collector of
+statistics about the file, and optionally to a gzip-compressed staging
+copy, so the file is read from disk once for all of them. The rows are
+likewise handed on, if asked, to a collector of column statistics (see
+`fisdat.stats') and to a columnar copy (see `fisdat.columnar').
+
+The validator stops at the first error, in which case the hash and the
+rest are incomplete and thrown away. The size of the file is checked
+against the bytes seen, in case it was appended to while being read.
+'''
+
+class Incomplete (Exception):
+    '''
+    The file wasn't read in full, so the compressed copy is abandoned.
+    '''
+    pass
+
+class FileStats (object):
+    '''
+    Statistics about a data file gathered as it is read.
+    '''
+    def __init__ (self) -> None:
+        self.size  = 0
+        self.lines = 0
+
+    def update (self, block : memoryview) -> None:
+        self.size  += len (block)
+        self.lines += block.tobytes ().count (b"\n")
+
+    def __repr__ (self) -> str:
+        return (f"FileStats (size = {self.size}, lines = {self.lines})")
+
+def compressed_path (data : str) -> str:
+    return (f"{data}.gz")
+
+def ingest_helper (data         : str
+                 , schema       : str
+                 , target_class : str
+                 , max_errors   : int                       = 1
+                 , report_path  : Optional[str]             = None
+                 , na_values    : Optional[Collection[str]] = None
+                 , na_columns   : Optional[Collection[str]] = None
+                 , compress     : bool                      = False
+                 , columns      : Optional[TableStats]      = None
+                 , cache        : Optional[ColumnarWriter]  = None) -> tuple[bool, Optional[str], FileStats]:
+    '''
+    Validate `data' against `schema', hashing it and gathering its
+    statistics in the same pass, see above. With `compress' set, a
+    gzip-compressed copy is written next to it as well. If `columns' is
+    given, the statistics of each column are gathered in it. If `cache'
+    is given, the columnar copy is written with it. The other arguments
+    are as for `validation_helper'.
+
+    Returns whether the file is valid, the hash of the whole file (`None'
+    if it isn't valid), and the statistics of the file.
+    '''
+    logging.debug (f"Called `ingest_helper (data = {data}, schema = {schema}, target_class = {target_class}, max_errors = {max_errors}, report_path = {report_path}, na_values = {na_values}, na_columns = {na_columns}, compress = {compress}, columns = {columns is not None}, cache = {cache is not None})'")
+    hasher = sha384 ()
+    stats  = FileStats ()
+    sinks  = [hasher.update, stats.update]
+    try:
+        if (not compress):
+            valid = validate_into (data, schema, target_class, sinks, max_errors, report_path, na_values, na_columns, columns, cache)
+        else:
+            try:
+                with atomic_output (compressed_path (data)) as staging, gzip.open (staging, "wb") as fp:
+                    valid = validate_into (data, schema, target_class, sinks + [fp.write], max_errors, report_path, na_values, na_columns, columns, cache)
+                    if (not valid or stats.size != getsize (data)):
+                        # Leaves any earlier compressed copy as it was
+                        raise Incomplete ()
+                print (f"Wrote compressed copy of {data} to {compressed_path (data)}")
+            except Incomplete:
+                pass
+        if (not valid):
+            return (False, None, stats)
+        if (stats.size != getsize (data)):
+            print (f"Data file {data} changed while it was being read, please try again")
+            return (False, None, stats)
+        logging.info (f"Read {data} once to validate and hash it: {stats}")
+        if (cache is not None):
+            cache.commit (hasher.hexdigest ())
+            cache = None
+        return (True, hasher.hexdigest (), stats)
+    finally:
+        # Not committed, so thrown away
+        if (cache is not None):
+            cache.abandon ()
+
+def validate_into (data         : str
+                 , schema       : str
+                 , target_class : str
+                 , sinks        : list
+                 , max_errors   : int
+                 , report_path  : Optional[str]
+                 , na_values    : Optional[Collection[str]]
+                 , na_columns   : Optional[Collection[str]]
+                 , columns      : Optional[TableStats]
+                 , cache        : Optional[ColumnarWriter]) -> bool:
+    loader = CsvStreamLoader (data, na_values = na_values, na_columns = na_columns, sinks = sinks)
+    for collector in (columns, cache):
+        if (collector is not None):
+            loader = StatsLoader (loader, collector)
+    return (validation_helper (data, schema, target_class, loader = loader, max_errors = max_errors, report_path = report_path))
@@ -0,0 +1,193 @@
+from linkml_runtime.dumpers import yaml_dumper
+
+import logging
+import mmap
+import os
+from os.path import getsize
+import re
+from typing  import Optional
+
+from fisdat.data_model import TableDesc
+from fisdat.utils      import TTL_IRI_ILLEGAL, atomic_output, ttl_literal
+
+'''
+Appending to a manifest without loading it.
+
+Loading a manifest, with the data model to interpret it, only to add one
+table and write the whole thing back costs time in proportion to the
+size of the manifest, plus the data model load. In the usual case, that
+of adding a new table to a manifest written by `fisdat', the new entry
+can instead be written straight into the serialised manifest:
+
+- For RDF/TTL, the triples describing the table, and the one linking it
+  to the manifest, are appended to the end of the file in one write
+- For YAML, the entry is inserted as the last item of the `tables' list
+
+Both are checked first, by a scan of the file rather than a parse, for
+the table already being in the manifest. Anything out of the ordinary
+is left to the full round-trip, which is what `None' signals below.
+
+Appending to the TTL file, rather than replacing it with a copy, keeps
+the cost of adding a table independent of the size of the manifest. It
+relies on the caller holding `manifest_lock'. A crash part way through
+the write leaves a statement cut short at the end of the file, which
+the next append finds, leaving the manifest to the full round-trip,
+which reports it.
+'''
+
+## how much of a TTL manifest to read for its prefix declarations
+HEAD_SIZE = 65536
+
+## how much of the end of a TTL manifest to read for its last statement
+TAIL_SIZE = 256
+
+def ttl_table (table : TableDesc) -> str:
+    '''
+    Serialise a table description in the same shape as `RDFLibDumper',
+    relative to the manifest's `@base'.
+    '''
+    properties = [("saved:resource_hash", ttl_literal (table.resource_hash))
+                , ("saved:resource_path", f"{ttl_literal (table.resource_path)}^^xsd:anyURI")
+                , ("saved:schema_path_yaml", f"{ttl_literal (table.schema_path_yaml)}^^xsd:anyURI")]
+    if (table.title is not None):
+        properties.insert (0, ("dcterms:title", ttl_literal (table.title)))
+    if (table.description is not None):
+        properties.insert (0, ("dcterms:description", ttl_literal (table.description)))
+    if (table.schema_path_ttl is not None):
+        properties.append (("saved:schema_path_ttl", f"{ttl_literal (table.schema_path_ttl)}^^xsd:anyURI"))
+
+    body = " ;\n".join (f"    {p} {o}" for (p, o) in properties)
+    return (f"<{table.atomic_name}> a saved:TableDesc ;\n{body} .\n")
+
+def file_contains (path : str, needles : list[bytes]) -> bool:
+    '''
+    Whether any of `needles' appears in the file, without reading it
+    into Python objects.
+    '''
+    if (getsize (path) == 0):
+        return (False)
+    with open (path, "rb") as fp:
+        with mmap.mmap (fp.fileno (), 0, access = mmap.ACCESS_READ) as view:
+            return (any (view.find (k) >= 0 for k in needles))
+
+def ttl_append (manifest      : str
+              , manifest_name : str
+              , table         : TableDesc) -> Optional[bool]:
+    logging.debug (f"Called `ttl_append (manifest = {manifest}, manifest_name = {manifest_name}, table = {table})'")
+    with open (manifest, "rb") as fp:
+        head = fp.read (HEAD_SIZE).decode ("utf-8", errors = "replace")
+
+    declared = lambda k : re.search (f"^@prefix {k}: ", head, re.MULTILINE) is not None
+    names    = [manifest_name, str (table.atomic_name)]
+    prefixes = ["saved", "xsd"] + (["dcterms"] if table.title is not None or table.description is not None else [])
+    if (not head.startswith ("@base <")
+        or not all (declared (k) for k in prefixes)
+        or any (TTL_IRI_ILLEGAL.search (k) for k in names)):
+        logging.info (f"Manifest {manifest} isn't laid out as expected for a fast append")
+        return (None)
+
+    size = getsize (manifest)
+    with open (manifest, "rb") as fp:
+        fp.seek (-min (size, TAIL_SIZE), 2)
+        tail = fp.read ()
+    if (not tail.rstrip ().endswith (b".")):
+        logging.info (f"Manifest {manifest} doesn't end with a whole statement, an append to it may have been cut short")
+        return (None)
+
+    root = f"<{manifest_name}> a saved:ManifestDesc".encode ("utf-8")
+    if (not file_contains (manifest, [root])):
+        logging.info (f"Manifest {manifest} has no root object {manifest_name}")
+        return (None)
+    if (file_contains (manifest, [f"<{table.atomic_name}> a ".encode ("utf-8")
+                                , f"saved:resource_path {ttl_literal (table.resource_path)}^^xsd:anyURI".encode ("utf-8")])):
+        return (False)
+
+    lead  = b"\n" if tail.endswith (b"\n") else b"\n\n"
+    entry = lead + f"<{manifest_name}> saved:tables <{table.atomic_name}> .\n\n{ttl_table (table)}".encode ("utf-8")
+    fd    = os.open (manifest, os.O_WRONLY | os.O_APPEND)
+    try:
+        if (os.write (fd, entry) != len (entry)):
+            raise OSError (f"Short write appending to {manifest}")
+        os.fsync (fd)
+    except OSError:
+        # Leaves the manifest as it was, for the full round-trip
+        os.ftruncate (fd, size)
+        raise
+    finally:
+        os.close (fd)
+    return (True)
+
+def yaml_table (table : TableDesc) -> list[str]:
+    '''
+    Serialise a table description as an item of the `tables' list.
+    '''
+    lines = yaml_dumper.dumps (table).rstrip ("\n").split ("\n")
+    return (["- " + lines [0]] + ["  " + k for k in lines [1:]])
+
+def yaml_append (manifest      : str
+               , table         : TableDesc
+               , local_version : Optional[str] = None) -> Optional[bool]:
+    logging.debug (f"Called `yaml_append (manifest = {manifest}, table = {table}, local_version = {local_version})'")
+    with open (manifest, "r") as fp:
+        lines = fp.read ().split ("\n")
+
+    top_level = [n for (n, k) in enumerate (lines) if re.match (r"^[a-z_]+:", k)]
+    tables    = [n for n in top_level if re.match (r"^tables:\s*$", lines [n])]
+    if (len (tables) != 1):
+        logging.info (f"Manifest {manifest} isn't laid out as expected for a fast append")
+        return (None)
+
+    begin = tables [0] + 1
+    end   = min ([n for n in top_level if n > tables [0]], default = len (lines))
+    block = lines [begin : end]
+    if (not block or not block [0].startswith ("- ")
+        or any (k and not (k.startswith ("- ") or k.startswith ("  ")) for k in block)):
+        logging.info (f"Tables in manifest {manifest} aren't a block list, can't do a fast append")
+        return (None)
+
+    unquote = lambda k : k.strip ().strip ("'\"")
+    for k in block:
+        (key, _, value) = k [2:].partition (":")
+        if ((key.strip () == "resource_path" and unquote (value) == str (table.resource_path))
+            or (key.strip () == "atomic_name" and unquote (value) == str (table.atomic_name))):
+            return (False)
+
+    # Insert after the last non-blank line of the block, to keep spacing
+    while (end > begin and lines [end - 1].strip () == ""):
+        end -= 1
+    lines [end:end] = yaml_table (table)
+
+    if (local_version is not None):
+        lines = [f"local_version: {yaml_dumper.dumps (local_version).strip ()}" if k.startswith ("local_version:") else k
+                 for k in lines]
+
+    with atomic_output (manifest) as staging:
+        with open (staging, "w") as fp:
+            fp.write ("\n".join (lines))
+    return (True)
+
+def fast_append (manifest       : str
+               , manifest_name  : str
+               , serialise_mode : str
+               , table          : TableDesc
+               , local_version  : Optional[str] = None) -> Optional[bool]:
+    '''
+    Add `table' to `manifest' in place, with `manifest_lock' held on it.
+    Returns `True' if it was added, `False' if a table with the same name
+    or data file is already in the manifest, and `None' if the manifest
+    needs the full round-trip.
+
+    The TTL manifest's `local_version' is left as it is, as changing it
+    would mean editing the file rather than appending to it.
+    '''
+    logging.debug (f"Called `fast_append (manifest = {manifest}, manifest_name = {manifest_name}, serialise_mode = {serialise_mode}, table = {table}, local_version = {local_version})'")
+    try:
+        if (serialise_mode == "ttl"):
+            return (ttl_append (manifest, manifest_name, table))
+        elif (serialise_mode == "yaml"):
+            return (yaml_append (manifest, table, local_version))
+        else:
+            return (None)
+    except (OSError, UnicodeDecodeError, ValueError) as e:
+        logging.info (f"Fast append to {manifest} failed: {e}")
+        return (None)
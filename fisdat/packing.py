@@ -0,0 +1,83 @@
+from hashlib import sha384
+import io
+import json
+import logging
+from os.path import getsize, isfile
+import tarfile
+from typing  import Iterable, Optional
+
+from fisdat.storage import Storage
+
+'''
+Packing small files.
+
+Besides its data files, a bundle has the `.index', the YAML and Turtle
+manifests, and the YAML and converted Turtle schemata, all small, and
+each uploaded with a request of its own. These can instead be packed
+into one tar archive, uploaded in one request. The last member of the
+archive is its member index, `PACK_INDEX', which gives the offset, size
+and hash of each member, so a reader can fetch one member with a ranged
+read, or use `unpack' to extract them all.
+'''
+
+## name of the archive in the bundle, and of its member index
+PACK       = "bundle.tar"
+PACK_INDEX = "bundle.tar.json"
+
+## files smaller than this, in bytes, are packed
+PACK_THRESHOLD = 1048576
+
+def unique_files (files : Iterable[Optional[str]]) -> list[str]:
+    '''
+    `files' without `None' entries or repeats, in their first order.
+    '''
+    return (list (dict.fromkeys (str (k) for k in files if k is not None)))
+
+def small_files (files : Iterable[str], threshold : int = PACK_THRESHOLD) -> list[str]:
+    '''
+    Those of `files' smaller than `threshold' bytes. Files not written
+    yet, as in a dry run, are the generated manifests, index and
+    schemata, and are taken to be small.
+    '''
+    return ([k for k in files if not isfile (k) or getsize (k) < threshold])
+
+def pack_files (files : list[str]) -> bytes:
+    '''
+    The tar archive of `files', ending with its member index.
+    '''
+    logging.debug (f"Called `pack_files (files = {files})'")
+    buffer = io.BytesIO ()
+    index  = {}
+    with tarfile.open (fileobj = buffer, mode = "w", format = tarfile.PAX_FORMAT) as tar:
+        for name in files:
+            with open (name, "rb") as fp:
+                data = fp.read ()
+            info = tarfile.TarInfo (name)
+            info.size = len (data)
+            tar.addfile (info, io.BytesIO (data))
+            ## the member's data ends the archive so far, padded to a block
+            blocks = (len (data) + tarfile.BLOCKSIZE - 1) // tarfile.BLOCKSIZE
+            offset = tar.offset - blocks * tarfile.BLOCKSIZE
+            index [name] = { "offset": offset, "size": len (data), "hash": sha384 (data).hexdigest () }
+        data = json.dumps (index, indent = 1).encode ("utf-8")
+        info = tarfile.TarInfo (PACK_INDEX)
+        info.size = len (data)
+        tar.addfile (info, io.BytesIO (data))
+    return (buffer.getvalue ())
+
+def unpack (storage : Storage
+          , key     : str) -> dict[str, bytes]:
+    '''
+    The members of the archive `key', checked against its member index.
+    '''
+    logging.debug (f"Called `unpack (key = {key})'")
+    data = storage.read (key)
+    if (data is None):
+        raise FileNotFoundError (f"There is no archive {storage.url (key)}")
+    with tarfile.open (fileobj = io.BytesIO (data), mode = "r") as tar:
+        members = { k.name: tar.extractfile (k).read () for k in tar.getmembers () if k.isfile () }
+    index = json.loads (members.pop (PACK_INDEX))
+    for (name, entry) in index.items ():
+        if (sha384 (members [name]).hexdigest () != entry ["hash"]):
+            raise ValueError (f"Member {name} of archive {storage.url (key)} is corrupt")
+    return (members)
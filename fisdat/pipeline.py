@@ -0,0 +1,156 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import dataclasses
+import logging
+from pathlib import PurePath
+from typing  import Callable, Optional
+
+from fisdat.data_model import TableDesc
+from fisdat.stats      import table_sidecar
+
+'''
+Pipelined uploads.
+
+Otherwise `fisup' runs in phases: every table is checked against its
+hash and its schema converted, then the manifests and index written,
+then everything uploaded, so the network is idle while tables are
+checked and the processor is idle while they upload. With `--pipeline',
+tables are checked in worker threads, and each table's data file and
+schemata are uploaded, in threads of their own, as soon as that table
+has been checked and its schema converted, while the rest are still
+being checked. Each table is marked complete once its files are
+uploaded and every table has been checked, so no table is marked
+complete in a bundle which is then given up on, see `fisdat.commit'.
+Each schema is converted once, however many tables share it. Hashing
+and uploading release the GIL, so threads overlap them.
+
+The manifests and `.index' are only written once every table has been
+checked and uploaded, then uploaded last, so a bundle without its index
+is incomplete, whatever else was uploaded. The time taken is then nearer
+the longer of checking and uploading than their sum.
+'''
+
+## threads checking tables and converting schemata, and uploading
+WORKERS = 4
+JOBS    = 4
+
+class Pipeline (object):
+    '''
+    `check' checks a table against its hash, giving whether it matched
+    and the table, as `coalesce_table' without converting its schema.
+    `convert', if given, converts a YAML schema, giving whether it did
+    and the path of the turtle schema, as `coalesce_schema'. `transfer'
+    uploads one file, as `upload_file'. `complete', if given, marks a
+    table complete once its files are uploaded, see `fisdat.commit'.
+    '''
+    def __init__ (self
+                , check    : Callable[[TableDesc], tuple[bool, TableDesc]]
+                , convert  : Optional[Callable[[str], tuple[bool, PurePath]]]
+                , transfer : Callable[[str], None]
+                , complete : Optional[Callable[[TableDesc], None]] = None
+                , fake_cwd : str = ""
+                , workers  : int = WORKERS
+                , jobs     : int = JOBS) -> None:
+        self.check    = check
+        self.convert  = convert
+        self.transfer = transfer
+        self.complete = complete
+        self.fake_cwd = fake_cwd
+        self.workers  = workers
+        self.jobs     = jobs
+
+    def coalesce_tables (self, tables : list[TableDesc]) -> tuple[tuple[bool], tuple[TableDesc]]:
+        '''
+        Check, convert and upload `tables', giving whether each succeeded
+        and the table with its turtle schema, as `coalesce_manifest' needs.
+        '''
+        logging.debug (f"Called `coalesce_tables (tables = {len (tables)})'")
+        results = asyncio.run (self.run (list (tables)))
+        return (tuple (zip (*results)) or ((), ()))
+
+    async def run (self, tables : list[TableDesc]) -> list[tuple[bool, TableDesc]]:
+        self.loop      = asyncio.get_running_loop ()
+        self.failed    = False
+        self.schemata  = {}
+        self.uploads   = {}
+        self.remaining = len (tables)
+        self.checked   = asyncio.Event ()
+        if (not tables):
+            self.checked.set ()
+        with ThreadPoolExecutor (self.workers) as self.cpu, ThreadPoolExecutor (self.jobs) as self.net:
+            results = await asyncio.gather (*[self.table (k) for k in tables])
+            await asyncio.gather (*self.uploads.values ())
+        return (results)
+
+    async def table (self, tab : TableDesc) -> tuple[bool, TableDesc]:
+        (success, tab) = await self.loop.run_in_executor (self.cpu, self.check, tab)
+        if (not success):
+            return (self.done_checking (False), tab)
+        uploads = [self.upload (tab.resource_path), self.upload (tab.schema_path_yaml)]
+        if (table_sidecar (tab, self.fake_cwd) is not None):
+            uploads.append (self.upload (table_sidecar (tab, self.fake_cwd)))
+        if (self.convert is not None):
+            (success, path_ttl) = await self.schema (tab.schema_path_yaml)
+            if (not success):
+                return (self.done_checking (False), tab)
+            tab = dataclasses.replace (tab, schema_path_ttl = path_ttl.name)
+            uploads.append (self.upload (tab.schema_path_ttl))
+        self.done_checking (True)
+        if (not all (await asyncio.gather (*uploads))):
+            return (False, tab)
+        await self.checked.wait ()
+        if (self.failed):
+            print (f"Not marking table {tab.atomic_name} complete, as the bundle is incomplete")
+            return (False, tab)
+        if (self.complete is not None):
+            return (await self.in_thread (self.complete, tab, f"the completion marker of {tab.atomic_name}"), tab)
+        return (True, tab)
+
+    def done_checking (self, success : bool) -> bool:
+        '''
+        Count one more table checked, and converted, letting the tables
+        waiting to be marked complete go once every table has been.
+        '''
+        self.failed     = self.failed or not success
+        self.remaining -= 1
+        if (self.remaining == 0):
+            self.checked.set ()
+        return (success)
+
+    def schema (self, schema_path_yaml : str) -> asyncio.Future:
+        '''
+        The conversion of `schema_path_yaml', started by the first table
+        which needs it.
+        '''
+        if (schema_path_yaml not in self.schemata):
+            self.schemata [schema_path_yaml] = self.loop.run_in_executor (self.cpu, self.convert, f"{self.fake_cwd}{schema_path_yaml}")
+        return (self.schemata [schema_path_yaml])
+
+    def upload (self, fname : str) -> asyncio.Future:
+        '''
+        The upload of `fname', started the first time it is asked for,
+        unless a table has already failed, as the bundle won't be
+        completed.
+        '''
+        fname = str (fname)
+        if (fname not in self.uploads):
+            if (self.failed):
+                print (f"Not uploading {fname}, as the bundle is incomplete")
+                self.uploads [fname] = self.loop.create_future ()
+                self.uploads [fname].set_result (False)
+            else:
+                self.uploads [fname] = asyncio.ensure_future (self.in_thread (self.transfer, fname, fname))
+        return (self.uploads [fname])
+
+    async def in_thread (self, upload : Callable, target, name : str) -> bool:
+        '''
+        Run `upload' of `target' (called `name' in messages) in an upload
+        thread, giving whether it succeeded.
+        '''
+        try:
+            await self.loop.run_in_executor (self.net, upload, target)
+            return (True)
+        except Exception as e:
+            print (f"Uploading {name} failed: {e}")
+            self.failed = True
+            return (False)
@@ -0,0 +1,147 @@
+from linkml_runtime.dumpers      import yaml_dumper
+from linkml_runtime.linkml_model import SchemaDefinition
+from linkml_runtime.loaders      import YAMLLoader, yaml_loader
+
+import logging
+import os
+from os.path import dirname, isfile
+from pathlib import PurePath
+import tempfile
+from typing  import Collection, Optional
+
+import yaml.scanner
+
+from fisdat.data_model import ManifestDesc
+from fisdat.fragments  import is_fragmented, merge_fragments
+from fisdat.index      import ManifestIndex
+from fisdat.stream     import CsvStreamLoader, read_header
+from fisdat.tiered     import header_check, schema_slots
+from fisdat.utils      import extension_helper, validation_helper
+
+'''
+Column-projection validation.
+
+Jobs only use the columns named in their `job_scope_*' entries, which
+for a wide table may be a handful of its columns. Validating and parsing
+only these, against a copy of the schema pruned to match, and checking
+only the structure of the rest, is much quicker than full validation.
+'''
+
+def scope_columns (data     : str
+                 , manifest : str) -> Optional[list[str]]:
+    '''
+    The columns of `data' named in the job scopes of a YAML manifest, in
+    order of first appearance. The table is identified by its resource
+    path, or by the stem of the data file's name if it is not yet in the
+    manifest, which is the atomic name `fisdat' would give it.
+    '''
+    logging.debug (f"Called `scope_columns (data = {data}, manifest = {manifest})'")
+    data_path = PurePath (data)
+    try:
+        if (is_fragmented (manifest)):
+            manifest_obj = merge_fragments (manifest)
+        else:
+            manifest_obj = YAMLLoader ().load (source = manifest, target_class = ManifestDesc)
+    except (yaml.scanner.ScannerError, ValueError, TypeError, OSError) as e:
+        print (f"Cannot load file {manifest} with the YAML loader to find the columns used by jobs: {e}")
+        return (None)
+
+    index   = ManifestIndex (manifest_obj)
+    found   = index.table_for_path (data)
+    table   = str (found.atomic_name) if found is not None else data_path.stem
+    columns = []
+    for (_, scope) in index.jobs_for_table (table):
+        if (scope.column not in columns):
+            columns.append (scope.column)
+    logging.info (f"Columns of table {table} used by jobs in {manifest}: {columns}")
+    return (columns)
+
+def prune_schema (schema       : str
+                , target_class : str
+                , columns      : Collection[str]) -> str:
+    '''
+    Write a copy of `schema' in which `target_class' only has the slots
+    in `columns', returning its path. The copy goes in the system's
+    temporary directory, with imports relative to the original made
+    absolute so that they still resolve. The caller is responsible for
+    removing it.
+    '''
+    logging.debug (f"Called `prune_schema (schema = {schema}, target_class = {target_class}, columns = {columns})'")
+    schema_obj = yaml_loader.load (schema, target_class = SchemaDefinition)
+    class_obj  = schema_obj.classes [target_class]
+
+    class_obj.slots      = [k for k in class_obj.slots if k in columns]
+    class_obj.attributes = {k: v for (k, v) in class_obj.attributes.items () if k in columns}
+    class_obj.slot_usage = {k: v for (k, v) in class_obj.slot_usage.items () if k in columns}
+
+    # CURIEs and URLs have a colon, anything else is a path relative to the schema
+    base               = dirname (os.path.abspath (schema))
+    schema_obj.imports = [k if ":" in k else os.path.normpath (os.path.join (base, k)) for k in schema_obj.imports]
+
+    (handle, path) = tempfile.mkstemp (prefix = f"{PurePath (schema).stem}.projected."
+                                     , suffix = ".yaml")
+    os.close (handle)
+    yaml_dumper.dump (schema_obj, path)
+    return (path)
+
+def projection_helper (data         : str
+                     , schema       : str
+                     , target_class : str
+                     , columns      : Collection[str]
+                     , max_errors   : int                       = 1
+                     , report_path  : Optional[str]             = None
+                     , na_values    : Optional[Collection[str]] = None
+                     , na_columns   : Optional[Collection[str]] = None) -> bool:
+    '''
+    Validate `data' in full only in `columns', checking the header and
+    the structure of the remaining columns. Falls back on validating the
+    whole file where the columns can't be projected, e.g. if the target
+    class inherits its slots. Other arguments are as for
+    `validation_helper'.
+    '''
+    logging.debug (f"Called `projection_helper (data = {data}, schema = {schema}, target_class = {target_class}, columns = {columns}, max_errors = {max_errors}, report_path = {report_path}, na_values = {na_values}, na_columns = {na_columns})'")
+    options = { "max_errors": max_errors, "report_path": report_path, "na_values": na_values, "na_columns": na_columns }
+
+    if (not (isfile (data) and isfile (schema))):
+        return (validation_helper (data, schema, target_class, **options))
+    if (extension_helper (PurePath (data)) != "csv"):
+        print (f"Cannot project {data} onto the columns used by jobs, as it isn't a CSV file, validating all columns")
+        return (validation_helper (data, schema, target_class, **options))
+
+    slots = schema_slots (schema, target_class)
+    if (slots is None):
+        print (f"Invalid target class {target_class}")
+        return (False)
+
+    (names, required) = slots
+    class_obj         = yaml_loader.load (schema, target_class = SchemaDefinition).classes [target_class]
+    (header, _)       = read_header (data)
+    projected         = [k for k in columns if k in names and k in header]
+    unknown           = [k for k in columns if k not in projected]
+
+    if (unknown):
+        print (f"Warning: columns used by jobs but not in both {data} and schema {schema}: {', '.join (unknown)}")
+    if (class_obj.is_a is not None or class_obj.mixins or not projected):
+        print (f"Cannot project {data} onto the columns used by jobs, validating all columns")
+        return (validation_helper (data, schema, target_class, **options))
+    if (not header_check (data, schema, target_class)):
+        return (False)
+
+    print (f"Validating columns {', '.join (projected)} of {data}, and the structure of the other {len (header) - len (projected)}")
+    loader = CsvStreamLoader (data
+                            , na_values  = na_values
+                            , na_columns = na_columns
+                            , columns    = projected
+                            , required   = [k for k in required if k not in projected])
+    pruned = prune_schema (schema, target_class, projected)
+    try:
+        result = validation_helper (data, pruned, target_class, loader = loader, max_errors = max_errors, report_path = report_path)
+    finally:
+        os.remove (pruned)
+
+    if (loader.malformed):
+        print (f"Structural errors in {data}:")
+        for (row, begin, problem) in loader.malformed [0 : max (1, max_errors)]:
+            print (f"-> Row {row}, byte {begin}: {problem}")
+        return (False)
+    return (bool (result))
@@ -0,0 +1,110 @@
+from linkml_runtime.linkml_model import SchemaDefinition
+from linkml_runtime.loaders      import yaml_loader
+
+from linkml.validator.loaders            import Loader
+from linkml.validator.validation_context import ValidationContext
+
+import json
+import logging
+from typing import Any, Optional
+
+'''
+Collect-all-errors validation.
+
+Rather than stopping at the first error, as `validation_helper' does by
+default, validate every row, collecting errors up to some budget. Each
+error records where it was found (row, column and byte offset, when the
+loader keeps track of these), and errors are grouped by their kind, i.e.
+the JSON Schema keyword which failed (`type', `required', `pattern', &c.)
+'''
+
+def error_columns (error) -> list[Optional[str]]:
+    '''
+    The column(s) an error refers to. Most errors have the column as the
+    first element of their path, but `required' and `additionalProperties'
+    errors are raised against the row as a whole.
+    '''
+    if (error.absolute_path):
+        return ([str (error.absolute_path [0])])
+    elif (error.validator == "required" and isinstance (error.instance, dict)):
+        return ([k for k in error.validator_value if k not in error.instance])
+    elif (error.validator == "additionalProperties" and isinstance (error.instance, dict)):
+        known = error.schema.get ("properties", {})
+        return ([k for k in error.instance if k not in known])
+    else:
+        return ([None])
+
+def collect_errors (loader       : Loader
+                  , schema       : str
+                  , target_class : str
+                  , max_errors   : int) -> dict[str, Any]:
+    '''
+    Validate all instances provided by `loader', returning a report of
+    at most `max_errors' errors. This uses the same JSON Schema validator
+    as `validate_file', via the same LinkML validation context. A budget
+    of less than one error still records the first one, so that invalid
+    data is never reported as error-free.
+    '''
+    logging.debug (f"Called `collect_errors (loader = {loader}, schema = {schema}, target_class = {target_class}, max_errors = {max_errors})'")
+    max_errors = max (1, max_errors)
+    schema_obj = yaml_loader.load (schema, target_class = SchemaDefinition)
+    schema_obj.source_file = schema
+    context    = ValidationContext (schema_obj, target_class)
+    validator  = context.json_schema_validator (closed                          = True
+                                              , include_range_class_descendants = True
+                                              , path_override                   = None)
+    offsets    = getattr (loader, "offsets", None)
+    kinds      = {}
+    count      = 0
+    rows       = 0
+    truncated  = False
+
+    for (index, instance) in enumerate (loader.iter_instances ()):
+        rows = index + 1
+        for error in validator.iter_errors (instance):
+            for column in error_columns (error):
+                if (count >= max_errors):
+                    truncated = True
+                    break
+                kind  = kinds.setdefault (error.validator, { "count": 0, "columns": {}, "errors": [] })
+                entry = { "row"        : index + 1
+                        , "column"     : column
+                        , "byte_offset": offsets [index][0] if offsets else None
+                        , "value"      : instance.get (column) if column is not None else None
+                        , "message"    : error.message }
+                kind ["count"] += 1
+                kind ["columns"][str (column)] = kind ["columns"].get (str (column), 0) + 1
+                kind ["errors"].append (entry)
+                count += 1
+            if (truncated):
+                break
+        if (truncated):
+            break
+
+    return ({ "target_class": target_class
+            , "schema"      : schema
+            , "rows_checked": rows
+            , "error_count" : count
+            , "truncated"   : truncated
+            , "kinds"       : kinds })
+
+def print_report (report : dict[str, Any]) -> None:
+    '''
+    Summarise a report on the terminal, one line per kind of error and
+    column, showing the first place each one was found.
+    '''
+    if (report ["truncated"]):
+        print (f"Validation stopped after {report ['error_count']} errors in the first {report ['rows_checked']} rows:")
+    else:
+        print (f"Validation found {report ['error_count']} errors in {report ['rows_checked']} rows:")
+
+    for (kind, details) in sorted (report ["kinds"].items ()):
+        for (column, n) in sorted (details ["columns"].items ()):
+            first = next (e for e in details ["errors"] if str (e ["column"]) == column)
+            where = f"row {first ['row']}" if first ["byte_offset"] is None else f"row {first ['row']}, byte {first ['byte_offset']}"
+            print (f"-> {kind}: column {column}: {n} error(s), first at {where}: {first ['message']}")
+
+def write_report (report : dict[str, Any], path : str) -> str:
+    with open (path, "w") as fp:
+        json.dump (report, fp, indent = 2, default = str)
+    return (path)
@@ -0,0 +1,141 @@
+import base64
+from hashlib import blake2b
+import math
+import random
+from typing  import Iterable, Optional
+
+'''
+Sketches of the values of a column, for tables too large to keep all of
+their distinct values or numbers in memory.
+
+`HyperLogLog' estimates how many distinct values there are from the
+longest run of leading zero bits among their hashes, in each of
+2^`precision' registers, to within about 1.04 / sqrt (2^`precision'),
+1.6% by default, in 4kB. `KLL' (Karnin, Lang and Liberty) keeps a sample
+of the numbers in levels, each twice the weight of the one below, in
+which the lower levels are sorted and every other one promoted when
+they fill up, so any quantile is known to within a rank error of about
+1.7 / `k', 1% by default, in a few hundred numbers.
+
+Both merge with others of their kind, taking the register-wise maximum
+and pooling the levels respectively, so sketches of parts of a table,
+worked out in parallel, or of several tables, merge into the sketch of
+the whole. Values are hashed with BLAKE2 rather than Python's `hash',
+which differs between processes, so sketches from different runs merge
+as well.
+'''
+
+## registers of a HyperLogLog sketch, as a power of two
+PRECISION = 12
+
+## size of the top level of a KLL sketch, and shrinking of the lower ones
+KLL_K = 200
+KLL_C = 2 / 3
+
+class HyperLogLog (object):
+    def __init__ (self, precision : int = PRECISION, registers : Optional[bytes] = None) -> None:
+        self.precision = precision
+        self.registers = bytearray (registers or bytes (1 << precision))
+
+    def update (self, values : Iterable) -> None:
+        '''
+        Add `values', compared by their string forms.
+        '''
+        (registers, shift) = (self.registers, 64 - self.precision)
+        mask = (1 << shift) - 1
+        for value in values:
+            # The top bits pick the register, the rest give the rank
+            x    = int.from_bytes (blake2b (str (value).encode ("utf-8"), digest_size = 8).digest (), "big")
+            rank = shift - (x & mask).bit_length () + 1
+            if (rank > registers [x >> shift]):
+                registers [x >> shift] = rank
+
+    def merge (self, other : "HyperLogLog") -> None:
+        if (other.precision != self.precision):
+            raise ValueError (f"Cannot merge HyperLogLog sketches of precision {self.precision} and {other.precision}")
+        self.registers = bytearray (max (a, b) for (a, b) in zip (self.registers, other.registers))
+
+    def estimate (self) -> int:
+        m        = len (self.registers)
+        estimate = 0.7213 / (1 + 1.079 / m) * m * m / sum (2.0 ** -k for k in self.registers)
+        zeros    = self.registers.count (0)
+        if (estimate <= 2.5 * m and zeros):
+            # Few values, so count the registers still empty instead
+            estimate = m * math.log (m / zeros)
+        return (round (estimate))
+
+    def to_dict (self) -> dict:
+        return ({ "precision": self.precision, "registers": base64.b64encode (self.registers).decode ("ascii") })
+
+    @classmethod
+    def from_dict (cls, entry : dict) -> "HyperLogLog":
+        return (cls (entry ["precision"], base64.b64decode (entry ["registers"])))
+
+class KLL (object):
+    def __init__ (self, k : int = KLL_K, levels : Optional[list[list[float]]] = None, seed : int = 0) -> None:
+        self.k      = k
+        self.levels = levels or [[]]
+        # A fixed seed, so the same data give the same sketch
+        self.random = random.Random (seed)
+
+    def capacity (self, level : int) -> int:
+        return (math.ceil (self.k * KLL_C ** (len (self.levels) - level - 1)) + 1)
+
+    def size (self) -> int:
+        return (sum (len (k) for k in self.levels))
+
+    def full (self) -> bool:
+        return (self.size () >= sum (self.capacity (k) for k in range (len (self.levels))))
+
+    def update (self, numbers : list[float]) -> None:
+        self.levels [0].extend (numbers)
+        while (self.full ()):
+            self.compact ()
+
+    def compact (self) -> None:
+        '''
+        Promote every other number of each full level, from a random
+        start, to the level above, at twice the weight.
+        '''
+        for level in range (len (self.levels)):
+            if (len (self.levels [level]) < self.capacity (level)):
+                continue
+            if (level + 1 == len (self.levels)):
+                self.levels.append ([])
+            items = sorted (self.levels [level])
+            # An odd one out stays behind
+            (self.levels [level], items) = (items [-1:] if len (items) % 2 else [], items [: len (items) - len (items) % 2])
+            self.levels [level + 1].extend (items [self.random.randrange (2) :: 2])
+            if (not self.full ()):
+                return
+
+    def merge (self, other : "KLL") -> None:
+        while (len (self.levels) < len (other.levels)):
+            self.levels.append ([])
+        for (level, items) in enumerate (other.levels):
+            self.levels [level].extend (items)
+        while (self.full ()):
+            self.compact ()
+
+    def count (self) -> int:
+        return (sum (len (k) << n for (n, k) in enumerate (self.levels)))
+
+    def quantiles (self, fractions : list[float]) -> list[Optional[float]]:
+        '''
+        The numbers at each of `fractions' of the way through, in order.
+        '''
+        weighted = sorted ((x, 1 << n) for (n, k) in enumerate (self.levels) for x in k)
+        (total, result, seen, rank) = (self.count (), [], 0, 0)
+        for q in fractions:
+            while (rank < len (weighted) and seen + weighted [rank] [1] < q * total):
+                seen += weighted [rank] [1]
+                rank += 1
+            result.append (weighted [min (rank, len (weighted) - 1)] [0] if weighted else None)
+        return (result)
+
+    def to_dict (self) -> dict:
+        return ({ "k": self.k, "levels": self.levels })
+
+    @classmethod
+    def from_dict (cls, entry : dict) -> "KLL":
+        return (cls (entry ["k"], [list (k) for k in entry ["levels"]]))
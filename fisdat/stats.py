@@ -0,0 +1,313 @@
+from collections import Counter
+import json
+import logging
+from os.path import isfile
+from pathlib import PurePath
+from typing  import Collection, Iterator, Optional
+
+from linkml.validator.loaders import Loader
+
+from fisdat.data_model import TableDesc
+from fisdat.sketch     import KLL, HyperLogLog
+from fisdat.stream     import CsvStreamLoader
+from fisdat.utils      import atomic_output
+
+'''
+Descriptive statistics of data files.
+
+With `--stats', `fisdat' works out statistics for each column of a data
+file from the same read which validates and hashes it (see
+`fisdat.ingest'), and writes them to a JSON sidecar next to it, e.g.
+`sentinel_cages_cleaned.csv.stats.json'. The manifest doesn't name it,
+as the data model has no slot for it: it is found from the name of the
+data file (see `stats_path'), and `fisup' uploads it with the table, and
+lists it in the table's completion marker, if it describes the data file
+as it is, so jobs can plan their work from ranges and counts without
+reading the data.
+
+For each column there is the number of rows with a value (`count') and
+without (`nulls'), then over its numbers, the smallest, largest, mean
+and (sample) variance, and over its other values, the most common ones
+with their counts (`top').
+
+Rows are taken `BATCH' at a time, each column of a batch summarised with
+built-in functions over a list of its values, and the summaries of the
+batches merged: counts add, and means and variances combine as in Chan,
+Golub and LeVeque's parallel algorithm. The summaries of parts of a
+file, or of several files, merge the same way. Other values are counted
+exactly until a column has more than `CATEGORY_LIMIT' distinct ones, and
+from then on by the Misra-Gries summary, keeping that many counters,
+which undercount but are still mergeable, and `top_exact' is false.
+
+The number of distinct values (`approx_distinct') and the `QUANTILES'
+of the numbers (`quantiles') would take memory in proportion to the
+data to know exactly, so they are estimated from sketches of bounded
+size, see `fisdat.sketch'. The sketches are written to the sidecar too
+(`sketches'), so the statistics of parts of a table, or of several
+tables, read back with `TableStats.from_dict', merge into those of the
+whole, see `merge_stats'.
+'''
+
+## rows summarised at a time
+BATCH = 65536
+
+## distinct values counted exactly, and most common values reported
+CATEGORY_LIMIT = 10000
+TOP_K          = 10
+
+## quantiles of the numbers reported
+QUANTILES = (0.01, 0.05, 0.25, 0.5, 0.75, 0.95, 0.99)
+
+def stats_path (data : str) -> str:
+    return (f"{data}.stats.json")
+
+class ColumnStats (object):
+    def __init__ (self) -> None:
+        self.count      = 0
+        self.nulls      = 0
+        self.numbers    = 0
+        self.minimum    = None
+        self.maximum    = None
+        self.mean       = 0.0
+        self.m2         = 0.0
+        self.categories = Counter ()
+        self.exact      = True
+        self.distinct   = HyperLogLog ()
+        self.sample     = KLL ()
+
+    def update (self, values : list, rows : int) -> None:
+        '''
+        Add the `values' of this column in a batch of `rows' rows.
+        '''
+        present     = [k for k in values if k is not None]
+        self.count += len (present)
+        self.nulls += rows - len (present)
+        self.distinct.update (present)
+        # NaN is neither larger nor smaller than anything, so leave it out
+        numbers     = [k for k in present if type (k) in (int, float) and k == k]
+        if (numbers):
+            batch = ColumnStats ()
+            batch.numbers = len (numbers)
+            batch.minimum = min (numbers)
+            batch.maximum = max (numbers)
+            batch.mean    = sum (numbers) / len (numbers)
+            batch.m2      = sum ((k - batch.mean) ** 2 for k in numbers)
+            self.merge_numbers (batch)
+            self.sample.update (numbers)
+        if (len (numbers) < len (present)):
+            self.categories.update (str (k) for k in present if type (k) not in (int, float))
+            self.prune ()
+
+    def merge_numbers (self, other : "ColumnStats") -> None:
+        if (other.numbers == 0):
+            return
+        if (self.numbers == 0):
+            (self.numbers, self.minimum, self.maximum, self.mean, self.m2) = (other.numbers, other.minimum, other.maximum, other.mean, other.m2)
+            return
+        total        = self.numbers + other.numbers
+        delta        = other.mean - self.mean
+        self.mean   += delta * other.numbers / total
+        self.m2     += other.m2 + delta * delta * self.numbers * other.numbers / total
+        self.numbers = total
+        self.minimum = min (self.minimum, other.minimum)
+        self.maximum = max (self.maximum, other.maximum)
+
+    def prune (self) -> None:
+        '''
+        Keep at most `CATEGORY_LIMIT' counters, taking the count of the
+        first one dropped off every counter (Misra-Gries).
+        '''
+        if (len (self.categories) <= CATEGORY_LIMIT):
+            return
+        cut = sorted (self.categories.values (), reverse = True) [CATEGORY_LIMIT]
+        self.categories = Counter ({ k: v - cut for (k, v) in self.categories.items () if v > cut })
+        self.exact      = False
+
+    def merge (self, other : "ColumnStats") -> None:
+        self.count += other.count
+        self.nulls += other.nulls
+        self.merge_numbers (other)
+        self.distinct.merge (other.distinct)
+        self.sample.merge (other.sample)
+        self.categories.update (other.categories)
+        self.exact  = self.exact and other.exact
+        self.prune ()
+
+    def to_dict (self, top : int = TOP_K) -> dict:
+        result = { "count": self.count, "nulls": self.nulls, "approx_distinct": self.distinct.estimate () }
+        if (self.numbers):
+            result.update ({ "numbers"  : self.numbers
+                           , "min"      : self.minimum
+                           , "max"      : self.maximum
+                           , "mean"     : self.mean
+                           , "variance" : self.m2 / (self.numbers - 1) if self.numbers > 1 else 0.0
+                           , "quantiles": dict (zip (map (str, QUANTILES), self.sample.quantiles (QUANTILES))) })
+        if (self.categories):
+            result.update ({ "top"      : [[k, v] for (k, v) in self.categories.most_common (top)]
+                           , "distinct" : len (self.categories)
+                           , "top_exact": self.exact })
+        result ["sketches"] = { "distinct": self.distinct.to_dict (), "numbers": self.sample.to_dict () }
+        return (result)
+
+    @classmethod
+    def from_dict (cls, entry : dict) -> "ColumnStats":
+        '''
+        Statistics as written by `to_dict', to merge with others. Only
+        the most common values written are known.
+        '''
+        column = cls ()
+        (column.count, column.nulls) = (entry ["count"], entry ["nulls"])
+        if ("numbers" in entry):
+            column.numbers = entry ["numbers"]
+            (column.minimum, column.maximum, column.mean) = (entry ["min"], entry ["max"], entry ["mean"])
+            column.m2      = entry ["variance"] * max (column.numbers - 1, 0)
+        column.categories = Counter ({ k: v for (k, v) in entry.get ("top", []) })
+        column.exact      = entry.get ("top_exact", True) and entry.get ("distinct", 0) <= len (column.categories)
+        if ("sketches" in entry):
+            column.distinct = HyperLogLog.from_dict (entry ["sketches"] ["distinct"])
+            column.sample   = KLL.from_dict (entry ["sketches"] ["numbers"])
+        return (column)
+
+class TableStats (object):
+    '''
+    Statistics of each column of a table, gathered from its instances as
+    they are validated, see `StatsLoader'.
+    '''
+    def __init__ (self, columns : Optional[list[str]] = None) -> None:
+        self.rows    = 0
+        self.columns = { k: ColumnStats () for k in (columns or []) }
+        self.batch   = []
+
+    def add (self, instance : dict) -> None:
+        self.batch.append (instance)
+        if (len (self.batch) >= BATCH):
+            self.flush ()
+
+    def flush (self, header : Optional[list[str]] = None) -> None:
+        '''
+        Summarise the rows taken so far, and add any columns of `header'
+        without a value yet.
+        '''
+        for name in (header or []):
+            if (name not in self.columns):
+                self.columns [name] = ColumnStats ()
+                self.columns [name].nulls = self.rows
+        if (not self.batch):
+            return
+        names = dict.fromkeys (self.columns)
+        for instance in self.batch:
+            names.update (dict.fromkeys (instance))
+        for name in names:
+            if (name not in self.columns):
+                self.columns [name] = ColumnStats ()
+                self.columns [name].nulls = self.rows
+            self.columns [name].update ([k.get (name) for k in self.batch], len (self.batch))
+        self.rows += len (self.batch)
+        self.batch = []
+
+    def merge (self, other : "TableStats") -> None:
+        self.flush ()
+        other.flush ()
+        for name in set (self.columns) | set (other.columns):
+            if (name not in self.columns):
+                self.columns [name] = ColumnStats ()
+                self.columns [name].nulls = self.rows
+            if (name in other.columns):
+                self.columns [name].merge (other.columns [name])
+            else:
+                self.columns [name].nulls += other.rows
+        self.rows += other.rows
+
+    def to_dict (self) -> dict:
+        self.flush ()
+        return ({ "rows": self.rows, "columns": { k: v.to_dict () for (k, v) in self.columns.items () } })
+
+    @classmethod
+    def from_dict (cls, entry : dict) -> "TableStats":
+        table = cls ()
+        table.rows    = entry ["rows"]
+        table.columns = { k: ColumnStats.from_dict (v) for (k, v) in entry ["columns"].items () }
+        return (table)
+
+class StatsLoader (Loader):
+    '''
+    The instances of `loader', gathering their statistics in `stats' as
+    they are handed out. Anything else taking instances the same way, such
+    as a `fisdat.columnar.ColumnarWriter', can take the place of `stats'.
+    '''
+    def __init__ (self, loader : Loader, stats : TableStats) -> None:
+        super ().__init__ (loader.source)
+        self.loader = loader
+        self.stats  = stats
+
+    @property
+    def header (self) -> Optional[list[str]]:
+        return (getattr (self.loader, "header", None))
+
+    def iter_instances (self) -> Iterator[dict]:
+        for instance in self.loader.iter_instances ():
+            self.stats.add (instance)
+            yield (instance)
+        self.stats.flush (self.header)
+
+def table_stats (data       : str
+                , na_values  : Optional[Collection[str]] = None
+                , na_columns : Optional[Collection[str]] = None) -> TableStats:
+    '''
+    The statistics of `data' in a pass of their own, for when it isn't
+    validated in full.
+    '''
+    logging.debug (f"Called `table_stats (data = {data}, na_values = {na_values}, na_columns = {na_columns})'")
+    stats = TableStats ()
+    for _ in StatsLoader (CsvStreamLoader (data, na_values = na_values, na_columns = na_columns), stats).iter_instances ():
+        pass
+    return (stats)
+
+def write_stats (data : str, stats : TableStats, resource_hash : str) -> str:
+    '''
+    Write the sidecar of `data', giving the hash of the data it describes,
+    returning its name.
+    '''
+    path = stats_path (data)
+    with atomic_output (path) as staging:
+        with open (staging, "w") as fp:
+            json.dump ({ "file": PurePath (data).name, "resource_hash": resource_hash, **stats.to_dict () }, fp, indent = 1)
+    logging.info (f"Wrote statistics of {data} to {path}")
+    return (PurePath (path).name)
+
+def table_sidecar (table : TableDesc, fake_cwd : str = "") -> Optional[str]:
+    '''
+    The name of the statistics sidecar of `table', if there is one and
+    it has the hash of the table's data file.
+    '''
+    name = stats_path (str (table.resource_path))
+    if (not isfile (f"{fake_cwd}{name}")):
+        return (None)
+    entry = read_stats (f"{fake_cwd}{name}")
+    if (entry is None or entry.get ("resource_hash") != table.resource_hash):
+        logging.info (f"Statistics {fake_cwd}{name} don't describe {table.resource_path} as it is")
+        return (None)
+    return (name)
+
+def read_stats (path : str) -> Optional[dict]:
+    try:
+        with open (path, "r") as fp:
+            return (json.load (fp))
+    except (OSError, ValueError) as e:
+        logging.info (f"Cannot read statistics {path}: {e}")
+        return (None)
+
+def merge_stats (paths : list[str]) -> Optional[TableStats]:
+    '''
+    The statistics of the sidecars `paths' together, say of several tables
+    or of parts of one, or `None' if one can't be read.
+    '''
+    logging.debug (f"Called `merge_stats (paths = {paths})'")
+    merged = TableStats ()
+    for path in paths:
+        entry = read_stats (path)
+        if (entry is None):
+            print (f"Cannot read statistics {path}")
+            return (None)
+        merged.merge (TableStats.from_dict (entry))
+    return (merged)
@@ -0,0 +1,157 @@
+from abc     import ABC, abstractmethod
+from base64  import b64encode
+from hashlib import md5
+import logging
+import os
+from os.path import dirname, isfile
+import shutil
+from typing  import Optional
+
+'''
+Storage for uploaded bundles.
+
+Bundles are uploaded to a bucket in Google Cloud Storage, with each file
+of the bundle an object named after the bundle's path and the file. The
+few operations `fisup' needs are here, behind a class for each kind of
+storage, so the same code uploads to a local directory (a `file://'
+bucket) for testing, and so objects can be copied from one bundle to
+another within the storage, without uploading them again.
+
+Objects are compared by the base64 MD5 digest which Cloud Storage keeps
+for each object, worked out locally in the same form.
+'''
+
+## data read buffer size, 1MB
+BUFSIZ = 1048576
+
+def local_digest (path : str) -> str:
+    hasher = md5 ()
+    with open (path, "rb") as fp:
+        for block in iter (lambda : fp.read (BUFSIZ), b""):
+            hasher.update (block)
+    return (b64encode (hasher.digest ()).decode ("ascii"))
+
+class Storage (ABC):
+    '''
+    Objects in one bucket, named by key.
+    '''
+    @abstractmethod
+    def url (self, key : str) -> str:
+        pass
+
+    @abstractmethod
+    def upload (self, path : str, key : str) -> None:
+        pass
+
+    @abstractmethod
+    def write (self, data : bytes, key : str) -> None:
+        pass
+
+    @abstractmethod
+    def copy (self, source_key : str, key : str) -> None:
+        '''
+        Copy the object `source_key' to `key' within the storage.
+        '''
+        pass
+
+    @abstractmethod
+    def read (self, key : str) -> Optional[bytes]:
+        '''
+        The contents of object `key', or `None' if there isn't one.
+        '''
+        pass
+
+    @abstractmethod
+    def digest (self, key : str) -> Optional[str]:
+        '''
+        The base64 MD5 digest of object `key', or `None' if there isn't one.
+        '''
+        pass
+
+class GCSStorage (Storage):
+    def __init__ (self, bucket : str) -> None:
+        from google.cloud import storage
+        self.name   = bucket
+        self.bucket = storage.Client ().bucket (bucket)
+
+    def url (self, key : str) -> str:
+        return (f"gs://{self.name}/{key}")
+
+    def upload (self, path : str, key : str) -> None:
+        self.bucket.blob (key).upload_from_filename (path, timeout = 86400)
+
+    def write (self, data : bytes, key : str) -> None:
+        self.bucket.blob (key).upload_from_string (data, timeout = 86400)
+
+    def copy (self, source_key : str, key : str) -> None:
+        self.bucket.copy_blob (self.bucket.blob (source_key), self.bucket, key, timeout = 86400)
+
+    def read (self, key : str) -> Optional[bytes]:
+        blob = self.bucket.get_blob (key)
+        return (None if blob is None else blob.download_as_bytes ())
+
+    def digest (self, key : str) -> Optional[str]:
+        blob = self.bucket.get_blob (key)
+        return (None if blob is None else blob.md5_hash)
+
+class LocalStorage (Storage):
+    '''
+    A directory standing in for a bucket, with objects as files under it.
+    '''
+    def __init__ (self, root : str) -> None:
+        self.root = root
+
+    def path (self, key : str) -> str:
+        return (os.path.join (self.root, key))
+
+    def url (self, key : str) -> str:
+        return (f"file://{self.path (key)}")
+
+    def put (self, key : str, put) -> None:
+        target = self.path (key)
+        os.makedirs (dirname (target), exist_ok = True)
+        put (target)
+
+    def upload (self, path : str, key : str) -> None:
+        self.put (key, lambda target : shutil.copyfile (path, target))
+
+    def write (self, data : bytes, key : str) -> None:
+        def put (target : str) -> None:
+            with open (target, "wb") as fp:
+                fp.write (data)
+        self.put (key, put)
+
+    def copy (self, source_key : str, key : str) -> None:
+        self.put (key, lambda target : shutil.copyfile (self.path (source_key), target))
+
+    def read (self, key : str) -> Optional[bytes]:
+        if (not isfile (self.path (key))):
+            return (None)
+        with open (self.path (key), "rb") as fp:
+            return (fp.read ())
+
+    def digest (self, key : str) -> Optional[str]:
+        return (local_digest (self.path (key)) if isfile (self.path (key)) else None)
+
+def open_storage (bucket : str) -> Storage:
+    '''
+    `bucket' is the name of a Cloud Storage bucket, or a `file://' URL of
+    a local directory to use instead.
+    '''
+    logging.debug (f"Called `open_storage (bucket = {bucket})'")
+    if (bucket.startswith ("file://")):
+        return (LocalStorage (bucket [len ("file://"):]))
+    return (GCSStorage (bucket))
+
+def url_path (url : str, bucket : str) -> Optional[str]:
+    '''
+    The path of the bundle at `url' within `bucket' (as given to
+    `open_storage'), such as `owner/date/uuid' for
+    `gs://bucket/owner/date/uuid', or `None' if `url' is not in `bucket'.
+    The path may have any number of parts, as the directory given to
+    `fisup' may itself have several.
+    '''
+    prefix = (bucket if bucket.startswith ("file://") else f"gs://{bucket}").rstrip ("/") + "/"
+    if (not url.startswith (prefix)):
+        return (None)
+    return (url [len (prefix):].strip ("/") or None)
@@ -0,0 +1,325 @@
+import csv
+import io
+import logging
+from os.path import getsize
+import random
+import re
+from typing  import Callable, Collection, Iterator, Optional
+
+from linkml.validator.loaders import Loader
+
+'''
+Tokens which spreadsheets, R and pandas write for missing values. LinkML
+only treats empty fields as missing (see
+https://github.com/linkml/linkml/issues/1994) so these are mapped to
+empty fields before validation, if asked.
+'''
+NA_VALUES = frozenset (["#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN"
+                      , "-NaN", "-nan", "1.#IND", "1.#QNAN", "<NA>", "N/A", "NA"
+                      , "NULL", "NaN", "None", "n/a", "nan", "null", " "])
+
+## data read buffer size, 1MB
+BUFSIZ = 1048576
+
+## consumers of the bytes of a file as it is read, e.g. `hasher.update'
+Sink = Callable[[memoryview], None]
+
+def parse_numeric (value : str):
+    '''
+    `value' as an integer or a float if it reads as one, otherwise as it
+    is. The same as the private `_parse_numeric' of LinkML's own CSV
+    loader (`linkml.validator.loaders.delimited_file_loader', 1.7.10),
+    which this needs to match.
+    '''
+    if (not isinstance (value, str) or not re.search (r'[0-9]', value)):
+        return (value)
+    try:
+        return (int (value))
+    except (TypeError, ValueError):
+        pass
+    try:
+        return (float (value))
+    except (TypeError, ValueError, OverflowError):
+        return (value)
+
+class TeeReader (io.RawIOBase):
+    '''
+    A file read in binary mode, handing each block read to `sinks' as
+    well, so one sequential read of the file feeds them all. Each block
+    is only valid during the call.
+    '''
+    def __init__ (self, raw : io.RawIOBase, sinks : list[Sink]) -> None:
+        self.raw   = raw
+        self.sinks = sinks
+
+    def readable (self) -> bool:
+        return (True)
+
+    def seekable (self) -> bool:
+        return (True)
+
+    def seek (self, offset : int, whence : int = io.SEEK_SET) -> int:
+        return (self.raw.seek (offset, whence))
+
+    def tell (self) -> int:
+        return (self.raw.tell ())
+
+    def readinto (self, buffer) -> int:
+        size = self.raw.readinto (buffer)
+        if (size):
+            block = memoryview (buffer) [:size]
+            for sink in self.sinks:
+                sink (block)
+        return (size)
+
+    def close (self) -> None:
+        self.raw.close ()
+        super ().close ()
+
+def open_tee (data : str, sinks : Optional[list[Sink]] = None):
+    '''
+    Open `data' in binary mode, handing what is read to `sinks' if any.
+    '''
+    if (not sinks):
+        return (open (data, "rb"))
+    return (io.BufferedReader (TeeReader (io.FileIO (data, "r"), sinks), BUFSIZ))
+
+class LineTracker (object):
+    '''
+    Iterate over the decoded lines of a data file from some byte offset,
+    keeping track of the offset reached so far and whether the last
+    line handed out was terminated by a newline.
+
+    The file is read in binary mode so that offsets are exact. The `csv'
+    module may pull more than one line for a single row when a quoted
+    field spans lines, so `offset' is only meaningful between rows.
+
+    The bytes read from `start' on are also handed to `sinks', if given.
+    '''
+    def __init__ (self, data : str, start : int = 0, sinks : Optional[list[Sink]] = None) -> None:
+        self.data       = data
+        self.offset     = start
+        self.terminated = True
+        self.sinks      = sinks
+
+    def __iter__ (self) -> Iterator[str]:
+        with open_tee (self.data, self.sinks) as fp:
+            fp.seek (self.offset)
+            for line in fp:
+                self.offset    += len (line)
+                self.terminated = line.endswith (b"\n")
+                yield (line.decode ("utf-8"))
+
+def read_header (data : str) -> tuple[list[str], int]:
+    '''
+    Read the header of a CSV file, returning the column names and the
+    byte offset of the first data row.
+    '''
+    logging.debug (f"Called `read_header (data = {data})'")
+    lines  = LineTracker (data)
+    reader = csv.reader (lines, skipinitialspace = True)
+    header = next (reader, [])
+    return (header, lines.offset)
+
+def iter_rows (data  : str
+             , start : int                  = 0
+             , sinks : Optional[list[Sink]] = None) -> Iterator[tuple[int, int, bool, list[str]]]:
+    '''
+    Yield `(begin, end, terminated, fields)' for each data row of a CSV
+    file, where `begin' and `end' are the byte offsets delimiting the
+    row, and `terminated' says whether the row ended with a newline.
+
+    `start' is either zero, in which case the rows follow the header,
+    or some offset known to lie on a row boundary (for instance, one
+    recorded by an earlier run).
+
+    The bytes of the file from `start' on are handed to `sinks' as they
+    are read, if given.
+    '''
+    logging.debug (f"Called `iter_rows (data = {data}, start = {start})'")
+    if (start == 0):
+        (_, start) = read_header (data)
+
+    lines  = LineTracker (data, start, sinks)
+    reader = csv.reader (lines, skipinitialspace = True)
+    begin  = start
+    for fields in reader:
+        yield (begin, lines.offset, lines.terminated, fields)
+        begin = lines.offset
+
+class CsvStreamLoader (Loader):
+    '''
+    A stand-in for LinkML's own `CsvLoader', producing the same instances
+    (missing trailing fields become `None', empty fields are dropped,
+    numbers are parsed), but which can start part-way through a file and
+    which keeps track of where each instance came from.
+
+    `offsets[i]' holds the byte offsets `(begin, end)' of instance `i'.
+    Once the instances are exhausted, `boundary' holds the byte offset
+    just after the last row terminated by a newline, which is a safe
+    place to resume from once more rows have been appended.
+
+    If `na_values' is given, fields holding one of these tokens are
+    treated as missing, as though they were empty. This applies to the
+    columns named in `na_columns', or to all columns if it is `None'.
+    Only the columns concerned are looked at, so there is no cost to
+    those which are not.
+
+    If `columns' is given, instances only hold those columns, and the
+    others are only checked for structure, as they would be were all
+    columns validated: each row must have at least as many fields as the
+    header (fields beyond it are ignored), and fields in the `required'
+    columns must not be empty. Rows failing this are listed in
+    `malformed' as `(row, begin, problem)' rather than being validated.
+
+    If `sinks' are given, every byte of the file, from the start, is
+    handed to them as the rows are read, see `fisdat.ingest'.
+    '''
+    def __init__ (self
+                , source     : str
+                , start      : int                       = 0
+                , header     : Optional[list[str]]       = None
+                , na_values  : Optional[Collection[str]] = None
+                , na_columns : Optional[Collection[str]] = None
+                , columns    : Optional[Collection[str]] = None
+                , required   : Collection[str]           = ()
+                , sinks      : Optional[list[Sink]]      = None) -> None:
+        super ().__init__ (source)
+        self.start      = start
+        self.header     = header
+        self.boundary   = start
+        self.offsets    = []
+        self.na_values  = frozenset (na_values or [])
+        self.na_columns = na_columns
+        self.na_targets = []
+        self.columns    = columns
+        self.required   = required
+        self.malformed  = []
+        self.sinks      = sinks
+
+    def normalised_columns (self) -> list[str]:
+        '''
+        The columns of the header in which NA tokens are to be replaced.
+        '''
+        if (not self.na_values):
+            return ([])
+        elif (self.na_columns is None):
+            return (list (self.header))
+        else:
+            absent = [k for k in self.na_columns if k not in self.header]
+            if (absent):
+                logging.info (f"Columns {', '.join (absent)} to normalise NA values in are not in {self.source}")
+            return ([k for k in self.header if k in self.na_columns])
+
+    def iter_instances (self) -> Iterator[dict]:
+        (header, header_end) = read_header (self.source)
+        if (self.header is None):
+            self.header = header
+        self.na_targets = self.normalised_columns ()
+        if (self.start == 0):
+            self.start    = header_end
+            self.boundary = header_end
+        if (self.sinks):
+            with open (self.source, "rb") as fp:
+                prefix = memoryview (fp.read (self.start))
+            for sink in self.sinks:
+                sink (prefix)
+
+        for (begin, end, terminated, fields) in iter_rows (self.source, self.start, self.sinks):
+            if (terminated):
+                self.boundary = end
+            # `csv.DictReader' skips blank rows altogether
+            if (fields == []):
+                continue
+            if (self.columns is not None and not self.structural_check (fields, begin)):
+                continue
+            self.offsets.append ((begin, end))
+            yield (self.instance (fields))
+
+    def structural_check (self, fields : list[str], begin : int) -> bool:
+        row = len (self.offsets) + len (self.malformed) + 1
+        # Missing trailing fields become `None', which fails validation, extra ones are dropped
+        if (len (fields) < len (self.header)):
+            self.malformed.append ((row, begin, f"{len (fields)} fields where the header has {len (self.header)}"))
+            return (False)
+        empty = [k for (k, v) in zip (self.header, fields)
+                   if k in self.required and (v == "" or (k in self.na_targets and v in self.na_values))]
+        if (empty):
+            self.malformed.append ((row, begin, f"required column(s) {', '.join (empty)} empty"))
+            return (False)
+        return (True)
+
+    def instance (self, fields : list[str]) -> dict:
+        row = dict (zip (self.header, fields))
+        for k in self.header [len (fields) : len (self.header)]:
+            row[k] = None
+        for k in self.na_targets:
+            if (row [k] in self.na_values):
+                row[k] = ""
+        if (self.columns is not None):
+            row = {k: row [k] for k in self.columns}
+        return ({k: parse_numeric (v) for (k, v) in row.items () if v != ""})
+
+class CsvSampleLoader (CsvStreamLoader):
+    '''
+    Like `CsvStreamLoader', but only yields a stratified sample of rows:
+    the file is divided into `strata' equal byte ranges, and a run of
+    rows is read from a random point within each one. The first range
+    is always read from its start, so the first rows of the file are
+    always part of the sample.
+
+    Seeking into the middle of a file means landing part-way through a
+    row, so each run starts at the next line. Rows which don't have as
+    many fields as the header are skipped rather than reported, since
+    they are more likely to be an artefact of landing inside a quoted
+    field which spans lines than a real problem. The full validation
+    pass will catch them if they are.
+    '''
+    def __init__ (self
+                , source     : str
+                , rows       : int                       = 1000
+                , strata     : int                       = 10
+                , seed       : Optional[int]             = None
+                , na_values  : Optional[Collection[str]] = None
+                , na_columns : Optional[Collection[str]] = None) -> None:
+        super ().__init__ (source, na_values = na_values, na_columns = na_columns)
+        self.rows   = rows
+        self.strata = strata
+        self.seed   = seed
+
+    def iter_instances (self) -> Iterator[dict]:
+        (self.header, first) = read_header (self.source)
+        self.na_targets      = self.normalised_columns ()
+        size        = getsize (self.source)
+        span        = (size - first) / self.strata
+        per_stratum = max (1, self.rows // self.strata)
+        rng         = random.Random (self.seed)
+        seen        = set ()
+
+        for k in range (self.strata):
+            low  = first + int (k * span)
+            high = first + int ((k + 1) * span)
+            if (low >= size):
+                break
+            start = low if k == 0 else _next_line (self.source, rng.randrange (low, max (low + 1, high)))
+
+            taken = 0
+            for (begin, end, _, fields) in iter_rows (self.source, start):
+                if (taken >= per_stratum or begin in seen):
+                    break
+                if (len (fields) != len (self.header)):
+                    continue
+                seen.add (begin)
+                taken += 1
+                self.offsets.append ((begin, end))
+                yield (self.instance (fields))
+
+def _next_line (data : str, position : int) -> int:
+    '''
+    The offset of the first line starting at or after `position'.
+    '''
+    with open (data, "rb") as fp:
+        fp.seek (max (0, position - 1))
+        if (position > 0 and fp.read (1) != b"\n"):
+            fp.readline ()
+        return (fp.tell ())
@@ -0,0 +1,130 @@
+from linkml_runtime.linkml_model     import SchemaDefinition
+from linkml_runtime.loaders          import yaml_loader
+from linkml_runtime.utils.schemaview import SchemaView
+
+import logging
+from pathlib import PurePath
+import time
+from typing  import Collection, Optional
+
+from fisdat.stream import CsvSampleLoader, read_header
+from fisdat.utils  import extension_helper, validation_helper
+
+'''
+Tiered, fast-fail validation.
+
+Validating a large file in full takes a long time, and a file with the
+wrong columns, or a bad value in its first rows, should not need the
+whole file to be read before this is reported. Before the full pass,
+the following are checked, each reporting before the next begins:
+
+1. The header, against the slots of the target class in the schema
+2. A stratified sample of rows, validated as in the full pass
+
+Both read the file as CSV, so other formats go straight to the full pass.
+'''
+
+def schema_slots (schema       : str
+                , target_class : str) -> Optional[tuple[list[str], list[str]]]:
+    '''
+    Return the names of all slots of the target class, and those which
+    are required.
+
+    Loading the schema proper with `SchemaView' resolves its imports,
+    which means fetching `saved:core' &c., and this defeats the purpose
+    of a quick check. The schemata we deal with list the slots of
+    `TableSchema' directly, so try the schema file on its own first, and
+    only resolve the imports if the class inherits from elsewhere.
+    '''
+    logging.debug (f"Called `schema_slots (schema = {schema}, target_class = {target_class})'")
+    schema_obj = yaml_loader.load (schema, target_class = SchemaDefinition)
+    class_obj  = schema_obj.classes.get (target_class)
+
+    if (class_obj is None):
+        return (None)
+    elif (class_obj.is_a is None and not class_obj.mixins):
+        names    = list (class_obj.slots) + list (class_obj.attributes)
+        local    = lambda k : schema_obj.slots.get (k) or class_obj.attributes.get (k)
+        usage    = lambda k : class_obj.slot_usage.get (k)
+        required = [k for k in names
+                      if (usage (k) is not None and usage (k).required)
+                      or (usage (k) is None and local (k) is not None and local (k).required)]
+        return (names, required)
+    else:
+        logging.info (f"Class {target_class} inherits slots, resolving schema imports")
+        view  = SchemaView (schema)
+        slots = view.class_induced_slots (target_class)
+        return ([s.name for s in slots], [s.name for s in slots if s.required])
+
+def header_check (data         : str
+                , schema       : str
+                , target_class : str) -> bool:
+    '''
+    Tier 1: compare the header of the data file with the slots of the
+    target class. The validator treats the class as closed, so unknown
+    columns are as much an error as missing required ones.
+    '''
+    logging.debug (f"Called `header_check (data = {data}, schema = {schema}, target_class = {target_class})'")
+    slots = schema_slots (schema, target_class)
+    if (slots is None):
+        print (f"Invalid target class {target_class}")
+        return (False)
+
+    (names, required) = slots
+    (header, _)       = read_header (data)
+    unknown           = [k for k in header if k not in names]
+    missing           = [k for k in required if k not in header]
+    duplicate         = sorted (set (k for k in header if header.count (k) > 1))
+
+    if (unknown):
+        print (f"Header error: columns not in schema {schema}: {', '.join (unknown)}")
+    if (missing):
+        print (f"Header error: required columns missing from {data}: {', '.join (missing)}")
+    if (duplicate):
+        print (f"Header error: duplicated columns in {data}: {', '.join (duplicate)}")
+    return (not (unknown or missing or duplicate))
+
+def sample_check (data         : str
+                , schema       : str
+                , target_class : str
+                , rows         : int                       = 1000
+                , strata       : int                       = 10
+                , seed         : Optional[int]             = None
+                , na_values    : Optional[Collection[str]] = None
+                , na_columns   : Optional[Collection[str]] = None) -> bool:
+    '''
+    Tier 2: validate a stratified sample of rows.
+    '''
+    logging.debug (f"Called `sample_check (data = {data}, schema = {schema}, target_class = {target_class}, rows = {rows}, strata = {strata}, seed = {seed}, na_values = {na_values}, na_columns = {na_columns})'")
+    loader = CsvSampleLoader (data, rows = rows, strata = strata, seed = seed, na_values = na_values, na_columns = na_columns)
+    return (validation_helper (data, schema, target_class, loader = loader))
+
+def fast_fail_helper (data         : str
+                    , schema       : str
+                    , target_class : str
+                    , rows         : int                       = 1000
+                    , strata       : int                       = 10
+                    , seed         : Optional[int]             = None
+                    , na_values    : Optional[Collection[str]] = None
+                    , na_columns   : Optional[Collection[str]] = None) -> bool:
+    '''
+    Run the quick tiers in order, reporting as each finishes, stopping
+    at the first which fails. The full pass is left to the caller, as
+    there is more than one way of doing it (e.g. incrementally). Data
+    files other than CSV pass without being checked.
+    '''
+    logging.debug (f"Called `fast_fail_helper (data = {data}, schema = {schema}, target_class = {target_class}, rows = {rows}, strata = {strata}, seed = {seed}, na_values = {na_values}, na_columns = {na_columns})'")
+    if (extension_helper (PurePath (data)) != "csv"):
+        print (f"Tiered validation only checks CSV files, leaving {data} to the full pass")
+        return (True)
+
+    tiers = [ ("header check", lambda : header_check (data, schema, target_class))
+            , (f"sample of {rows} rows", lambda : sample_check (data, schema, target_class, rows, strata, seed, na_values, na_columns)) ]
+
+    for (n, (name, tier)) in enumerate (tiers, start = 1):
+        start  = time.time ()
+        result = tier ()
+        print (f"Validation tier {n} ({name}) {'passed' if result else 'failed'} in {round (time.time () - start, 2)}s")
+        if (not result):
+            return (False)
+    return (True)
@@ -0,0 +1,475 @@
+from collections import deque
+import dataclasses
+from functools   import lru_cache
+import logging
+import re
+from typing  import Iterator, Optional
+from urllib.parse import urljoin
+
+from linkml_runtime.dumpers              import RDFLibDumper
+from linkml_runtime.loaders              import RDFLibLoader
+from linkml_runtime.utils.curienamespace import CurieNamespace
+from linkml_runtime.utils.enumerations   import EnumDefinitionImpl
+from linkml_runtime.utils.metamodelcore  import URI
+from linkml_runtime.utils.schemaview     import SchemaView
+from linkml_runtime.utils.yamlutils      import YAMLRoot, extended_str
+
+from fisdat import data_model
+from fisdat.compact    import COMPACT, Compact, Manifest, range_types
+from fisdat.data_model import JobDesc, ManifestDesc, ScopeDesc, TableDesc, slots
+from fisdat.utils      import TTL_IRI_ILLEGAL, ttl_literal
+
+'''
+Writing manifests as Turtle directly.
+
+`RDFLibDumper' builds an rdflib graph of the manifest, working out how
+to express each slot from the data model's `SchemaView', and then has
+rdflib serialise the graph. The manifest classes are simple enough that
+the triples can be written straight out instead, taking the predicate
+for each slot and the class of each object from the generated Python
+data model, and the way to express each value from the range of its
+slot there:
+
+- objects with an `atomic_name' are resources named by it, described
+  in a block of their own, and referred to by that name
+- other objects (job scopes) are blank nodes, written in place
+- slots whose range is `uri' are `xsd:anyURI' literals
+- references to tables and variables are IRIs, expanded from CURIEs
+- everything else (strings, enumerations) is a plain literal
+
+The graph written is the same as `RDFLibDumper' would write, though
+the text may differ in layout. Anything this doesn't know how to write
+raises `ValueError', so that callers can fall back on `RDFLibDumper'.
+'''
+
+XSD = "http://www.w3.org/2001/XMLSchema#"
+
+## CURIE prefixes known to the data model
+NAMESPACES = { str (v.prefix): str (v) for v in vars (data_model).values () if isinstance (v, CurieNamespace) }
+
+## local names which can be written after a prefix as they are
+PN_LOCAL = re.compile (r'^[A-Za-z0-9_]([A-Za-z0-9_.-]*[A-Za-z0-9_-])?$')
+
+## the classes which make up a manifest
+CLASSES = { k.__name__: k for k in [ManifestDesc, TableDesc, JobDesc, ScopeDesc] }
+
+## the types of the identifiers of classes, which references to objects have
+IDENTIFIERS = tuple (v for v in vars (data_model).values () if isinstance (v, type) and issubclass (v, extended_str) and v.__module__ == data_model.__name__)
+
+CURIE = re.compile (r'^([A-Za-z_][A-Za-z0-9_.-]*):(.*)$')
+
+class TurtleWriter (object):
+    '''
+    Write `ManifestDesc' objects as Turtle, relative to the `_base' in
+    `prefixes', and using the other prefixes in it and the data model
+    for CURIEs.
+    '''
+    def __init__ (self, prefixes : dict[str, str]) -> None:
+        if ("_base" not in prefixes):
+            raise ValueError ("No `_base' prefix to write the manifest relative to")
+        self.base       = prefixes ["_base"]
+        # Shortest first, so `saved:job_type' is preferred to `job:type'
+        namespaces      = NAMESPACES | { k: v for (k, v) in prefixes.items () if k != "_base" }
+        self.namespaces = dict (sorted (namespaces.items (), key = lambda k : len (k [1])))
+        self.used       = set (["saved", "xsd"])
+
+    def expand (self, name : str) -> str:
+        '''
+        The full IRI of an identifier or reference, which may be a CURIE,
+        a full IRI or a name relative to the base.
+        '''
+        name  = str (name)
+        match = CURIE.match (name)
+        if (match and match.group (1) in self.namespaces):
+            return (self.namespaces [match.group (1)] + match.group (2))
+        elif (match and match.group (2).startswith ("//")):
+            return (name)
+        return (self.base + name)
+
+    def iri (self, iri : str) -> str:
+        if (TTL_IRI_ILLEGAL.search (iri)):
+            raise ValueError (f"Cannot write IRI {iri} in Turtle")
+        if (iri.startswith (self.base)):
+            return (f"<{iri [len (self.base):]}>")
+        for (prefix, namespace) in self.namespaces.items ():
+            local = iri [len (namespace):]
+            if (iri.startswith (namespace) and PN_LOCAL.match (local)):
+                self.used.add (prefix)
+                return (f"{prefix}:{local}")
+        return (f"<{iri}>")
+
+    def value (self, field : dataclasses.Field, value, depth : int, queue : list) -> str:
+        if (isinstance (value, EnumDefinitionImpl)):
+            return (ttl_literal (str (value.code.text)))
+        elif (isinstance (value, YAMLRoot) and hasattr (value, "atomic_name")):
+            queue.append (value)
+            return (self.iri (self.expand (value.atomic_name)))
+        elif (isinstance (value, YAMLRoot)):
+            return (self.node (value, depth + 1, queue))
+        elif (not isinstance (value, str)):
+            raise ValueError (f"Cannot write value {value} of slot {field.name} in Turtle")
+        types = range_types (field.name)
+        if (any (issubclass (k, URI) for k in types)):
+            return (f"{ttl_literal (value)}^^xsd:anyURI")
+        elif (any (issubclass (k, IDENTIFIERS) for k in types)):
+            return (self.iri (self.expand (value)))
+        return (ttl_literal (value))
+
+    def properties (self, obj : YAMLRoot, depth : int, queue : list) -> list[str]:
+        '''
+        The predicate-object lists describing `obj', less its name.
+        '''
+        lines = [f"a {self.iri (str (obj.class_class_uri))}"]
+        for field in dataclasses.fields (obj):
+            values = getattr (obj, field.name)
+            if (field.name == "atomic_name" or values is None):
+                continue
+            elif (isinstance (values, dict)):
+                values = list (values.values ())
+            elif (not isinstance (values, list)):
+                values = [values]
+            if (values):
+                predicate = self.iri (str (getattr (slots, field.name).uri))
+                objects   = [self.value (field, k, depth, queue) for k in values]
+                lines.append (f"{predicate} " + f",\n{'    ' * (depth + 2)}".join (objects))
+        return (lines)
+
+    def node (self, obj : YAMLRoot, depth : int, queue : list) -> str:
+        indent = "    " * (depth + 1)
+        return ("[ " + f" ;\n{indent}".join (self.properties (obj, depth, queue)) + " ]")
+
+    def blocks (self, manifest : ManifestDesc) -> Iterator[str]:
+        '''
+        The description of each named object, the manifest first.
+        '''
+        queue = deque ([manifest])
+        seen  = set ()
+        while (queue):
+            obj  = queue.popleft ()
+            name = self.expand (obj.atomic_name)
+            if (name in seen):
+                continue
+            seen.add (name)
+            pending = []
+            lines   = self.properties (obj, 0, pending)
+            queue.extend (pending)
+            yield (f"{self.iri (name)} " + " ;\n    ".join (lines) + " .\n")
+
+    def header (self) -> str:
+        prefixes = [f"@prefix {k}: <{XSD if k == 'xsd' else self.namespaces [k]}> ." for k in sorted (self.used)]
+        return ("\n".join ([f"@base <{self.base}> ."] + prefixes) + "\n")
+
+    def dumps (self, manifest : ManifestDesc) -> str:
+        '''
+        The prefixes used are only known once everything else is
+        written, so the body is put together first.
+        '''
+        body = "\n".join (self.blocks (manifest))
+        return (self.header () + "\n" + body)
+
+def dump_turtle (manifest : ManifestDesc
+               , path     : str
+               , prefixes : dict[str, str]) -> None:
+    '''
+    Write `manifest' to `path' as Turtle, see `TurtleWriter'.
+    '''
+    logging.debug (f"Called `dump_turtle (manifest = {manifest.atomic_name}, path = {path}, prefixes = {prefixes})'")
+    text = TurtleWriter (prefixes).dumps (manifest)
+    with open (path, "w") as fp:
+        fp.write (text)
+
+def turtle_wrapper (manifest        : ManifestDesc
+                  , path            : str
+                  , data_model_view : SchemaView
+                  , prefixes        : dict[str, str]) -> None:
+    '''
+    Write `manifest' to `path' as Turtle, falling back on `RDFLibDumper'
+    with the data model's `SchemaView' if it can't be written directly.
+    '''
+    try:
+        dump_turtle (manifest, path, prefixes)
+    except ValueError as e:
+        logging.info (f"Cannot write manifest {manifest.atomic_name} as Turtle directly ({e}), using the RDF dumper")
+        RDFLibDumper ().dump (manifest, path, schemaview = data_model_view, prefix_map = prefixes)
+
+'''
+Reading manifests from Turtle directly.
+
+`RDFLibLoader' parses the whole file into an rdflib graph, then walks
+the graph from the manifest, working out what to make of each triple
+from the data model's `SchemaView'. `TurtleReader' instead tokenises and
+parses the Turtle itself, into a dictionary of the properties of each
+subject, and builds a compact manifest (see `fisdat.compact') from these,
+using the types in the generated Python data model as `TurtleWriter'
+does. Identifiers and references are turned back into CURIEs with the
+longest matching prefix, as `RDFLibLoader' does.
+
+Only the parts of Turtle seen in manifests are understood: anything
+else (collections, numeric or boolean literals, predicates which aren't
+slots of the class) raises `ValueError', so callers can fall back on
+`RDFLibLoader'.
+'''
+
+RDF_TYPE = "http://www.w3.org/1999/02/22-rdf-syntax-ns#type"
+
+TOKENS = re.compile (r'''
+    (?P<space>    (?:\s+|\#[^\n]*)+ )
+  | (?P<pname>    (?:[A-Za-z](?:[\w-]|\.(?=[\w.-]*:))*)?:(?:[\w:%-]|\.(?=[\w:%-]))* )
+  | (?P<punct>    [.;,\[\]()] )
+  | (?P<iri>      <[^<>"{}|^`\\\x00-\x20]*> )
+  | (?P<long>     """(?:[^"\\]|\\.|"(?!""))*"""|\'\'\'(?:[^'\\]|\\.|'(?!\'\'))*\'\'\' )
+  | (?P<string>   "(?:[^"\\\n\r]|\\.)*"|'(?:[^'\\\n\r]|\\.)*' )
+  | (?P<datatype> \^\^ )
+  | (?P<at>       @[A-Za-z]+(?:-[A-Za-z0-9]+)* )
+  | (?P<bnode>    _:[A-Za-z0-9_](?:[\w-]|\.(?=[\w-]))* )
+  | (?P<word>     [A-Za-z]+ )
+''', re.VERBOSE)
+
+ESCAPES = re.compile (r'\\(?:u([0-9A-Fa-f]{4})|U([0-9A-Fa-f]{8})|(.))', re.DOTALL)
+ECHARS  = { "t": "\t", "b": "\b", "n": "\n", "r": "\r", "f": "\f", "\"": "\"", "'": "'", "\\": "\\" }
+
+def unescape (text : str) -> str:
+    if ("\\" not in text):
+        return (text)
+    def escape (match : re.Match) -> str:
+        if (match.group (3) is None):
+            return (chr (int (match.group (1) or match.group (2), 16)))
+        elif (match.group (3) in ECHARS):
+            return (ECHARS [match.group (3)])
+        raise ValueError (f"Unknown escape \\{match.group (3)} in Turtle string")
+    return (ESCAPES.sub (escape, text))
+
+@lru_cache (maxsize = None)
+def slot_plan (cls : type) -> list[tuple[str, str, Optional[type], bool]]:
+    '''
+    For each slot of `cls' other than its identifier, the slot name,
+    predicate, class of nested objects (if any), and whether it holds
+    more than one value, from the range of the slot.
+    '''
+    plan = []
+    for field in dataclasses.fields (cls):
+        if (field.name != "atomic_name"):
+            types  = range_types (field.name)
+            nested = [k for k in types if k in CLASSES.values ()]
+            plan.append ((field.name, str (getattr (slots, field.name).uri), (nested or [None]) [0], list in types or dict in types))
+    return (plan)
+
+class Node (tuple):
+    '''
+    An IRI, blank node or literal, as `(kind, value)'.
+    '''
+    kind  = property (lambda self : self [0])
+    value = property (lambda self : self [1])
+
+class TurtleReader (object):
+    '''
+    Parse a Turtle manifest into `subjects', a dictionary from each
+    subject node to a dictionary from each of its predicates to a list
+    of objects, then build the manifest from it with `manifest'.
+    '''
+    def __init__ (self, text : str, namespaces : Optional[dict[str, str]] = None) -> None:
+        self.tokens     = list (self.tokenise (text))
+        self.position   = 0
+        self.base       = ""
+        self.prefixes   = {}
+        self.iris       = {}
+        self.bnodes     = 0
+        self.subjects   = {}
+        self.namespaces = sorted ((namespaces or NAMESPACES).items (), key = lambda k : -len (k [1]))
+
+        while (self.position < len (self.tokens)):
+            self.statement ()
+
+    @staticmethod
+    def tokenise (text : str) -> Iterator[tuple[str, str]]:
+        end = 0
+        for match in TOKENS.finditer (text):
+            if (match.start () != end):
+                break
+            end = match.end ()
+            if (match.lastgroup != "space"):
+                yield ((match.lastgroup, match.group ()))
+        if (end != len (text)):
+            raise ValueError (f"Cannot read Turtle at character {end}: {text [end:end + 20]!r}")
+
+    def peek (self) -> tuple[str, str]:
+        return (self.tokens [self.position] if self.position < len (self.tokens) else ("end", ""))
+
+    def next (self) -> tuple[str, str]:
+        token = self.peek ()
+        self.position += 1
+        return (token)
+
+    def expect (self, value : str) -> None:
+        (_, found) = self.next ()
+        if (found != value):
+            raise ValueError (f"Expected `{value}' in Turtle, found `{found}'")
+
+    def statement (self) -> None:
+        (kind, value) = self.next ()
+        if (kind == "at" and value == "@prefix"):
+            (name, iri) = (self.prefix (self.next ()), self.iri (self.next ()))
+            self.prefixes [name] = iri
+            self.expect (".")
+        elif (kind == "at" and value == "@base"):
+            (self.base, self.iris) = (self.iri (self.next ()), {})
+            self.expect (".")
+        elif (kind == "word" and value.upper () == "PREFIX"):
+            (name, iri) = (self.prefix (self.next ()), self.iri (self.next ()))
+            self.prefixes [name] = iri
+        elif (kind == "word" and value.upper () == "BASE"):
+            (self.base, self.iris) = (self.iri (self.next ()), {})
+        elif (value == "["):
+            subject = self.blank_node ()
+            if (self.peek () [1] != "."):
+                self.predicate_objects (subject)
+            self.expect (".")
+        else:
+            subject = self.term ((kind, value))
+            self.predicate_objects (subject)
+            self.expect (".")
+
+    def prefix (self, token : tuple[str, str]) -> str:
+        (kind, value) = token
+        if (kind != "pname" or not value.endswith (":") or value.count (":") != 1):
+            raise ValueError (f"Expected a prefix name in Turtle, found `{value}'")
+        return (value [:-1])
+
+    def iri (self, token : tuple[str, str]) -> str:
+        (kind, value) = token
+        if (kind == "iri"):
+            # The same few relative IRIs are resolved over and over
+            if (value not in self.iris):
+                self.iris [value] = urljoin (self.base, unescape (value [1:-1]))
+            return (self.iris [value])
+        elif (kind == "pname"):
+            (prefix, _, local) = value.partition (":")
+            if (prefix not in self.prefixes):
+                raise ValueError (f"Undeclared prefix `{prefix}' in Turtle")
+            return (self.prefixes [prefix] + (re.sub (r'\\(.)', r'\1', local) if "\\" in local else local))
+        raise ValueError (f"Expected an IRI in Turtle, found `{value}'")
+
+    def term (self, token : tuple[str, str]) -> Node:
+        (kind, value) = token
+        if (kind in ["iri", "pname"]):
+            return (Node (("iri", self.iri (token))))
+        elif (kind == "bnode"):
+            return (Node (("bnode", value)))
+        elif (kind in ["string", "long"]):
+            quote = 3 if kind == "long" else 1
+            text  = unescape (value [quote:-quote])
+            if (self.peek () [0] == "datatype"):
+                self.next ()
+                self.iri (self.next ())
+            elif (self.peek () [0] == "at"):
+                self.next ()
+            return (Node (("literal", text)))
+        elif (value == "["):
+            return (self.blank_node ())
+        raise ValueError (f"Cannot read `{value}' in a Turtle manifest")
+
+    def blank_node (self) -> Node:
+        self.bnodes += 1
+        node = Node (("bnode", f"_:b{self.bnodes}"))
+        self.subjects [node] = {}
+        if (self.peek () [1] != "]"):
+            self.predicate_objects (node)
+        self.expect ("]")
+        return (node)
+
+    def predicate_objects (self, subject : Node) -> None:
+        properties = self.subjects.setdefault (subject, {})
+        while (True):
+            token     = self.next ()
+            predicate = RDF_TYPE if token == ("word", "a") else self.iri (token)
+            objects   = properties.setdefault (predicate, [])
+            objects.append (self.term (self.next ()))
+            while (self.peek () [1] == ","):
+                self.next ()
+                objects.append (self.term (self.next ()))
+            while (self.peek () [1] == ";"):
+                self.next ()
+            if (self.peek () [1] in [".", "]"]):
+                return
+
+    def curie (self, iri : str) -> str:
+        for (prefix, namespace) in self.namespaces:
+            if (iri.startswith (namespace)):
+                return (f"{prefix}:{iri [len (namespace):]}")
+        return (iri)
+
+    def build (self, node : Node, cls : type) -> Compact:
+        properties = dict (self.subjects.get (node, {}))
+        classes    = properties.pop (RDF_TYPE, [])
+        attributes = {}
+        if (classes and classes != [Node (("iri", str (cls.class_class_uri)))]):
+            raise ValueError (f"Expected {node.value} to be a {cls.__name__} in Turtle manifest")
+        if (node.kind == "iri"):
+            attributes ["atomic_name"] = self.curie (node.value)
+
+        for (name, predicate, nested, multivalued) in slot_plan (cls):
+            if (predicate not in properties):
+                continue
+            values = []
+            for obj in properties.pop (predicate):
+                if (nested is not None and obj.kind != "literal"):
+                    values.append (self.build (obj, nested))
+                elif (nested is None and obj.kind == "literal"):
+                    values.append (obj.value)
+                elif (nested is None and obj.kind == "iri"):
+                    values.append (self.curie (obj.value))
+                else:
+                    raise ValueError (f"Unexpected {obj.kind} for slot {name} in Turtle manifest")
+            if (not multivalued and len (values) > 1):
+                raise ValueError (f"{len (values)} values for single valued slot {name} of {node.value} in Turtle manifest")
+            attributes [name] = values if multivalued else values [0]
+
+        if (properties):
+            raise ValueError (f"Predicates {', '.join (properties)} of {node.value} aren't slots of {cls.__name__}")
+        return (COMPACT [cls] (**attributes))
+
+    def compact (self) -> Manifest:
+        root_class = str (ManifestDesc.class_class_uri)
+        roots      = [s for (s, p) in self.subjects.items () if Node (("iri", root_class)) in p.get (RDF_TYPE, [])]
+        if (len (roots) != 1):
+            raise ValueError (f"Expected one manifest in Turtle, found {len (roots)}")
+        return (self.build (roots [0], ManifestDesc))
+
+    def manifest (self) -> ManifestDesc:
+        return (self.compact ().to_desc ())
+
+def load_turtle (source          : str
+               , data_model_view : Optional[SchemaView] = None) -> ManifestDesc:
+    '''
+    Read a manifest from the Turtle file `source', see `TurtleReader'.
+    If the data model's `SchemaView' is given, its prefixes are used for
+    CURIEs, otherwise those of the generated Python data model.
+    '''
+    logging.debug (f"Called `load_turtle (source = {source})'")
+    with open (source, "r", encoding = "utf-8") as fp:
+        text = fp.read ()
+    return (read_turtle (text, data_model_view))
+
+def read_turtle (text            : str
+               , data_model_view : Optional[SchemaView] = None) -> ManifestDesc:
+    '''
+    Read a manifest from Turtle `text', see `load_turtle'.
+    '''
+    namespaces = None if data_model_view is None else { k: str (v) for (k, v) in data_model_view.namespaces ().items () }
+    return (TurtleReader (text, namespaces).manifest ())
+
+def turtle_loader (source          : str
+                 , data_model_view : SchemaView) -> ManifestDesc:
+    '''
+    Read a manifest from the Turtle file `source', falling back on
+    `RDFLibLoader' if it can't be read directly, for whatever reason
+    other than the file not being there to read.
+    '''
+    logging.debug (f"Called `turtle_loader (source = {source})'")
+    with open (source, "rb") as fp:
+        data = fp.read ()
+    try:
+        return (read_turtle (data.decode ("utf-8"), data_model_view))
+    except Exception as e:
+        logging.info (f"Cannot read manifest {source} as Turtle directly ({e!r}), using the RDF loader")
+        return (RDFLibLoader ().load (source = source, target_class = ManifestDesc, schemaview = data_model_view))
@@ -1,18 +1,34 @@
 import codecs
 from collections.abc             import Iterable
+from contextlib                  import contextmanager
+from functools                   import lru_cache
 from itertools                   import chain
 
 from linkml_runtime.linkml_model import SchemaDefinition
-from linkml.validator            import validate_file
+from linkml.validator            import Validator
+from linkml.validator.loaders    import Loader, default_loader_for_file
+from linkml.validator.plugins    import JsonschemaValidationPlugin
 
 import logging
-from os      import replace
-from os.path import isfile
+import os
+from os      import replace, stat
+from os.path import abspath, dirname, isfile
 from pathlib import PurePath
 import re
-from typing  import Optional
+import tempfile
+from threading import Lock
+import time
+from typing  import Collection, Iterator, Optional
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+    import msvcrt
 
 from fisdat.data_model import ManifestDesc, ScopeDesc, TableDesc
+from fisdat.report     import collect_errors, print_report, write_report
+from fisdat.stream     import CsvStreamLoader
 
 def fst(g):
     '''
@@ -23,26 +39,90 @@ def fst(g):
         return e
     raise Exception("Generator is empty")
 
+_validator_lock = Lock ()
+
+@lru_cache
+def _schema_validator (schema : str, target_class : str, mtime : int, size : int) -> Validator:
+    # As `linkml.validator.validate', without its private helper
+    validator = Validator (schema, validation_plugins = [JsonschemaValidationPlugin (closed = True)], strict = True)
+    # Validating an empty instance generates the JSON Schema for the class
+    list (validator.iter_results ({}, target_class))
+    return (validator)
+
+def schema_validator (schema : str, target_class : str) -> Validator:
+    '''
+    Parsing the schema and generating the JSON Schema which rows are
+    validated against takes a while, so do it once for each schema file
+    and target class, and reuse the validator for every data file. The
+    lock stops several threads doing this at once, and the schema file's
+    modification time and size are part of the key, in case it changes.
+    '''
+    schema_stat = stat (schema)
+    with _validator_lock:
+        return (_schema_validator (schema, target_class, schema_stat.st_mtime_ns, schema_stat.st_size))
+
 def validation_helper (data         : str
                      , schema       : str
-                     , target_class : str) -> bool:
+                     , target_class : str
+                     , loader       : Optional[Loader]          = None
+                     , max_errors   : int                       = 1
+                     , report_path  : Optional[str]             = None
+                     , na_values    : Optional[Collection[str]] = None
+                     , na_columns   : Optional[Collection[str]] = None) -> bool:
     '''
     `validate_file()' either returns an empty list or a collection of
     errors in a report (`linkml.validator.report.ValidationReport').
-    
-    Setting the `strict' flag means that it fails on the first error,
-    so we only get one. I think this behaviour is better as it catches
-    the first error and should make it easier to fix.
+
+    With the default `max_errors' of one and no `report_path', the
+    validator stops at the first error, so only that one is reported. I
+    think this behaviour is better as it catches the first error and
+    should make it easier to fix.
 
     Compared to the hideous Python Traceback, these errors are remarkably
     friendly and informative!
+
+    This does what `validate_file()' does, but with a validator built
+    only once for each schema, see `schema_validator'.
+
+    Optionally, a LinkML loader may be given which supplies the rows to
+    validate in place of the default loader for the file's extension,
+    e.g. to validate only part of the file.
+
+    Where one error at a time is too slow going, e.g. for a large export
+    with many problems, `max_errors' greater than one collects up to that
+    many errors in a single pass, summarising them by kind and column. If
+    `report_path' is given, the full list with positions is written there as
+    JSON.
+
+    Tokens in `na_values' (e.g. `NA', `#N/A') are treated as missing in
+    the columns `na_columns' of a CSV file, or in all of them if this is
+    `None'.
     '''
-    logging.debug (f"Called `validate_wrapper (data = {data}, schema = {schema}, target_class = {target_class})'")
+    logging.debug (f"Called `validate_wrapper (data = {data}, schema = {schema}, target_class = {target_class}, loader = {loader}, max_errors = {max_errors}, report_path = {report_path}, na_values = {na_values}, na_columns = {na_columns})'")
     prereq_check = isfile (data) and isfile (schema)
+    is_csv       = extension_helper (PurePath (data)) == "csv"
 
     if (prereq_check):
-        try: 
-            report  = validate_file (data, schema, target_class, strict = True)
+        try:
+            if (loader is None and is_csv and (na_values or max_errors > 1 or report_path is not None)):
+                loader = CsvStreamLoader (data, na_values = na_values, na_columns = na_columns)
+
+            if (max_errors > 1 or report_path is not None):
+                if (loader is None):
+                    loader = default_loader_for_file (data)
+                error_report = collect_errors (loader, schema, target_class, max_errors)
+                if (report_path is not None):
+                    print (f"Writing validation report to {write_report (error_report, report_path)}")
+                if (error_report ["error_count"] == 0 and not error_report ["truncated"]):
+                    logging.info (f"Validation success: data file {data} against schema file {schema}, with target class {target_class}")
+                    return (True)
+                else:
+                    print_report (error_report)
+                    return (False)
+            elif (loader is None):
+                report = schema_validator (schema, target_class).validate_source (default_loader_for_file (data), target_class)
+            else:
+                report = schema_validator (schema, target_class).validate_source (loader, target_class)
             results = report.results
 
             if (not results):
@@ -62,6 +142,7 @@ def validation_helper (data         : str
                 return (False)
         except ValueError as e:
             print (f"Invalid target class {target_class}")
+            return (False)
     else:
         print (f"Data file {data} and schema file {schema} must exist!")
         return (prereq_check)
@@ -114,6 +195,16 @@ def prefix_helper (schema_definition : SchemaDefinition
                     return (default_prefix_mapped.prefix_reference + target_term)
             else:
                 return (target_prefix_mapped.prefix_reference + target_term)
+
+## characters which may not appear in an IRI reference in Turtle
+TTL_IRI_ILLEGAL = re.compile (r'[\x00-\x20<>"{}|^`\\]')
+
+def ttl_literal (value : str) -> str:
+    '''
+    `value' as a Turtle string literal, escaped.
+    '''
+    escaped = value.replace ("\\", "\\\\").replace ("\"", "\\\"").replace ("\n", "\\n").replace ("\r", "\\r")
+    return (f"\"{escaped}\"")
     
 
 def schema_components_helper (schema_obj) -> dict [str, str]:
@@ -202,6 +293,8 @@ def job_table (dataclass
             table_lead = f"Wrote to {manifest}:"
         elif (mode == 'r'):
             table_lead = f"Read from {manifest}:"
+        elif (mode == 'a'):
+            table_lead = f"Appended to {manifest}:"
         else:
             table_lead = f"{manifest}:"
         table_text = '\n'.join ([table_lead] + table_body)
@@ -223,3 +316,81 @@ class error(object):
             raise Exception(s)
         else:
             print(s)
+
+## how long to wait for another process to finish with a manifest, in seconds
+LOCK_TIMEOUT = 600
+
+def _umask () -> int:
+    mask = os.umask (0)
+    os.umask (mask)
+    return (mask)
+
+UMASK = _umask ()
+
+def file_mode (target : str) -> int:
+    '''
+    Permissions for a file written in place of `target': those of
+    `target' if it exists, or those of a newly created file.
+    '''
+    return (stat (target).st_mode & 0o7777 if isfile (target) else 0o666 & ~UMASK)
+
+@contextmanager
+def atomic_output (target : str) -> Iterator[str]:
+    '''
+    Yield a temporary file next to `target' to write to, which then
+    replaces `target' in one step. Readers never see a half-written
+    file, and if writing fails, `target' is left as it was.
+    '''
+    path = PurePath (target)
+    (handle, staging) = tempfile.mkstemp (prefix = f".{path.name}.", suffix = path.suffix, dir = dirname (abspath (target)))
+    os.close (handle)
+    os.chmod (staging, file_mode (target))
+    try:
+        yield (staging)
+        replace (staging, target)
+    finally:
+        if (isfile (staging)):
+            os.remove (staging)
+
+def lock_path (manifest : str) -> str:
+    path = PurePath (manifest)
+    return (str (path.with_name (f".{path.name}.lock")))
+
+@contextmanager
+def manifest_lock (manifest : str
+                 , timeout  : float = LOCK_TIMEOUT) -> Iterator[None]:
+    '''
+    Hold an exclusive, advisory lock on `manifest' so that one process at
+    a time reads, changes and writes it. The lock is on a hidden file
+    next to the manifest, as the manifest itself is usually replaced
+    rather than written over. Waiting processes retry with a growing back-off, up to
+    `timeout' seconds, after which `TimeoutError' is raised.
+    '''
+    logging.debug (f"Called `manifest_lock (manifest = {manifest}, timeout = {timeout})'")
+    with open (lock_path (manifest), "a+") as fp:
+        (waited, delay) = (0.0, 0.01)
+        while (True):
+            try:
+                if (fcntl is not None):
+                    fcntl.flock (fp.fileno (), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                else:
+                    fp.seek (0)
+                    msvcrt.locking (fp.fileno (), msvcrt.LK_NBLCK, 1)
+                break
+            except OSError:
+                if (waited >= timeout):
+                    raise TimeoutError (f"Manifest {manifest} is still locked by another process after {timeout}s")
+                if (waited == 0):
+                    logging.info (f"Manifest {manifest} is locked by another process, waiting")
+                time.sleep (delay)
+                waited += delay
+                delay   = min (delay * 2, 1.0)
+
+        try:
+            yield
+        finally:
+            if (fcntl is not None):
+                fcntl.flock (fp.fileno (), fcntl.LOCK_UN)
+            else:
+                fp.seek (0)
+                msvcrt.locking (fp.fileno (), msvcrt.LK_UNLCK, 1)
@@ -0,0 +1,98 @@
+from fisdat.bundle     import bundle_fingerprint, merkle_root, record_path, save_record, unchanged_bundle
+from fisdat.data_model import JobDesc, ManifestDesc, ScopeDesc, TableDesc
+
+from linkml_runtime.dumpers import YAMLDumper
+
+import logging
+import os
+import tempfile
+import unittest
+
+logging_format = "%(levelname)s [%(asctime)s] [`%(filename)s\' `%(funcName)s\' (l.%(lineno)d)] ``%(message)s\'\'"
+logging_level  = logging.DEBUG
+
+prefixes = { "_base": "https://marine.gov.scot/metadata/saved/rap/"
+           , "rap"  : "https://marine.gov.scot/metadata/saved/rap/"
+           , "saved": "https://marine.gov.scot/metadata/saved/schema/" }
+options  = { "bucket": "saved-fisdat", "directory": None }
+
+class TestBundle (unittest.TestCase):
+    '''
+    Case 1: Same bundle, tables in another order -> same fingerprint
+    Case 2: Data file, schema or option changed  -> different fingerprint
+    Case 3: Data file missing                    -> no fingerprint
+    Case 4: Fingerprint recorded after upload    -> same fingerprint finds the record
+    Case 5: Merkle root                          -> independent of leaf order
+    Case 6: Manifest format or earlier bundle    -> different fingerprint
+    '''
+    def setUp (self):
+        self.directory = tempfile.TemporaryDirectory ()
+        self.cwd       = f"{self.directory.name}/"
+        for (name, text) in [("d0.csv", "a,b\n1,2\n"), ("d1.csv", "a,b\n3,4\n"), ("s.yaml", "id: s\n")]:
+            with open (f"{self.cwd}{name}", "w") as fp:
+                fp.write (text)
+
+    def tearDown (self):
+        self.directory.cleanup ()
+
+    def write_manifest (self, order : list[int] = [0, 1]) -> str:
+        tables   = [TableDesc (atomic_name = f"d{k}", resource_path = f"d{k}.csv", resource_hash = f"hash{k}", schema_path_yaml = "s.yaml") for k in order]
+        jobs     = [JobDesc (atomic_name = "job", job_type = "ignore", job_scope_descriptive = [ScopeDesc (column = "a", variable = "count", table = "d0")])]
+        manifest = f"{self.cwd}manifest.yaml"
+        YAMLDumper ().dump (ManifestDesc (atomic_name = "RootManifest", tables = tables, jobs = jobs), manifest)
+        return (manifest)
+
+    def fingerprint (self, manifest : str, options : dict = options) -> str:
+        return (bundle_fingerprint (manifest, "yaml", prefixes, options, fake_cwd = self.cwd))
+
+    def test_bundle0 (self):
+        print ("Bundle fingerprint case 1: Same bundle")
+        first = self.fingerprint (self.write_manifest ([0, 1]))
+        self.assertIsNotNone (first)
+        self.assertEqual (self.fingerprint (self.write_manifest ([1, 0])), first)
+
+    def test_bundle1 (self):
+        print ("Bundle fingerprint case 2: Changes")
+        manifest = self.write_manifest ()
+        first    = self.fingerprint (manifest)
+        self.assertNotEqual (self.fingerprint (manifest, options | { "directory": "elsewhere" }), first)
+        with open (f"{self.cwd}s.yaml", "a") as fp:
+            fp.write ("name: s\n")
+        second = self.fingerprint (manifest)
+        self.assertNotEqual (second, first)
+        info = os.stat (f"{self.cwd}d1.csv")
+        os.utime (f"{self.cwd}d1.csv", ns = (info.st_atime_ns, info.st_mtime_ns + 10**9))
+        self.assertNotEqual (self.fingerprint (manifest), second)
+
+    def test_bundle2 (self):
+        print ("Bundle fingerprint case 3: Missing data file")
+        manifest = self.write_manifest ()
+        os.remove (f"{self.cwd}d1.csv")
+        self.assertIsNone (self.fingerprint (manifest))
+
+    def test_bundle3 (self):
+        print ("Bundle fingerprint case 4: Recorded upload")
+        manifest    = self.write_manifest ()
+        fingerprint = self.fingerprint (manifest)
+        self.assertIsNone (unchanged_bundle (manifest, fingerprint))
+        save_record (manifest, fingerprint, "uuid", "gs://saved-fisdat/owner/20240101/uuid", "saved-fisdat", "owner/20240101/uuid")
+        self.assertTrue (os.path.isfile (record_path (manifest)))
+        self.assertEqual (unchanged_bundle (manifest, fingerprint) ["url"], "gs://saved-fisdat/owner/20240101/uuid")
+        self.assertIsNone (unchanged_bundle (manifest, "0" * 96))
+        self.assertIsNone (unchanged_bundle (manifest, None))
+
+    def test_bundle4 (self):
+        print ("Bundle fingerprint case 5: Merkle root")
+        leaves = [f"leaf {k}".encode () for k in range (5)]
+        self.assertEqual (merkle_root (leaves), merkle_root (leaves [::-1]))
+        self.assertNotEqual (merkle_root (leaves), merkle_root (leaves [:4]))
+        self.assertEqual (len (merkle_root ([])), 96)
+
+    def test_bundle5 (self):
+        print ("Bundle fingerprint case 6: Manifest format or earlier bundle")
+        manifest = self.write_manifest ()
+        yaml     = self.fingerprint (manifest, options | { "manifest_format": "yaml" })
+        ttl      = self.fingerprint (manifest, options | { "manifest_format": "ttl" })
+        self.assertIsNotNone (yaml)
+        self.assertNotEqual (ttl, yaml)
+        self.assertNotEqual (self.fingerprint (manifest, options | { "manifest_format": "yaml", "based_on": "gs://saved-fisdat/owner/20240101/uuid" }), yaml)
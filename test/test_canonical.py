@@ -0,0 +1,64 @@
+from fisdat.canonical  import canonical_manifest, canonical_turtle, canonical_yaml, manifest_digest
+from fisdat.data_model import JobDesc, ManifestDesc, ScopeDesc, TableDesc
+from fisdat.turtle     import TurtleReader
+
+import logging
+import unittest
+
+logging_format = "%(levelname)s [%(asctime)s] [`%(filename)s\' `%(funcName)s\' (l.%(lineno)d)] ``%(message)s\'\'"
+logging_level  = logging.DEBUG
+
+prefixes = { "_base": "https://marine.gov.scot/metadata/saved/rap/"
+           , "rap"  : "https://marine.gov.scot/metadata/saved/rap/"
+           , "saved": "https://marine.gov.scot/metadata/saved/schema/" }
+
+def make_manifest (order : list[int], names : list[str]) -> ManifestDesc:
+    tables = [TableDesc (atomic_name      = names [k]
+                       , resource_path    = f"d{k}.csv"
+                       , resource_hash    = f"hash{k}"
+                       , schema_path_yaml = "s.yaml") for k in order]
+    scopes = [ScopeDesc (column = "time", variable = "saved:time", table = names [1])
+            , ScopeDesc (column = "count", variable = "https://marine.gov.scot/metadata/saved/schema/count", table = names [0])]
+    jobs   = [JobDesc (atomic_name = f"job{k}", job_type = "ignore", job_scope_descriptive = scopes [::1 if k else -1]) for k in order if k < 2]
+    return (ManifestDesc (atomic_name = "RootManifest", tables = tables, jobs = jobs, local_version = "0.7"))
+
+class TestCanonical (unittest.TestCase):
+    '''
+    Case 1: Same content, different order and names -> same YAML, Turtle and digest
+    Case 2: Different content                       -> different digest
+    Case 3: Names                                   -> relative to base, else longest CURIE
+    Case 4: Manifest given                          -> unchanged
+    Case 5: Canonical Turtle read back              -> same bytes again
+    '''
+    def test_canonical0 (self):
+        print ("Canonical manifest case 1: Same content")
+        first  = make_manifest ([0, 1, 2], ["d0", "d1", "d2"])
+        second = make_manifest ([2, 1, 0], ["rap:d0", "https://marine.gov.scot/metadata/saved/rap/d1", "d2"])
+        self.assertEqual (canonical_yaml (first, prefixes), canonical_yaml (second, prefixes))
+        self.assertEqual (canonical_turtle (first, prefixes), canonical_turtle (second, prefixes))
+        self.assertEqual (manifest_digest (first, prefixes), manifest_digest (second, prefixes))
+
+    def test_canonical1 (self):
+        print ("Canonical manifest case 2: Different content")
+        first  = make_manifest ([0, 1, 2], ["d0", "d1", "d2"])
+        second = make_manifest ([0, 1, 2], ["d0", "d1", "d2"])
+        second.tables [2].resource_hash = "changed"
+        self.assertNotEqual (manifest_digest (first, prefixes), manifest_digest (second, prefixes))
+
+    def test_canonical2 (self):
+        print ("Canonical manifest case 3: Names")
+        manifest = canonical_manifest (make_manifest ([1, 0], ["rap:d0", "d1", "d2"]), prefixes)
+        self.assertEqual ([t.atomic_name for t in manifest.tables], ["d0", "d1"])
+        self.assertEqual ([(s.table, s.variable) for s in manifest.jobs [0].job_scope_descriptive], [("d0", "saved:count"), ("d1", "saved:time")])
+
+    def test_canonical3 (self):
+        print ("Canonical manifest case 4: Unchanged")
+        manifest = make_manifest ([1, 0], ["rap:d0", "d1", "d2"])
+        canonical_manifest (manifest, prefixes)
+        self.assertEqual ([t.atomic_name for t in manifest.tables], ["d1", "rap:d0"])
+        self.assertEqual (manifest.jobs [0].job_scope_descriptive [0].variable, "saved:time")
+
+    def test_canonical4 (self):
+        print ("Canonical manifest case 5: Round trip")
+        text = canonical_turtle (make_manifest ([2, 0, 1], ["d0", "d1", "d2"]), prefixes)
+        self.assertEqual (canonical_turtle (TurtleReader (text).manifest (), prefixes), text)
@@ -0,0 +1,76 @@
+from fisdat.chunking import chunk_key, chunks, reassemble, upload_chunked
+from fisdat.storage  import LocalStorage
+
+from hashlib import sha384
+import json
+import logging
+import os
+import tempfile
+import unittest
+
+logging_format = "%(levelname)s [%(asctime)s] [`%(filename)s\' `%(funcName)s\' (l.%(lineno)d)] ``%(message)s\'\'"
+logging_level  = logging.DEBUG
+
+sizes = { "average": 4096, "minimum": 1024, "maximum": 16384 }
+
+def write_rows (path : str, start : int, stop : int, mode : str = "w") -> None:
+    with open (path, mode) as fp:
+        if (mode == "w"):
+            fp.write ("time,site,count\n")
+        for k in range (start, stop):
+            fp.write (f"2024-01-{k % 28 + 1:02d}T{k % 24:02d}:00,site_{k % 17},{(k * 7919) % 1000}\n")
+
+def chunk_hashes (path : str) -> list[str]:
+    return ([sha384 (k).hexdigest () for k in chunks (path, **sizes)])
+
+class TestChunking (unittest.TestCase):
+    '''
+    Case 1: Chunks of a file             -> whole rows, within the sizes, making up the file
+    Case 2: Rows appended                -> earlier chunks unchanged
+    Case 3: Upload, grow, upload again   -> only new chunks uploaded, file reassembled
+    Case 4: Chunk missing                -> reassembly fails
+    '''
+    def setUp (self):
+        self.directory = tempfile.TemporaryDirectory ()
+        self.data      = os.path.join (self.directory.name, "series.csv")
+        self.storage   = LocalStorage (os.path.join (self.directory.name, "bucket"))
+        write_rows (self.data, 0, 10000)
+
+    def tearDown (self):
+        self.directory.cleanup ()
+
+    def test_chunking0 (self):
+        print ("Chunking case 1: Chunks")
+        parts = list (chunks (self.data, **sizes))
+        with open (self.data, "rb") as fp:
+            self.assertEqual (b"".join (parts), fp.read ())
+        self.assertGreater (len (parts), 10)
+        for part in parts [:-1]:
+            self.assertTrue (part.endswith (b"\n"))
+            self.assertTrue (sizes ["minimum"] <= len (part) <= sizes ["maximum"])
+
+    def test_chunking1 (self):
+        print ("Chunking case 2: Appended rows")
+        before = chunk_hashes (self.data)
+        write_rows (self.data, 10000, 10100, mode = "a")
+        after  = chunk_hashes (self.data)
+        self.assertEqual (after [:len (before) - 1], before [:-1])
+
+    def test_chunking2 (self):
+        print ("Chunking case 3: Upload and reassemble")
+        (count, uploaded) = upload_chunked (self.storage, self.data, "first/series.csv.chunks", **sizes)
+        self.assertEqual (count, uploaded)
+        write_rows (self.data, 10000, 10100, mode = "a")
+        (count, uploaded) = upload_chunked (self.storage, self.data, "second/series.csv.chunks", **sizes)
+        self.assertLessEqual (uploaded, 2)
+        target = os.path.join (self.directory.name, "restored.csv")
+        self.assertTrue (reassemble (self.storage, "second/series.csv.chunks", target))
+        with open (self.data, "rb") as fp, open (target, "rb") as fq:
+            self.assertEqual (fp.read (), fq.read ())
+
+    def test_chunking3 (self):
+        print ("Chunking case 4: Missing chunk")
+        upload_chunked (self.storage, self.data, "first/series.csv.chunks", **sizes)
+        index = json.loads (self.storage.read ("first/series.csv.chunks"))
+        os.remove (self.storage.path (chunk_key (index ["chunks"] [3] [0])))
+        self.assertFalse (reassemble (self.storage, "first/series.csv.chunks", os.path.join (self.directory.name, "restored.csv")))
@@ -1,7 +1,9 @@
-from fisdat.cmd_dat import manifest_wrapper, append_job_manifest
+from fisdat.cmd_dat import manifest_wrapper, append_job_manifest, batch_wrapper, read_mapping, unique_pairs
 
+from functools import partial
 import logging
 import os
+import tempfile
 import unittest
 
 '''
@@ -574,3 +576,95 @@ class TestInit (unittest.TestCase):
             
         except FileNotFoundError as e:
             self.assertFalse (bool(e))
+
+class TestBatch (unittest.TestCase):
+    '''
+    Case 1: Mapping file with a glob pattern and a comment
+    Case 2: Several known-good data files in one go            -> True
+    Case 3: One of several data files fails validation         -> False
+    Case 4: Data file named like a glob pattern, and repeats   -> file taken as it is, each once
+    Case 5: Data file already in the manifest                  -> False
+    '''
+
+    def test_batch0 (self):
+        print ("Test case #1: Mapping file")
+        with open ("/tmp/mapping.csv", "w") as fp:
+            fp.write (f"# data, schema\n{data0}, {schema0}\nexamples/density_count_model/deployment_*.csv,{schema0}\n")
+        test = read_mapping ("/tmp/mapping.csv")
+        os.remove ("/tmp/mapping.csv")
+
+        self.assertEqual (len (test), 4)
+        self.assertEqual (test [0], (data0, schema0))
+        self.assertTrue (test [1][0].endswith ("cage_10.csv"))
+
+    def test_batch1 (self):
+        print ("Test case #2: Several known-good data files")
+
+        test = batch_wrapper (
+            pairs          = [(data0, schema0), (data1, schema1)]
+          , data_model_uri = data_model_uri
+          , manifest       = "/tmp/batch1.yaml"
+          , manifest_name  = manifest_name
+          , validate       = True
+          , prefixes       = prefixes
+          , serialise_mode = "yaml"
+        )
+        try:
+            self.assertTrue (test)
+            os.remove ("/tmp/batch1.yaml")
+            
+        except FileNotFoundError as e:
+            self.assertFalse (bool(e))
+
+    def test_batch2 (self):
+        print ("Test case #3: One of several data files fails validation")
+
+        test = batch_wrapper (
+            pairs          = [(data0, schema0), (data_bad, schema0)]
+          , data_model_uri = data_model_uri
+          , manifest       = "/tmp/batch2.yaml"
+          , manifest_name  = manifest_name
+          , validate       = True
+          , prefixes       = prefixes
+          , serialise_mode = "yaml"
+        )
+        try:
+            self.assertFalse (test)
+            os.remove ("/tmp/batch2.yaml")
+            
+        except FileNotFoundError as e:
+            self.assertFalse (bool(e))
+
+    def test_batch3 (self):
+        print ("Test case #4: Data file named like a glob pattern")
+        with tempfile.TemporaryDirectory () as directory:
+            literal = os.path.join (directory, "data[1].csv")
+            other   = os.path.join (directory, "data1.csv")
+            for path in [literal, other]:
+                with open (path, "w") as fp:
+                    fp.write ("a\n1\n")
+            mapping = os.path.join (directory, "mapping.csv")
+            with open (mapping, "w") as fp:
+                fp.write (f"{literal},{schema0}\n{other},{schema0}\n{os.path.join (directory, '.', 'data1.csv')},{schema1}\n")
+            test = unique_pairs (read_mapping (mapping))
+
+        self.assertEqual (test, [(literal, schema0), (other, schema0)])
+
+    def test_batch4 (self):
+        print ("Test case #5: Data file already in the manifest")
+        batch = partial (batch_wrapper
+                       , data_model_uri = data_model_uri
+                       , manifest       = "/tmp/batch4.yaml"
+                       , manifest_name  = manifest_name
+                       , validate       = True
+                       , prefixes       = prefixes
+                       , serialise_mode = "yaml")
+        first  = batch (pairs = [(data0, schema0)])
+        second = batch (pairs = [(data0, schema0), (data1, schema1)])
+        try:
+            self.assertTrue (first)
+            self.assertFalse (second)
+            os.remove ("/tmp/batch4.yaml")
+
+        except FileNotFoundError as e:
+            self.assertFalse (bool(e))
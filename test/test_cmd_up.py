@@ -1,10 +1,15 @@
 from fisdat.cmd_dat import manifest_wrapper
-from fisdat.cmd_up import convert_feasibility, coalesce_schema, coalesce_manifest
+from fisdat.cmd_up import convert_feasibility, coalesce_schema, coalesce_manifest, coalesce_table, pipeline_tables
+from fisdat.data_model import TableDesc
+
+from hashlib import sha384
 
 import logging
 from pathlib import Path, PurePath
 import os
-from shutil import copytree, rmtree, ignore_patterns
+from shutil import copy, copytree, rmtree, ignore_patterns
+import tempfile
+from types import SimpleNamespace
 import unittest
 
 logging_format = "%(levelname)s [%(asctime)s] [`%(filename)s\' `%(funcName)s\' (l.%(lineno)d)] ``%(message)s\'\'"
@@ -111,6 +116,53 @@ class TestFeasibility (unittest.TestCase):
         )
         self.assertTrue (test_signal and target_path == schema_yaml0)
 
+class TestCoalesceTable (unittest.TestCase):
+    '''
+    Checking tables and converting their schemata
+
+    Case 1: Schema converted      -> new table with TTL schema, original unchanged
+    Case 2: Data file has changed -> original table, unsuccessful
+    Case 3: Schema converted by an earlier run, no force -> converted again, with or without the pipeline
+    '''
+    def make_table (self, resource_hash : str) -> TableDesc:
+        return (TableDesc (atomic_name      = "station"
+                         , resource_path    = data1.name
+                         , resource_hash    = resource_hash
+                         , schema_path_yaml = schema_yaml1.name))
+
+    def test_table0 (self):
+        print ("Table coalescence case 1: New table with converted schema")
+        with open (data1, "rb") as fp:
+            table = self.make_table (sha384 (fp.read ()).hexdigest ())
+        (success, result) = coalesce_table (table, f"{data1.parent}/", dry_run = True, force = False, convert = True, stem = "converted")
+        self.assertTrue (success)
+        self.assertEqual (result.schema_path_ttl, schema_ttl1_c.name)
+        self.assertIsNot (result, table)
+        self.assertIsNone (table.schema_path_ttl)
+
+    def test_table1 (self):
+        print ("Table coalescence case 2: Changed data file")
+        table = self.make_table ("0" * 96)
+        (success, result) = coalesce_table (table, f"{data1.parent}/", dry_run = True, force = False, convert = True, stem = "converted")
+        self.assertFalse (success)
+        self.assertIs (result, table)
+
+    def test_table2 (self):
+        print ("Table coalescence case 3: Schema converted by an earlier run")
+        with open (data1, "rb") as fp:
+            table = self.make_table (sha384 (fp.read ()).hexdigest ())
+        with tempfile.TemporaryDirectory () as directory:
+            for k in [data1, schema_yaml1]:
+                copy (k, directory)
+            with open (os.path.join (directory, schema_ttl1_c.name), "w") as fp:
+                fp.write ("# Left by an earlier run\n")
+            args     = SimpleNamespace (bucket = f"file://{directory}/bucket", based_on = None, chunked = None, pipeline = 2)
+            manifest = SimpleNamespace (tables = [table])
+            (success, _) = coalesce_table (table, f"{directory}/", dry_run = True, force = False, convert = True, stem = "converted")
+            self.assertTrue (success)
+            (signals, _) = pipeline_tables (args, "bundle", dry_run = True, no_upload = True, convert_schema = True, manifest_obj = manifest, fake_cwd = f"{directory}/")
+            self.assertEqual (signals, (True,))
+
 class TestConvertSchema (unittest.TestCase):
     '''
     Conversion of schemata
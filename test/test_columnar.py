@@ -0,0 +1,111 @@
+from fisdat.columnar    import CACHE, cache_path, column_types, columnar_writer, open_columns, read_npy_header, write_columnar
+from fisdat.incremental import file_hash
+from fisdat.ingest      import ingest_helper
+
+import logging
+import math
+import os
+import tempfile
+import unittest
+
+logging_format = "%(levelname)s [%(asctime)s] [`%(filename)s\' `%(funcName)s\' (l.%(lineno)d)] ``%(message)s\'\'"
+logging_level  = logging.DEBUG
+
+schema_text = """
+id: https://marine.gov.scot/metadata/saved/rap/columnar/
+name: columnar
+prefixes:
+  linkml: https://w3id.org/linkml/
+imports:
+  - linkml:types
+default_prefix: columnar
+default_range: string
+types:
+  count_type:
+    typeof: integer
+slots:
+  time:
+    range: integer
+    required: true
+  count:
+    range: count_type
+  weight:
+    range: double
+  site:
+classes:
+  TableSchema:
+    slots:
+      - time
+      - count
+      - weight
+      - site
+"""
+
+class TestColumnar (unittest.TestCase):
+    '''
+    Case 1: Schema with a type of its own and a default range -> base type of each column
+    Case 2: Valid file with the copy written as it is read    -> copy keyed by hash, typed values and missing values
+    Case 3: Invalid file                                      -> no copy, nothing left behind
+    Case 4: Copy written in a pass of its own                 -> same copy, `.npy' headers, wrong hash not found
+    Case 5: Integer out of the range of 64 bits               -> still valid, no copy, nothing left behind
+    '''
+    def setUp (self):
+        self.directory = tempfile.TemporaryDirectory ()
+        self.schema    = os.path.join (self.directory.name, "columnar.yaml")
+        self.data      = os.path.join (self.directory.name, "columnar.csv")
+        with open (self.schema, "w") as fp:
+            fp.write (schema_text)
+        with open (self.data, "w") as fp:
+            fp.write ("time,count,weight,site\n" + "".join (f"{k},{'' if k % 3 == 0 else k * 2},{k / 4},site ø{k % 5}\n" for k in range (3000)))
+
+    def tearDown (self):
+        self.directory.cleanup ()
+
+    def test_columnar0 (self):
+        print ("Columnar case 1: Column types")
+        self.assertEqual (column_types (self.schema, "TableSchema"), { "time": "integer", "count": "integer", "weight": "double", "site": "string" })
+        self.assertIsNone (column_types (self.schema, "Missing"))
+
+    def test_columnar1 (self):
+        print ("Columnar case 2: Copy written as the file is validated")
+        (valid, data_hash, _) = ingest_helper (self.data, self.schema, "TableSchema", cache = columnar_writer (self.data, self.schema))
+        self.assertTrue (valid)
+        self.assertEqual (data_hash, file_hash (self.data))
+        with open_columns (self.data, data_hash) as table:
+            self.assertEqual ((table.rows, table.names), (3000, ["time", "count", "weight", "site"]))
+            self.assertEqual (table ["time"] [2999], 2999)
+            self.assertEqual (table ["count"] [:3].tolist (), [0, 2, 4])
+            self.assertEqual (table.valid ("count") [:3].tolist (), [0, 1, 1])
+            self.assertIsNone (table.valid ("time"))
+            self.assertEqual (table ["weight"] [10], 2.5)
+            self.assertEqual ((len (table ["site"]), table ["site"] [-1]), (3000, "site ø4"))
+
+    def test_columnar2 (self):
+        print ("Columnar case 3: Invalid file")
+        with open (self.data, "a") as fp:
+            fp.write ("x,1,1.0,a\n")
+        (valid, _, _) = ingest_helper (self.data, self.schema, "TableSchema", cache = columnar_writer (self.data, self.schema))
+        self.assertFalse (valid)
+        self.assertEqual (os.listdir (os.path.join (self.directory.name, CACHE)), [])
+
+    def test_columnar3 (self):
+        print ("Columnar case 4: Copy written in a pass of its own")
+        data_hash = file_hash (self.data)
+        directory = write_columnar (self.data, self.schema, data_hash)
+        self.assertEqual (directory, cache_path (self.data, data_hash))
+        with open (os.path.join (directory, "2.npy"), "rb") as fp:
+            self.assertEqual (read_npy_header (fp), ("<f8", 3000, 128))
+        with open_columns (self.data, data_hash) as table:
+            self.assertTrue (math.isclose (sum (table ["weight"]), sum (k / 4 for k in range (3000))))
+        self.assertEqual (write_columnar (self.data, self.schema, data_hash), directory)
+        self.assertIsNone (open_columns (self.data, "0" * 96))
+
+    def test_columnar4 (self):
+        print ("Columnar case 5: Integer out of the range of 64 bits")
+        with open (self.data, "a") as fp:
+            fp.write (f"{2 ** 63},1,1.0,a\n")
+        (valid, data_hash, _) = ingest_helper (self.data, self.schema, "TableSchema", cache = columnar_writer (self.data, self.schema))
+        self.assertTrue (valid)
+        self.assertIsNone (open_columns (self.data, data_hash))
+        self.assertEqual (os.listdir (os.path.join (self.directory.name, CACHE)), [])
+        self.assertIsNone (write_columnar (self.data, self.schema, data_hash))
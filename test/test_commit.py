@@ -0,0 +1,75 @@
+from fisdat.cmd_up     import upload_files
+from fisdat.commit     import commit_order, committed, read_marker, table_objects
+from fisdat.data_model import TableDesc
+from fisdat.storage    import open_storage, url_path
+
+import logging
+import os
+import tempfile
+from types import SimpleNamespace
+import unittest
+
+logging_format = "%(levelname)s [%(asctime)s] [`%(filename)s\' `%(funcName)s\' (l.%(lineno)d)] ``%(message)s\'\'"
+logging_level  = logging.DEBUG
+
+def write (name : str, text : str) -> None:
+    with open (name, "w") as fp:
+        fp.write (text)
+
+class TestCommit (unittest.TestCase):
+    '''
+    Case 1: Tables sharing a schema      -> grouped by table, schema with the first, manifests and index last
+    Case 2: Bundle uploaded              -> a marker for each table, bundle committed
+    Case 3: Bundle packed                -> markers for the packed tables, bundle committed
+    Case 4: Nothing uploaded             -> no markers, bundle not committed
+    '''
+    def setUp (self):
+        self.directory = tempfile.TemporaryDirectory ()
+        self.cwd       = os.getcwd ()
+        os.chdir (self.directory.name)
+        self.bucket    = f"file://{self.directory.name}/bucket"
+        self.tables    = [TableDesc (atomic_name = f"d{k}", resource_path = f"d{k}.csv", resource_hash = f"h{k}", schema_path_yaml = "s.yaml", schema_path_ttl = "s.converted.ttl") for k in range (2)]
+        self.files     = ["m.yaml", "m.ttl", ".index", "d0.csv", "d1.csv", "s.yaml", "s.converted.ttl"]
+        for name in self.files:
+            write (name, f"{name}\n")
+
+    def tearDown (self):
+        os.chdir (self.cwd)
+        self.directory.cleanup ()
+
+    def upload (self, pack : int = None) -> str:
+        args = SimpleNamespace (bucket = self.bucket, directory = "bundle")
+        (_, url) = upload_files (args, self.files, "owner", "20240101", False, pack = pack, tables = self.tables)
+        return (url_path (url, self.bucket))
+
+    def test_commit0 (self):
+        print ("Commit case 1: Commit order")
+        groups = commit_order (self.tables, self.files)
+        self.assertEqual (groups, [ (self.tables [0], ["d0.csv", "s.yaml", "s.converted.ttl"])
+                                  , (self.tables [1], ["d1.csv"])
+                                  , (None,            ["m.yaml", "m.ttl", ".index"]) ])
+        self.assertEqual (table_objects (self.tables [1], chunked = ["d1.csv"]), ["d1.csv.chunks", "s.yaml", "s.converted.ttl"])
+
+    def test_commit1 (self):
+        print ("Commit case 2: Bundle uploaded")
+        path    = self.upload ()
+        storage = open_storage (self.bucket)
+        for table in self.tables:
+            marker = read_marker (storage, path, table.atomic_name)
+            self.assertEqual (marker ["resource_hash"], table.resource_hash)
+            self.assertEqual (marker ["objects"], table_objects (table))
+        self.assertTrue (committed (storage, path))
+
+    def test_commit2 (self):
+        print ("Commit case 3: Bundle packed")
+        path    = self.upload (pack = 1024)
+        storage = open_storage (self.bucket)
+        self.assertIsNotNone (read_marker (storage, path, "d1"))
+        self.assertIsNone (storage.read (f"{path}/.index"))
+        self.assertTrue (committed (storage, path))
+
+    def test_commit3 (self):
+        print ("Commit case 4: Nothing uploaded")
+        storage = open_storage (self.bucket)
+        self.assertIsNone (read_marker (storage, "owner/20240101/bundle", "d0"))
+        self.assertFalse (committed (storage, "owner/20240101/bundle"))
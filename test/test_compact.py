@@ -0,0 +1,67 @@
+from fisdat.compact    import Manifest, Scope, Table, compact
+from fisdat.data_model import JobDesc, ManifestDesc, ScopeDesc, TableDesc
+from fisdat.index      import ManifestIndex
+
+from linkml_runtime.dumpers import YAMLDumper
+
+import logging
+import unittest
+
+logging_format = "%(levelname)s [%(asctime)s] [`%(filename)s\' `%(funcName)s\' (l.%(lineno)d)] ``%(message)s\'\'"
+logging_level  = logging.DEBUG
+
+def make_manifest (n : int) -> ManifestDesc:
+    tables = [TableDesc (atomic_name      = f"d{k}"
+                       , resource_path    = f"data/d{k}.csv"
+                       , resource_hash    = f"hash{k}"
+                       , schema_path_yaml = "".join (["s", ".yaml"])
+                       , title            = f"Table {k}") for k in range (n)]
+    jobs   = [JobDesc (atomic_name           = "job1"
+                      , job_type              = "ignore"
+                      , job_scope_descriptive = [ScopeDesc (column = "count", variable = "count", table = "d1")]
+                      , job_scope_modelled    = [ScopeDesc (column = "time", variable = "saved:time", table = "d0")])]
+    return (ManifestDesc (atomic_name = "RootManifest", tables = tables, jobs = jobs, local_version = "0.7"))
+
+class TestCompact (unittest.TestCase):
+    '''
+    Case 1: Manifest to compact and back      -> same manifest, same YAML
+    Case 2: Schema path repeated per table    -> one string shared
+    Case 3: Compact objects                   -> no dictionary, unknown slot refused
+    Case 4: Index over a compact manifest     -> same lookups
+    Case 5: Required slot missing             -> ValueError on conversion, as for the generated class
+    '''
+    def test_compact0 (self):
+        print ("Compact manifest case 1: Round trip")
+        manifest = make_manifest (3)
+        restored = compact (manifest).to_desc ()
+        self.assertEqual (restored, manifest)
+        self.assertEqual (YAMLDumper ().dumps (restored), YAMLDumper ().dumps (manifest))
+
+    def test_compact1 (self):
+        print ("Compact manifest case 2: Shared strings")
+        tables = compact (make_manifest (3)).tables
+        self.assertIs (tables [0].schema_path_yaml, tables [2].schema_path_yaml)
+
+    def test_compact2 (self):
+        print ("Compact manifest case 3: Slots")
+        table = Table (atomic_name = "d0", resource_path = "d0.csv", resource_hash = "h", schema_path_yaml = "s.yaml")
+        self.assertFalse (hasattr (table, "__dict__"))
+        self.assertIsNone (table.title)
+        self.assertEqual (Manifest (atomic_name = "RootManifest").tables, [])
+        with self.assertRaises (ValueError):
+            Table (atomic_name = "d0", resource_file = "d0.csv")
+
+    def test_compact3 (self):
+        print ("Compact manifest case 4: Index")
+        index = ManifestIndex (compact (make_manifest (10)))
+        self.assertEqual (index.table_for_path ("d7.csv").atomic_name, "d7")
+        self.assertEqual ([str (j.atomic_name) for (j, _) in index.jobs_for_table ("d1")], ["job1"])
+
+    def test_compact4 (self):
+        print ("Compact manifest case 5: Required slot missing")
+        with self.assertRaises (ValueError):
+            TableDesc (atomic_name = "d0", resource_path = "d0.csv", schema_path_yaml = "s.yaml")
+        with self.assertRaises (ValueError):
+            Table (atomic_name = "d0", resource_path = "d0.csv", schema_path_yaml = "s.yaml").to_desc ()
+        with self.assertRaises (ValueError):
+            Scope (column = "count", variable = "count").to_desc ()
@@ -0,0 +1,104 @@
+from fisdat.cmd_job    import template_to_manifest
+from fisdat.data_model import JobDesc, ScopeDesc, TableDesc
+from fisdat.fragments  import JOBS, TABLES, fragment_names, init_fragments, merge_fragments, merge_to_file, write_fragment
+
+import logging
+import os
+import shutil
+import time
+import unittest
+import yaml
+
+logging_format = "%(levelname)s [%(asctime)s] [`%(filename)s\' `%(funcName)s\' (l.%(lineno)d)] ``%(message)s\'\'"
+logging_level  = logging.DEBUG
+
+manifest_dir = "/tmp/fragment_manifest.d"
+merged_yaml  = "/tmp/fragment_manifest.yaml"
+
+class TestFragments (unittest.TestCase):
+    '''
+    Case 1: Initialise and add tables               -> one fragment each
+    Case 2: Add a table that's already there        -> False, unchanged
+    Case 3: Replace a table                         -> True, updated
+    Case 4: Merge only some jobs                    -> those jobs and their tables
+    Case 5: Merge to a file, then again unchanged   -> file left as it is, merged again once a fragment changes
+    Case 6: Jobs which aren't in the fragments      -> reported, False
+    '''
+    def setUp (self):
+        self.tearDown ()
+        init_fragments (manifest_dir, "RootManifest", "0.7")
+        for k in range (3):
+            write_fragment (manifest_dir, TABLES, TableDesc (atomic_name      = f"d{k}"
+                                                           , resource_path    = f"d{k}.csv"
+                                                           , resource_hash    = f"hash{k}"
+                                                           , schema_path_yaml = "s.yaml"))
+        write_fragment (manifest_dir, JOBS, JobDesc (atomic_name           = "job1"
+                                                   , job_type              = "ignore"
+                                                   , job_scope_descriptive = [ScopeDesc (column = "count", variable = "count", table = "d1")]))
+        write_fragment (manifest_dir, JOBS, JobDesc (atomic_name = "job2", job_type = "ignore"))
+
+    def tearDown (self):
+        shutil.rmtree (manifest_dir, ignore_errors = True)
+        if (os.path.isfile (merged_yaml)):
+            os.remove (merged_yaml)
+
+    def test_fragments0 (self):
+        print ("Fragments case 1: Initialise and add tables")
+        self.assertFalse (init_fragments (manifest_dir, "RootManifest", "0.7"))
+        self.assertEqual (fragment_names (manifest_dir, TABLES), ["d0", "d1", "d2"])
+        self.assertEqual (fragment_names (manifest_dir, JOBS), ["job1", "job2"])
+        self.assertEqual ([k for k in os.listdir (os.path.join (manifest_dir, TABLES)) if k.startswith (".")], [])
+
+    def test_fragments1 (self):
+        print ("Fragments case 2: Table already there")
+        self.assertFalse (write_fragment (manifest_dir, TABLES, TableDesc (atomic_name      = "d0"
+                                                                         , resource_path    = "d0.csv"
+                                                                         , resource_hash    = "other"
+                                                                         , schema_path_yaml = "s.yaml")))
+        with open (os.path.join (manifest_dir, TABLES, "d0.yaml"), "r") as fp:
+            self.assertEqual (yaml.safe_load (fp)["resource_hash"], "hash0")
+
+    def test_fragments2 (self):
+        print ("Fragments case 3: Replace a table")
+        self.assertTrue (write_fragment (manifest_dir, TABLES, TableDesc (atomic_name      = "d0"
+                                                                        , resource_path    = "d0.csv"
+                                                                        , resource_hash    = "other"
+                                                                        , schema_path_yaml = "s.yaml")
+                                        , replace = True))
+        manifest = merge_fragments (manifest_dir)
+        self.assertEqual ([t.resource_hash for t in manifest.tables], ["other", "hash1", "hash2"])
+
+    def test_fragments3 (self):
+        print ("Fragments case 4: Merge only some jobs")
+        manifest = merge_fragments (manifest_dir, jobs = ["job1"])
+        self.assertEqual ([str (j.atomic_name) for j in manifest.jobs], ["job1"])
+        self.assertEqual ([str (t.atomic_name) for t in manifest.tables], ["d1"])
+        self.assertEqual (manifest.local_version, "0.7")
+
+    def test_fragments4 (self):
+        print ("Fragments case 5: Merge to a file")
+        self.assertEqual (str (merge_to_file (manifest_dir, merged_yaml)), merged_yaml)
+        with open (merged_yaml, "r") as fp:
+            manifest = yaml.safe_load (fp)
+        self.assertEqual (manifest ["atomic_name"], "RootManifest")
+        self.assertEqual ([k ["atomic_name"] for k in manifest ["tables"]], ["d0", "d1", "d2"])
+        self.assertEqual (len (manifest ["jobs"]), 2)
+
+        mtime = os.path.getmtime (merged_yaml)
+        time.sleep (0.01)
+        merge_to_file (manifest_dir, merged_yaml)
+        self.assertEqual (os.path.getmtime (merged_yaml), mtime)
+
+        # Changed, but with a time stamp older than the merged manifest
+        fragment = os.path.join (manifest_dir, TABLES, "d0.yaml")
+        write_fragment (manifest_dir, TABLES, TableDesc (atomic_name = "d0", resource_path = "d0.csv", resource_hash = "other", schema_path_yaml = "s.yaml"), replace = True)
+        os.utime (fragment, (mtime - 10, mtime - 10))
+        os.utime (os.path.join (manifest_dir, TABLES), (mtime - 10, mtime - 10))
+        merge_to_file (manifest_dir, merged_yaml)
+        with open (merged_yaml, "r") as fp:
+            self.assertEqual (yaml.safe_load (fp) ["tables"][0]["resource_hash"], "other")
+
+    def test_fragments5 (self):
+        print ("Fragments case 6: Unknown jobs")
+        self.assertFalse (template_to_manifest (manifest_dir, "/tmp/fragment_manifest.ttl", "meta.yaml", {}, jobs = ["job1", "job3"]))
+        self.assertFalse (os.path.isfile ("/tmp/fragment_manifest.ttl"))
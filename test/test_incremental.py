@@ -0,0 +1,135 @@
+from fisdat.incremental import file_hash, incremental_helper, load_state, save_state, state_path
+from fisdat.stream      import CsvStreamLoader
+
+from linkml.validator.loaders import CsvLoader
+
+import logging
+import os
+from shutil import copyfile
+import unittest
+
+logging_format = "%(levelname)s [%(asctime)s] [`%(filename)s\' `%(funcName)s\' (l.%(lineno)d)] ``%(message)s\'\'"
+logging_level  = logging.DEBUG
+
+data0 = "examples/density_count_model/deployment_2011-10-26_2011-11-01_cage_8.csv"
+data1 = "examples/sentinel_cages/sentinel_cages_cleaned.csv"
+
+'''
+A self-contained schema, so that these tests don't need to fetch the
+data model's `saved:core' import.
+'''
+schema_text = """
+id: https://marine.gov.scot/metadata/saved/rap/growing/
+name: growing
+prefixes:
+  linkml: https://w3id.org/linkml/
+imports:
+  - linkml:types
+default_prefix: growing
+default_range: string
+slots:
+  time:
+    range: integer
+    required: true
+  count:
+    range: integer
+classes:
+  TableSchema:
+    slots:
+      - time
+      - count
+"""
+
+growing_schema = "/tmp/growing.yaml"
+growing_data   = "/tmp/growing.csv"
+
+class TestStreamLoader (unittest.TestCase):
+    '''
+    Case 1: Stream loader produces the same instances as LinkML's CsvLoader
+    Case 2: Resuming from a recorded boundary produces only the remaining rows
+    '''
+    def test_loader0 (self):
+        print ("Stream loader case 1: Same instances as `CsvLoader'")
+        for data in [data0, data1]:
+            self.assertEqual (list (CsvLoader (data).iter_instances ())
+                            , list (CsvStreamLoader (data).iter_instances ()))
+
+    def test_loader1 (self):
+        print ("Stream loader case 2: Resume from a row boundary")
+        whole     = CsvStreamLoader (data1)
+        instances = list (whole.iter_instances ())
+        (begin, _) = whole.offsets [100]
+
+        resumed = CsvStreamLoader (data1, start = begin, header = whole.header)
+        self.assertEqual (instances [100:], list (resumed.iter_instances ()))
+        self.assertEqual (whole.boundary, os.path.getsize (data1))
+
+class TestIncremental (unittest.TestCase):
+    '''
+    Case 1: First run validates everything and records state
+    Case 2: Appended rows are validated alone, and the hash covers the whole file
+    Case 3: Appending a bad row fails
+    Case 4: Changing the prefix invalidates the state
+    Case 5: Writing the state fails part way -> earlier state kept
+    '''
+    def setUp (self):
+        with open (growing_schema, "w") as fp:
+            fp.write (schema_text)
+        with open (growing_data, "w") as fp:
+            fp.write ("time,count\n1,10\n2,20\n")
+
+    def tearDown (self):
+        for path in [growing_schema, growing_data, state_path (growing_data)]:
+            if (os.path.isfile (path)):
+                os.remove (path)
+
+    def append (self, text):
+        with open (growing_data, "a") as fp:
+            fp.write (text)
+
+    def test_incremental0 (self):
+        print ("Incremental validation case 1: First run records state")
+        (test, data_hash) = incremental_helper (growing_data, growing_schema, "TableSchema")
+        state = load_state (growing_data)
+        self.assertTrue (test)
+        self.assertEqual (data_hash, file_hash (growing_data))
+        self.assertEqual (state ["offset"], os.path.getsize (growing_data))
+
+    def test_incremental1 (self):
+        print ("Incremental validation case 2: Only validate appended rows")
+        incremental_helper (growing_data, growing_schema, "TableSchema")
+        offset = load_state (growing_data) ["offset"]
+        self.append ("3,30\n4,40\n")
+
+        (test, data_hash) = incremental_helper (growing_data, growing_schema, "TableSchema")
+        self.assertTrue (test)
+        self.assertEqual (data_hash, file_hash (growing_data))
+        self.assertTrue (load_state (growing_data) ["offset"] > offset)
+
+    def test_incremental2 (self):
+        print ("Incremental validation case 3: Appended bad row")
+        incremental_helper (growing_data, growing_schema, "TableSchema")
+        self.append ("five,50\n")
+
+        (test, data_hash) = incremental_helper (growing_data, growing_schema, "TableSchema")
+        self.assertFalse (test)
+        self.assertIsNone (data_hash)
+
+    def test_incremental3 (self):
+        print ("Incremental validation case 4: Changed prefix is revalidated")
+        incremental_helper (growing_data, growing_schema, "TableSchema")
+        with open (growing_data, "w") as fp:
+            fp.write ("time,count\none,10\n2,20\n3,30\n")
+
+        (test, _) = incremental_helper (growing_data, growing_schema, "TableSchema")
+        self.assertFalse (test)
+
+    def test_incremental4 (self):
+        print ("Incremental validation case 5: State write fails part way")
+        incremental_helper (growing_data, growing_schema, "TableSchema")
+        state = load_state (growing_data)
+        # Not JSON serialisable, so the dump fails after writing `{'
+        self.assertRaises (TypeError, save_state, growing_data, { "offset": 0, "prefix": object () })
+        self.assertEqual (load_state (growing_data), state)
+        state_name = state_path (growing_data).name
+        self.assertEqual ([k for k in os.listdir (os.path.dirname (growing_data)) if state_name in k], [state_name])
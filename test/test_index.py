@@ -0,0 +1,81 @@
+from fisdat.data_model import JobDesc, ManifestDesc, ScopeDesc, TableDesc
+from fisdat.index      import ManifestIndex
+
+import logging
+import unittest
+
+logging_format = "%(levelname)s [%(asctime)s] [`%(filename)s\' `%(funcName)s\' (l.%(lineno)d)] ``%(message)s\'\'"
+logging_level  = logging.DEBUG
+
+def make_manifest (n : int) -> ManifestDesc:
+    tables = [TableDesc (atomic_name      = f"d{k}"
+                       , resource_path    = f"data/d{k}.csv"
+                       , resource_hash    = f"hash{k % 2}"
+                       , schema_path_yaml = f"s{k % 3}.yaml") for k in range (n)]
+    jobs   = [JobDesc (atomic_name           = "job1"
+                      , job_type              = "ignore"
+                      , job_scope_descriptive = [ScopeDesc (column = "count", variable = "count", table = "d1")]
+                      , job_scope_modelled    = [ScopeDesc (column = "time", variable = "time", table = "missing")])]
+    return (ManifestDesc (atomic_name = "RootManifest", tables = tables, jobs = jobs, local_version = "0.7"))
+
+class TestManifestIndex (unittest.TestCase):
+    '''
+    Case 1: Lookups by name, data file, hash, schema and job reference
+    Case 2: Names with and without a prefix are the same
+    Case 3: Adding a table clashing by name or data file -> refused
+    Case 4: Updating a hash                              -> hash lookups follow
+    Case 5: Repeats and dangling scope references        -> reported
+    Case 6: Tables with their own names sharing a data file name -> warned of, not refused
+    '''
+    def test_index0 (self):
+        print ("Manifest index case 1: Lookups")
+        index = ManifestIndex (make_manifest (10000))
+        self.assertEqual (index.table ("d9999").resource_path, "data/d9999.csv")
+        self.assertEqual (index.table_for_path ("d42.csv").atomic_name, "d42")
+        self.assertEqual (len (index.tables_for_hash ("hash1")), 5000)
+        self.assertEqual (len (index.tables_for_schema ("s0.yaml")), 3334)
+        self.assertEqual ([str (j.atomic_name) for (j, _) in index.jobs_for_table ("d1")], ["job1"])
+        self.assertIsNone (index.table ("d10000"))
+
+    def test_index1 (self):
+        print ("Manifest index case 2: Prefixed names")
+        index = ManifestIndex (make_manifest (3))
+        self.assertEqual (index.table ("rap:d2").atomic_name, "d2")
+        self.assertEqual (index.table ("https://marine.gov.scot/metadata/saved/rap/d2").atomic_name, "d2")
+        self.assertIsNotNone (index.job ("rap:job1"))
+
+    def test_index2 (self):
+        print ("Manifest index case 3: Clashing tables")
+        manifest = make_manifest (3)
+        index    = ManifestIndex (manifest)
+        self.assertFalse (index.add_table (TableDesc (atomic_name = "new", resource_path = "elsewhere/d0.csv", resource_hash = "x", schema_path_yaml = "s.yaml")))
+        self.assertFalse (index.add_table (TableDesc (atomic_name = "saved:d0", resource_path = "new.csv", resource_hash = "x", schema_path_yaml = "s.yaml")))
+        self.assertTrue (index.add_table (TableDesc (atomic_name = "new", resource_path = "new.csv", resource_hash = "x", schema_path_yaml = "s.yaml")))
+        self.assertEqual (len (manifest.tables), 4)
+        self.assertEqual (index.table_for_path ("new.csv").atomic_name, "new")
+
+    def test_index3 (self):
+        print ("Manifest index case 4: Updating a hash")
+        index = ManifestIndex (make_manifest (3))
+        self.assertEqual (index.update_hash ("d0.csv", "fresh").resource_hash, "fresh")
+        self.assertEqual ([t.atomic_name for t in index.tables_for_hash ("fresh")], ["d0"])
+        self.assertEqual ([t.atomic_name for t in index.tables_for_hash ("hash0")], ["d2"])
+        self.assertIsNone (index.update_hash ("nothing.csv", "fresh"))
+
+    def test_index4 (self):
+        print ("Manifest index case 5: Repeats and dangling references")
+        manifest = make_manifest (3)
+        manifest.tables.append (TableDesc (atomic_name = "rap:d1", resource_path = "other.csv", resource_hash = "x", schema_path_yaml = "s.yaml"))
+        index    = ManifestIndex (manifest)
+        self.assertEqual ([t.resource_path for t in index.duplicates], ["other.csv"])
+        self.assertEqual ([s.table for (_, s) in index.dangling ()], ["missing"])
+        self.assertFalse (index.report ("manifest.yaml"))
+
+    def test_index5 (self):
+        print ("Manifest index case 6: Shared data file names")
+        manifest = make_manifest (3)
+        manifest.tables.append (TableDesc (atomic_name = "other", resource_path = "elsewhere/d1.csv", resource_hash = "x", schema_path_yaml = "s.yaml"))
+        index    = ManifestIndex (manifest)
+        self.assertEqual ((index.duplicates, [t.atomic_name for t in index.shared]), ([], ["other"]))
+        self.assertEqual (index.table_for_path ("d1.csv").atomic_name, "d1")
+        self.assertTrue (index.report ("manifest.yaml"))
@@ -0,0 +1,87 @@
+from fisdat.incremental import file_hash
+from fisdat.ingest      import compressed_path, ingest_helper
+from fisdat.stream      import CsvStreamLoader
+
+import gzip
+from hashlib import sha384
+import logging
+import os
+import tempfile
+import unittest
+
+logging_format = "%(levelname)s [%(asctime)s] [`%(filename)s\' `%(funcName)s\' (l.%(lineno)d)] ``%(message)s\'\'"
+logging_level  = logging.DEBUG
+
+data = "examples/sentinel_cages/sentinel_cages_cleaned.csv"
+
+schema_text = """
+id: https://marine.gov.scot/metadata/saved/rap/ingest/
+name: ingest
+prefixes:
+  linkml: https://w3id.org/linkml/
+imports:
+  - linkml:types
+default_prefix: ingest
+default_range: string
+slots:
+  time:
+    range: integer
+    required: true
+  count:
+    range: integer
+classes:
+  TableSchema:
+    slots:
+      - time
+      - count
+"""
+
+class TestIngest (unittest.TestCase):
+    '''
+    Case 1: Loader with sinks        -> sinks see every byte of the file, in order
+    Case 2: Valid file               -> valid, same hash as hashing separately, line count
+    Case 3: Valid file, compressed   -> compressed copy decompresses to the file
+    Case 4: Invalid file, compressed -> invalid, no hash, no compressed copy
+    '''
+    def setUp (self):
+        self.directory = tempfile.TemporaryDirectory ()
+        self.schema    = os.path.join (self.directory.name, "ingest.yaml")
+        self.data      = os.path.join (self.directory.name, "ingest.csv")
+        with open (self.schema, "w") as fp:
+            fp.write (schema_text)
+        with open (self.data, "w") as fp:
+            fp.write ("time,count\n" + "".join (f"{k},{k * k}\n" for k in range (5000)))
+
+    def tearDown (self):
+        self.directory.cleanup ()
+
+    def test_ingest0 (self):
+        print ("Ingest case 1: Loader with sinks")
+        hasher = sha384 ()
+        loader = CsvStreamLoader (data, sinks = [hasher.update])
+        list (loader.iter_instances ())
+        self.assertEqual (hasher.hexdigest (), file_hash (data))
+
+    def test_ingest1 (self):
+        print ("Ingest case 2: Valid file")
+        (valid, data_hash, stats) = ingest_helper (self.data, self.schema, "TableSchema")
+        self.assertTrue (valid)
+        self.assertEqual (data_hash, file_hash (self.data))
+        self.assertEqual ((stats.size, stats.lines), (os.path.getsize (self.data), 5001))
+        self.assertFalse (os.path.isfile (compressed_path (self.data)))
+
+    def test_ingest2 (self):
+        print ("Ingest case 3: Compressed copy")
+        (valid, data_hash, _) = ingest_helper (self.data, self.schema, "TableSchema", compress = True)
+        self.assertTrue (valid)
+        with gzip.open (compressed_path (self.data), "rb") as fp, open (self.data, "rb") as original:
+            self.assertEqual (fp.read (), original.read ())
+
+    def test_ingest3 (self):
+        print ("Ingest case 4: Invalid file")
+        with open (self.data, "a") as fp:
+            fp.write ("x,1\n")
+        (valid, data_hash, _) = ingest_helper (self.data, self.schema, "TableSchema", compress = True)
+        self.assertFalse (valid)
+        self.assertIsNone (data_hash)
+        self.assertFalse (os.path.isfile (compressed_path (self.data)))
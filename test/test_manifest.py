@@ -0,0 +1,189 @@
+from fisdat.data_model import TableDesc
+from fisdat.manifest   import fast_append
+from fisdat.utils      import lock_path, manifest_lock
+
+import logging
+import multiprocessing
+import os
+import rdflib
+import unittest
+import yaml
+
+logging_format = "%(levelname)s [%(asctime)s] [`%(filename)s\' `%(funcName)s\' (l.%(lineno)d)] ``%(message)s\'\'"
+logging_level  = logging.DEBUG
+
+manifest_yaml_text = """atomic_name: RootManifest
+tables:
+- atomic_name: d0
+  resource_path: d0.csv
+  resource_hash: abc
+  schema_path_yaml: s.yaml
+jobs:
+- atomic_name: job_example_d0
+  job_type: ignore
+  title: Empty job template for d0
+local_version: '0.6'
+"""
+
+manifest_ttl_text = """@base <https://marine.gov.scot/metadata/saved/rap/> .
+@prefix dcterms: <http://purl.org/dc/terms/> .
+@prefix saved: <https://marine.gov.scot/metadata/saved/schema/> .
+@prefix xsd: <http://www.w3.org/2001/XMLSchema#> .
+
+<RootManifest> a saved:ManifestDesc ;
+    saved:jobs <job_example_d0> ;
+    saved:local_version "0.6" ;
+    saved:tables <d0> .
+
+<d0> a saved:TableDesc ;
+    saved:resource_hash "abc" ;
+    saved:resource_path "d0.csv"^^xsd:anyURI ;
+    saved:schema_path_yaml "s.yaml"^^xsd:anyURI .
+
+<job_example_d0> a saved:JobDesc ;
+    dcterms:title "Empty job template for d0" ;
+    saved:job_type "ignore" .
+"""
+
+manifest_yaml = "/tmp/fast_manifest.yaml"
+manifest_ttl  = "/tmp/fast_manifest.ttl"
+
+SAVED = rdflib.Namespace ("https://marine.gov.scot/metadata/saved/schema/")
+RAP   = rdflib.Namespace ("https://marine.gov.scot/metadata/saved/rap/")
+
+class TestFastAppend (unittest.TestCase):
+    '''
+    Case 1: YAML manifest, new table appended in place   -> True
+    Case 2: YAML manifest, table already there           -> False
+    Case 3: TTL manifest, new table appended in place    -> True, file appended to
+    Case 4: TTL manifest, data file already there        -> False
+    Case 5: Manifest in the wrong format                 -> None
+    Case 6: TTL manifest, schema path like the data file -> True
+    Case 7: TTL manifest, last append cut short          -> None, manifest left as it was
+    '''
+    def setUp (self):
+        with open (manifest_yaml, "w") as fp:
+            fp.write (manifest_yaml_text)
+        with open (manifest_ttl, "w") as fp:
+            fp.write (manifest_ttl_text)
+        self.table = TableDesc (atomic_name      = "d1"
+                              , resource_path    = "d1.csv"
+                              , resource_hash    = "def"
+                              , schema_path_yaml = "s.yaml"
+                              , title            = "A \"quoted\" title")
+
+    def tearDown (self):
+        for path in [manifest_yaml, manifest_ttl]:
+            if (os.path.isfile (path)):
+                os.remove (path)
+
+    def test_fast_append0 (self):
+        print ("Fast append case 1: YAML manifest")
+        self.assertTrue (fast_append (manifest_yaml, "RootManifest", "yaml", self.table, "0.7"))
+        with open (manifest_yaml, "r") as fp:
+            manifest = yaml.safe_load (fp)
+        self.assertEqual ([k ["atomic_name"] for k in manifest ["tables"]], ["d0", "d1"])
+        self.assertEqual (manifest ["tables"][1]["title"], "A \"quoted\" title")
+        self.assertEqual (len (manifest ["jobs"]), 1)
+        self.assertEqual (manifest ["local_version"], "0.7")
+
+    def test_fast_append1 (self):
+        print ("Fast append case 2: YAML manifest, duplicate table")
+        self.table.atomic_name = "d0"
+        self.assertFalse (fast_append (manifest_yaml, "RootManifest", "yaml", self.table))
+        with open (manifest_yaml, "r") as fp:
+            self.assertEqual (fp.read (), manifest_yaml_text)
+
+    def test_fast_append2 (self):
+        print ("Fast append case 3: TTL manifest")
+        inode = os.stat (manifest_ttl).st_ino
+        self.assertTrue (fast_append (manifest_ttl, "RootManifest", "ttl", self.table))
+        self.assertEqual (os.stat (manifest_ttl).st_ino, inode)
+        with open (manifest_ttl, "r") as fp:
+            self.assertTrue (fp.read ().startswith (manifest_ttl_text))
+        graph = rdflib.Graph ().parse (manifest_ttl, format = "turtle")
+        self.assertEqual (set (graph.objects (RAP.RootManifest, SAVED.tables)), { RAP.d0, RAP.d1 })
+        self.assertEqual (str (graph.value (RAP.d1, SAVED.resource_hash)), "def")
+        self.assertEqual (str (graph.value (RAP.d1, rdflib.DCTERMS.title)), "A \"quoted\" title")
+
+    def test_fast_append3 (self):
+        print ("Fast append case 4: TTL manifest, duplicate data file")
+        self.table.resource_path = "d0.csv"
+        self.assertFalse (fast_append (manifest_ttl, "RootManifest", "ttl", self.table))
+
+    def test_fast_append4 (self):
+        print ("Fast append case 5: Wrong format")
+        self.assertIsNone (fast_append (manifest_ttl, "RootManifest", "yaml", self.table))
+        self.assertIsNone (fast_append (manifest_yaml, "RootManifest", "ttl", self.table))
+
+    def test_fast_append5 (self):
+        print ("Fast append case 6: TTL manifest, schema path like the data file")
+        self.table.resource_path = "s.yaml"
+        self.assertTrue (fast_append (manifest_ttl, "RootManifest", "ttl", self.table))
+
+    def test_fast_append6 (self):
+        print ("Fast append case 7: TTL manifest, append cut short")
+        text = manifest_ttl_text + "\n<RootManifest> saved:tables <d1> .\n\n<d1> a saved:TableDesc ;\n    saved:resou"
+        with open (manifest_ttl, "w") as fp:
+            fp.write (text)
+        self.assertIsNone (fast_append (manifest_ttl, "RootManifest", "ttl", self.table))
+        with open (manifest_ttl, "r") as fp:
+            self.assertEqual (fp.read (), text)
+
+def locked_append (manifest : str, serialise_mode : str, k : int) -> bool:
+    table = TableDesc (atomic_name      = f"w{k}"
+                     , resource_path    = f"w{k}.csv"
+                     , resource_hash    = f"hash{k}"
+                     , schema_path_yaml = "s.yaml")
+    with manifest_lock (manifest):
+        return (fast_append (manifest, "RootManifest", serialise_mode, table, "0.7"))
+
+def locked_timeout (manifest : str) -> bool:
+    try:
+        with manifest_lock (manifest, timeout = 0.1):
+            return (False)
+    except TimeoutError:
+        return (True)
+
+class TestConcurrentAppend (unittest.TestCase):
+    '''
+    Case 1: Parallel workers append to a YAML manifest  -> every table added
+    Case 2: Parallel workers append to a TTL manifest   -> every table added
+    Case 3: Lock held elsewhere past the timeout        -> TimeoutError
+    '''
+    workers = 16
+
+    def setUp (self):
+        with open (manifest_yaml, "w") as fp:
+            fp.write (manifest_yaml_text)
+        with open (manifest_ttl, "w") as fp:
+            fp.write (manifest_ttl_text)
+
+    def tearDown (self):
+        for path in [manifest_yaml, manifest_ttl, lock_path (manifest_yaml), lock_path (manifest_ttl)]:
+            if (os.path.isfile (path)):
+                os.remove (path)
+
+    def test_concurrent_append0 (self):
+        print ("Concurrent append case 1: YAML manifest")
+        with multiprocessing.Pool (8) as pool:
+            results = pool.starmap (locked_append, [(manifest_yaml, "yaml", k) for k in range (self.workers)])
+        self.assertTrue (all (results))
+        with open (manifest_yaml, "r") as fp:
+            manifest = yaml.safe_load (fp)
+        self.assertEqual (sorted (k ["atomic_name"] for k in manifest ["tables"]), sorted (["d0"] + [f"w{k}" for k in range (self.workers)]))
+
+    def test_concurrent_append1 (self):
+        print ("Concurrent append case 2: TTL manifest")
+        with multiprocessing.Pool (8) as pool:
+            results = pool.starmap (locked_append, [(manifest_ttl, "ttl", k) for k in range (self.workers)])
+        self.assertTrue (all (results))
+        graph = rdflib.Graph ().parse (manifest_ttl, format = "turtle")
+        self.assertEqual (len (set (graph.objects (RAP.RootManifest, SAVED.tables))), self.workers + 1)
+
+    def test_concurrent_append2 (self):
+        print ("Concurrent append case 3: Lock timeout")
+        with manifest_lock (manifest_yaml):
+            with multiprocessing.Pool (1) as pool:
+                pending = pool.apply_async (locked_timeout, (manifest_yaml,))
+                self.assertTrue (pending.get ())
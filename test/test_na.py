@@ -0,0 +1,78 @@
+from fisdat.stream import CsvStreamLoader, NA_VALUES
+from fisdat.utils  import validation_helper
+
+import logging
+import os
+import unittest
+
+logging_format = "%(levelname)s [%(asctime)s] [`%(filename)s\' `%(funcName)s\' (l.%(lineno)d)] ``%(message)s\'\'"
+logging_level  = logging.DEBUG
+
+schema_text = """
+id: https://marine.gov.scot/metadata/saved/rap/na/
+name: na
+prefixes:
+  linkml: https://w3id.org/linkml/
+imports:
+  - linkml:types
+default_prefix: na
+default_range: string
+slots:
+  time:
+    range: integer
+    required: true
+  count:
+    range: integer
+  notes:
+    range: string
+classes:
+  TableSchema:
+    slots:
+      - time
+      - count
+      - notes
+"""
+
+na_schema = "/tmp/na.yaml"
+na_data   = "/tmp/na.csv"
+
+class TestNaValues (unittest.TestCase):
+    '''
+    Case 1: NA tokens fail validation by default              -> False
+    Case 2: NA tokens treated as missing                      -> True
+    Case 3: Only the named columns are normalised
+    Case 4: NA token in a required column is still an error   -> False
+    '''
+    def setUp (self):
+        with open (na_schema, "w") as fp:
+            fp.write (schema_text)
+        with open (na_data, "w") as fp:
+            fp.write ("time,count,notes\n1,10,ok\n2,#N/A,NA\n3,NULL,\n")
+
+    def tearDown (self):
+        for path in [na_schema, na_data]:
+            if (os.path.isfile (path)):
+                os.remove (path)
+
+    def test_na0 (self):
+        print ("NA values case 1: Not normalised by default")
+        self.assertFalse (validation_helper (na_data, na_schema, "TableSchema"))
+
+    def test_na1 (self):
+        print ("NA values case 2: Treated as missing")
+        self.assertTrue (validation_helper (na_data, na_schema, "TableSchema", na_values = NA_VALUES))
+
+    def test_na2 (self):
+        print ("NA values case 3: Only the named columns")
+        loader = CsvStreamLoader (na_data, na_values = NA_VALUES, na_columns = ["count"])
+        self.assertEqual (list (loader.iter_instances ())
+                        , [ { "time": 1, "count": 10, "notes": "ok" }
+                          , { "time": 2, "notes": "NA" }
+                          , { "time": 3 } ])
+        self.assertEqual (loader.na_targets, ["count"])
+
+    def test_na3 (self):
+        print ("NA values case 4: Required column")
+        with open (na_data, "w") as fp:
+            fp.write ("time,count,notes\n1,10,ok\nNA,20,\n")
+        self.assertFalse (validation_helper (na_data, na_schema, "TableSchema", na_values = NA_VALUES))
@@ -0,0 +1,91 @@
+from fisdat.cmd_up     import upload_files
+from fisdat.packing    import PACK, PACK_INDEX, pack_files, small_files, unique_files, unpack
+from fisdat.storage    import open_storage, url_path
+
+from contextlib import redirect_stdout
+import io
+import json
+import logging
+import os
+import tarfile
+import tempfile
+from types import SimpleNamespace
+import unittest
+
+logging_format = "%(levelname)s [%(asctime)s] [`%(filename)s\' `%(funcName)s\' (l.%(lineno)d)] ``%(message)s\'\'"
+logging_level  = logging.DEBUG
+
+def write (name : str, text : str) -> None:
+    with open (name, "w") as fp:
+        fp.write (text)
+
+class TestPacking (unittest.TestCase):
+    '''
+    Case 1: Staging files with repeats and None -> each file once, in order
+    Case 2: Packed archive                      -> member index gives each member's offset and size
+    Case 3: Packed and unpacked                 -> same files, corruption detected
+    Case 4: Upload with packing                 -> small files in one archive, large file on its own
+    Case 5: Dry run with files not written yet  -> nothing uploaded, those files listed as packed
+    '''
+    def setUp (self):
+        self.directory = tempfile.TemporaryDirectory ()
+        self.cwd       = os.getcwd ()
+        os.chdir (self.directory.name)
+        self.bucket    = f"file://{self.directory.name}/bucket"
+        write ("m.yaml", "atomic_name: m\n")
+        write ("s.yaml", "id: s\n")
+        write (".index", "m.yaml\nm.ttl\nbase\nuri")
+        write ("d.csv", "a,b\n" + "1,2\n" * 1000)
+        self.small = ["m.yaml", "s.yaml", ".index"]
+
+    def tearDown (self):
+        os.chdir (self.cwd)
+        self.directory.cleanup ()
+
+    def test_packing0 (self):
+        print ("Packing case 1: Unique staging files")
+        self.assertEqual (unique_files (["m.yaml", None, "s.yaml", "m.yaml", "d.csv", "s.yaml"]), ["m.yaml", "s.yaml", "d.csv"])
+        self.assertEqual (small_files (self.small + ["d.csv"], 1024), self.small)
+
+    def test_packing1 (self):
+        print ("Packing case 2: Member index")
+        data = pack_files (self.small)
+        with tarfile.open (fileobj = io.BytesIO (data), mode = "r") as tar:
+            self.assertEqual (tar.getnames () [-1], PACK_INDEX)
+            index = json.load (tar.extractfile (PACK_INDEX))
+        self.assertEqual (list (index), self.small)
+        for name in self.small:
+            with open (name, "rb") as fp:
+                entry = index [name]
+                self.assertEqual (data [entry ["offset"]:entry ["offset"] + entry ["size"]], fp.read ())
+
+    def test_packing2 (self):
+        print ("Packing case 3: Packed and unpacked")
+        storage = open_storage (self.bucket)
+        data    = pack_files (self.small)
+        storage.write (data, f"a/{PACK}")
+        members = unpack (storage, f"a/{PACK}")
+        for name in self.small:
+            with open (name, "rb") as fp:
+                self.assertEqual (members [name], fp.read ())
+        storage.write (data.replace (b"atomic_name: m", b"atomic_name: n"), f"b/{PACK}")
+        self.assertRaises (ValueError, unpack, storage, f"b/{PACK}")
+        self.assertRaises (FileNotFoundError, unpack, storage, f"c/{PACK}")
+
+    def test_packing3 (self):
+        print ("Packing case 4: Upload with packing")
+        args     = SimpleNamespace (bucket = self.bucket, directory = "packed")
+        (_, url) = upload_files (args, self.small + [None, "d.csv", "s.yaml"], "owner", "20240101", False, pack = 1024)
+        path     = url_path (url, self.bucket)
+        storage  = open_storage (self.bucket)
+        self.assertEqual (sorted (os.listdir (storage.path (path))), sorted ([PACK, "d.csv"]))
+        self.assertEqual (sorted (unpack (storage, f"{path}/{PACK}")), sorted (self.small))
+
+    def test_packing4 (self):
+        print ("Packing case 5: Dry run with files not written yet")
+        args   = SimpleNamespace (bucket = self.bucket, directory = "dry")
+        output = io.StringIO ()
+        with redirect_stdout (output):
+            upload_files (args, self.small + ["missing.ttl", "d.csv"], "owner", "20240101", True, pack = 1024)
+        self.assertIn (f"packing {', '.join (self.small + ['missing.ttl'])}", output.getvalue ())
+        self.assertFalse (os.path.exists (open_storage (self.bucket).path ("owner/20240101/dry")))
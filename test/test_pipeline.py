@@ -0,0 +1,102 @@
+from fisdat.data_model import TableDesc
+from fisdat.pipeline   import Pipeline
+
+import logging
+from pathlib import PurePath
+import threading
+import time
+import unittest
+
+logging_format = "%(levelname)s [%(asctime)s] [`%(filename)s\' `%(funcName)s\' (l.%(lineno)d)] ``%(message)s\'\'"
+logging_level  = logging.DEBUG
+
+def tables (n : int) -> list[TableDesc]:
+    return ([TableDesc (atomic_name = f"d{k}", resource_path = f"d{k}.csv", resource_hash = f"h{k}", schema_path_yaml = "s.yaml") for k in range (n)])
+
+class Record (object):
+    '''
+    Stands in for checking, converting and uploading, recording what was
+    done, taking `delay' seconds for each.
+    '''
+    def __init__ (self, delay : float = 0, bad : tuple = (), broken : tuple = (), slow : tuple = ()) -> None:
+        self.delay     = delay
+        self.bad       = bad
+        self.broken    = broken
+        self.slow      = slow
+        self.lock      = threading.Lock ()
+        self.converted = []
+        self.uploaded  = []
+        self.completed = []
+
+    def check (self, tab : TableDesc) -> tuple[bool, TableDesc]:
+        time.sleep (self.delay + (0.3 if tab.atomic_name in self.slow else 0))
+        return (tab.atomic_name not in self.bad, tab)
+
+    def convert (self, schema_path_yaml : str) -> tuple[bool, PurePath]:
+        with self.lock:
+            self.converted.append (schema_path_yaml)
+        return (True, PurePath (schema_path_yaml).with_suffix (".converted.ttl"))
+
+    def transfer (self, fname : str) -> None:
+        time.sleep (self.delay)
+        if (fname in self.broken):
+            raise OSError ("connection reset")
+        with self.lock:
+            self.uploaded.append (fname)
+
+    def complete (self, tab : TableDesc) -> None:
+        with self.lock:
+            self.completed.append (str (tab.atomic_name))
+
+    def pipeline (self, **kwargs) -> Pipeline:
+        return (Pipeline (self.check, self.convert, self.transfer, self.complete, **kwargs))
+
+class TestPipeline (unittest.TestCase):
+    '''
+    Case 1: Tables checked             -> shared schema converted once, each file uploaded once
+    Case 2: One table's hash invalid   -> that table fails, its files aren't uploaded, nor those of tables checked after
+    Case 3: One upload fails           -> the table it belongs to fails
+    Case 4: Slow checks and uploads    -> overlapped, faster than one after the other
+    Case 5: Last table checked invalid -> tables uploaded before it aren't marked complete
+    '''
+    def test_pipeline0 (self):
+        print ("Pipeline case 1: Tables checked")
+        record = Record ()
+        (signals, results) = record.pipeline ().coalesce_tables (tables (3))
+        self.assertEqual (signals, (True, True, True))
+        self.assertEqual ([str (k.schema_path_ttl) for k in results], ["s.converted.ttl"] * 3)
+        self.assertEqual (record.converted, ["s.yaml"])
+        self.assertEqual (sorted (record.uploaded), ["d0.csv", "d1.csv", "d2.csv", "s.converted.ttl", "s.yaml"])
+        self.assertEqual (sorted (record.completed), ["d0", "d1", "d2"])
+
+    def test_pipeline1 (self):
+        print ("Pipeline case 2: Invalid hash")
+        record = Record (bad = ("d1",))
+        (signals, _) = record.pipeline ().coalesce_tables (tables (3))
+        self.assertFalse (signals [1])
+        self.assertNotIn ("d1.csv", record.uploaded)
+
+    def test_pipeline2 (self):
+        print ("Pipeline case 3: Failed upload")
+        record = Record (broken = ("d2.csv",))
+        (signals, _) = record.pipeline ().coalesce_tables (tables (3))
+        self.assertFalse (signals [2])
+        self.assertNotIn ("d2.csv", record.uploaded)
+
+    def test_pipeline3 (self):
+        print ("Pipeline case 4: Overlapped")
+        record = Record (delay = 0.2)
+        start  = time.time ()
+        (signals, _) = record.pipeline (workers = 1, jobs = 1).coalesce_tables (tables (4))
+        took   = time.time () - start
+        self.assertTrue (all (signals))
+        # 4 checks and 6 uploads, one after the other, would take 2s
+        self.assertLess (took, 1.6)
+
+    def test_pipeline4 (self):
+        print ("Pipeline case 5: Last table checked invalid")
+        record = Record (bad = ("d2",), slow = ("d2",))
+        (signals, _) = record.pipeline ().coalesce_tables (tables (3))
+        self.assertEqual (signals, (False, False, False))
+        self.assertIn ("d0.csv", record.uploaded)
+        self.assertEqual (record.completed, [])
@@ -0,0 +1,189 @@
+from fisdat.projection import projection_helper, scope_columns
+from fisdat.utils      import validation_helper
+
+import logging
+import os
+import tempfile
+import unittest
+
+logging_format = "%(levelname)s [%(asctime)s] [`%(filename)s\' `%(funcName)s\' (l.%(lineno)d)] ``%(message)s\'\'"
+logging_level  = logging.DEBUG
+
+schema_text = """
+id: https://marine.gov.scot/metadata/saved/rap/wide/
+name: wide
+prefixes:
+  linkml: https://w3id.org/linkml/
+imports:
+  - linkml:types
+default_prefix: wide
+default_range: string
+slots:
+  time:
+    range: integer
+    required: true
+  count:
+    range: integer
+  depth:
+    range: float
+  site:
+    range: string
+    required: true
+classes:
+  TableSchema:
+    slots:
+      - time
+      - count
+      - depth
+      - site
+"""
+
+manifest_text = """
+atomic_name: RootManifest
+tables:
+- atomic_name: wide_table
+  resource_path: wide.csv
+  resource_hash: 0
+  schema_path_yaml: wide.yaml
+jobs:
+- atomic_name: job_wide
+  job_type: density
+  title: Job using two columns
+  job_scope_collected:
+  - column: count
+    variable: saved:lice_af_total
+    table: wide_table
+  job_scope_modelled:
+  - column: time
+    variable: saved:time
+    table: wide_table
+  - column: density
+    variable: saved:density
+    table: other_table
+"""
+
+## `schema_text' with its slots in a file of their own, imported relative to it
+split_text = """
+id: https://marine.gov.scot/metadata/saved/rap/wide/
+name: wide
+prefixes:
+  linkml: https://w3id.org/linkml/
+imports:
+  - linkml:types
+  - parts/wide_slots
+default_prefix: wide
+default_range: string
+classes:
+  TableSchema:
+    slots:
+      - time
+      - count
+      - depth
+      - site
+"""
+
+slots_text = """
+id: https://marine.gov.scot/metadata/saved/rap/wide_slots/
+name: wide_slots
+prefixes:
+  linkml: https://w3id.org/linkml/
+imports:
+  - linkml:types
+default_prefix: wide
+default_range: string
+slots:
+  time:
+    range: integer
+    required: true
+  count:
+    range: integer
+  depth:
+    range: float
+  site:
+    range: string
+    required: true
+"""
+
+wide_schema   = "/tmp/wide.yaml"
+wide_data     = "/tmp/wide.csv"
+wide_manifest = "/tmp/wide_manifest.yaml"
+
+class TestProjection (unittest.TestCase):
+    '''
+    Case 1: Columns used by jobs read from the manifest
+    Case 2: Bad value in a column not used by jobs           -> True
+    Case 3: Bad value in a column used by jobs               -> False
+    Case 4: Row with more fields than the header             -> True, as validating all columns
+    Case 5: Empty required column not used by jobs           -> False
+    Case 6: Row short of a trailing optional column          -> False, as validating all columns
+    Case 7: Row short of a trailing required column          -> False, as validating all columns
+    Case 8: Schema importing a file relative to itself       -> True, the pruned copy still finds it
+    '''
+    def setUp (self):
+        with open (wide_schema, "w") as fp:
+            fp.write (schema_text)
+        with open (wide_manifest, "w") as fp:
+            fp.write (manifest_text)
+
+    def tearDown (self):
+        for path in [wide_schema, wide_data, wide_manifest]:
+            if (os.path.isfile (path)):
+                os.remove (path)
+
+    def write_data (self, rows, header = "time,count,depth,site"):
+        with open (wide_data, "w") as fp:
+            fp.write (f"{header}\n" + "".join (f"{r}\n" for r in rows))
+
+    def validate (self):
+        return (projection_helper (wide_data, wide_schema, "TableSchema", scope_columns (wide_data, wide_manifest)))
+
+    def test_projection0 (self):
+        print ("Projection case 1: Columns used by jobs")
+        self.assertEqual (scope_columns (wide_data, wide_manifest), ["count", "time"])
+
+    def test_projection1 (self):
+        print ("Projection case 2: Bad value outwith the projection")
+        self.write_data (["1,10,2.5,a", "2,20,deep,b"])
+        self.assertTrue (self.validate ())
+        self.assertEqual ([k for k in os.listdir (tempfile.gettempdir ()) if ".projected." in k], [])
+
+    def test_projection2 (self):
+        print ("Projection case 3: Bad value within the projection")
+        self.write_data (["1,10,2.5,a", "2,twenty,2.5,b"])
+        self.assertFalse (self.validate ())
+
+    def test_projection3 (self):
+        print ("Projection case 4: Too many fields")
+        self.write_data (["1,10,2.5,a", "2,20,2.5,b,c"])
+        self.assertTrue (validation_helper (wide_data, wide_schema, "TableSchema"))
+        self.assertTrue (self.validate ())
+
+    def test_projection4 (self):
+        print ("Projection case 5: Empty required column")
+        self.write_data (["1,10,2.5,a", "2,20,2.5,"])
+        self.assertFalse (self.validate ())
+
+    def test_projection5 (self):
+        print ("Projection case 6: Short of an optional column")
+        self.write_data (["a,1,10,2.5", "b,2,20"], header = "site,time,count,depth")
+        self.assertFalse (validation_helper (wide_data, wide_schema, "TableSchema"))
+        self.assertFalse (self.validate ())
+
+    def test_projection6 (self):
+        print ("Projection case 7: Short of a required column")
+        self.write_data (["1,10,2.5,a", "2,20,2.5"])
+        self.assertFalse (validation_helper (wide_data, wide_schema, "TableSchema"))
+        self.assertFalse (self.validate ())
+
+    def test_projection7 (self):
+        print ("Projection case 8: Relative import")
+        self.write_data (["1,10,2.5,a", "2,20,deep,b"])
+        with tempfile.TemporaryDirectory () as directory:
+            os.mkdir (os.path.join (directory, "parts"))
+            schema = os.path.join (directory, "wide.yaml")
+            with open (schema, "w") as fp:
+                fp.write (split_text)
+            with open (os.path.join (directory, "parts", "wide_slots.yaml"), "w") as fp:
+                fp.write (slots_text)
+            self.assertTrue (projection_helper (wide_data, schema, "TableSchema", scope_columns (wide_data, wide_manifest)))
+            self.assertEqual (sorted (os.listdir (directory)), ["parts", "wide.yaml"])
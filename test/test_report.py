@@ -0,0 +1,102 @@
+from fisdat.utils import validation_helper
+
+import json
+import logging
+import os
+import unittest
+
+logging_format = "%(levelname)s [%(asctime)s] [`%(filename)s\' `%(funcName)s\' (l.%(lineno)d)] ``%(message)s\'\'"
+logging_level  = logging.DEBUG
+
+schema_text = """
+id: https://marine.gov.scot/metadata/saved/rap/report/
+name: report
+prefixes:
+  linkml: https://w3id.org/linkml/
+imports:
+  - linkml:types
+default_prefix: report
+default_range: string
+slots:
+  time:
+    range: integer
+    required: true
+  count:
+    range: integer
+classes:
+  TableSchema:
+    slots:
+      - time
+      - count
+"""
+
+report_schema = "/tmp/report.yaml"
+report_data   = "/tmp/report.csv"
+report_json   = "/tmp/report.json"
+
+class TestReport (unittest.TestCase):
+    '''
+    Case 1: All errors collected in one pass, with positions, grouped by kind
+    Case 2: Error budget stops validation early
+    Case 3: Known-good data writes an empty report -> True
+    Case 4: Error budget of zero or less           -> first error still recorded, False
+    '''
+    def setUp (self):
+        with open (report_schema, "w") as fp:
+            fp.write (schema_text)
+        with open (report_data, "w") as fp:
+            fp.write ("time,count\n1,10\ntwo,20\n3,thirty\n,40\n5,fifty\n")
+
+    def tearDown (self):
+        for path in [report_schema, report_data, report_json]:
+            if (os.path.isfile (path)):
+                os.remove (path)
+
+    def load_report (self):
+        with open (report_json, "r") as fp:
+            return (json.load (fp))
+
+    def test_report0 (self):
+        print ("Validation report case 1: Collect all errors")
+        test   = validation_helper (report_data, report_schema, "TableSchema", max_errors = 100, report_path = report_json)
+        report = self.load_report ()
+        kinds  = report ["kinds"]
+
+        self.assertFalse (test)
+        self.assertEqual (report ["error_count"], 4)
+        self.assertFalse (report ["truncated"])
+        self.assertEqual (kinds ["type"]["columns"], { "time": 1, "count": 2 })
+        self.assertEqual (kinds ["required"]["columns"], { "time": 1 })
+
+        [first] = [e for e in kinds ["type"]["errors"] if e ["row"] == 2]
+        self.assertEqual (first ["column"], "time")
+        self.assertEqual (first ["byte_offset"], len ("time,count\n1,10\n"))
+
+    def test_report1 (self):
+        print ("Validation report case 2: Error budget")
+        test   = validation_helper (report_data, report_schema, "TableSchema", max_errors = 2, report_path = report_json)
+        report = self.load_report ()
+
+        self.assertFalse (test)
+        self.assertEqual (report ["error_count"], 2)
+        self.assertTrue (report ["truncated"])
+        self.assertEqual (report ["rows_checked"], 4)
+
+    def test_report2 (self):
+        print ("Validation report case 3: Known-good data")
+        with open (report_data, "w") as fp:
+            fp.write ("time,count\n1,10\n2,20\n")
+        test = validation_helper (report_data, report_schema, "TableSchema", max_errors = 100, report_path = report_json)
+
+        self.assertTrue (test)
+        self.assertEqual (self.load_report () ["error_count"], 0)
+
+    def test_report3 (self):
+        print ("Validation report case 4: No error budget")
+        for budget in [0, -1]:
+            test   = validation_helper (report_data, report_schema, "TableSchema", max_errors = budget, report_path = report_json)
+            report = self.load_report ()
+
+            self.assertFalse (test)
+            self.assertEqual (report ["error_count"], 1)
+            self.assertTrue (report ["truncated"])
@@ -0,0 +1,74 @@
+from fisdat.sketch import KLL, HyperLogLog
+from fisdat.stats  import TableStats, merge_stats, write_stats
+
+import logging
+import os
+import random
+import tempfile
+import unittest
+
+logging_format = "%(levelname)s [%(asctime)s] [`%(filename)s\' `%(funcName)s\' (l.%(lineno)d)] ``%(message)s\'\'"
+logging_level  = logging.DEBUG
+
+def rank_error (numbers : list[float], value : float, fraction : float) -> float:
+    return (abs (sum (1 for k in numbers if k < value) / len (numbers) - fraction))
+
+class TestSketch (unittest.TestCase):
+    '''
+    Case 1: Distinct values, with repeats        -> estimate within a few percent
+    Case 2: Overlapping parts merged             -> estimate of the union, same as one sketch
+    Case 3: Numbers in batches, parts merged     -> quantiles within the rank error, bounded size
+    Case 4: Sidecars of row ranges merged        -> counts and sketches of the whole table
+    '''
+    def test_sketch0 (self):
+        print ("Sketch case 1: Distinct values")
+        sketch = HyperLogLog ()
+        sketch.update (k % 50000 for k in range (200000))
+        self.assertLess (abs (sketch.estimate () - 50000) / 50000, 0.05)
+        small = HyperLogLog ()
+        small.update (["a", "b", "c", "a"])
+        self.assertEqual (small.estimate (), 3)
+
+    def test_sketch1 (self):
+        print ("Sketch case 2: Merged distinct values")
+        (first, second, whole) = (HyperLogLog (), HyperLogLog (), HyperLogLog ())
+        first.update (range (0, 60000))
+        second.update (range (40000, 100000))
+        whole.update (range (0, 100000))
+        first.merge (second)
+        self.assertEqual (first.registers, whole.registers)
+        self.assertEqual (HyperLogLog.from_dict (first.to_dict ()).estimate (), whole.estimate ())
+
+    def test_sketch2 (self):
+        print ("Sketch case 3: Quantiles")
+        rng     = random.Random (1)
+        numbers = [rng.gauss (0, 1) for _ in range (100000)]
+        (first, second) = (KLL (), KLL ())
+        for k in range (0, 60000, 7000):
+            first.update (numbers [k : min (k + 7000, 60000)])
+        second.update (numbers [60000:])
+        first.merge (KLL.from_dict (second.to_dict ()))
+        self.assertEqual (first.count (), len (numbers))
+        self.assertLess (first.size (), 1000)
+        fractions = [0.01, 0.25, 0.5, 0.75, 0.99]
+        for (fraction, value) in zip (fractions, first.quantiles (fractions)):
+            self.assertLess (rank_error (numbers, value, fraction), 0.02)
+
+    def test_sketch3 (self):
+        print ("Sketch case 4: Sidecars merged")
+        rows  = [{ "site": f"site{k % 300}", "count": k % 97 } for k in range (6000)]
+        parts = [TableStats () for _ in range (3)]
+        for (n, row) in enumerate (rows):
+            parts [n * 3 // len (rows)].add (row)
+        with tempfile.TemporaryDirectory () as directory:
+            paths = []
+            for (n, part) in enumerate (parts):
+                write_stats (os.path.join (directory, f"part{n}.csv"), part, f"hash{n}")
+                paths.append (os.path.join (directory, f"part{n}.csv.stats.json"))
+            merged = merge_stats (paths)
+            self.assertIsNone (merge_stats (paths + [os.path.join (directory, "missing.json")]))
+        columns = merged.to_dict () ["columns"]
+        self.assertEqual (merged.rows, len (rows))
+        self.assertLess (abs (columns ["site"] ["approx_distinct"] - 300), 10)
+        self.assertLess (abs (columns ["count"] ["approx_distinct"] - 97), 5)
+        self.assertEqual (columns ["count"] ["quantiles"] ["0.5"], 48)
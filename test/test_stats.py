@@ -0,0 +1,103 @@
+from fisdat.commit     import table_objects
+from fisdat.data_model import TableDesc
+from fisdat.stats      import ColumnStats, TableStats, read_stats, stats_path, table_sidecar, table_stats, write_stats
+from fisdat.stream     import CsvStreamLoader
+import fisdat.stats
+
+import logging
+import os
+from statistics import mean, variance
+import tempfile
+import unittest
+
+logging_format = "%(levelname)s [%(asctime)s] [`%(filename)s\' `%(funcName)s\' (l.%(lineno)d)] ``%(message)s\'\'"
+logging_level  = logging.DEBUG
+
+data = "examples/sentinel_cages/sentinel_cages_cleaned.csv"
+
+class TestStats (unittest.TestCase):
+    '''
+    Case 1: Rows in batches, parts merged -> same count, range, mean and variance as computed in one go
+    Case 2: Missing values and columns    -> counted as nulls, other values counted as categories
+    Case 3: Too many distinct values      -> counters kept within bounds, top values not exact
+    Case 4: Sidecar written and read back -> hash of the data, same statistics once merged
+    Case 5: Sidecar of a table            -> found by the data file's name if its hash matches, uploaded with the table
+    '''
+    def setUp (self):
+        self.batch = fisdat.stats.BATCH
+        self.limit = fisdat.stats.CATEGORY_LIMIT
+
+    def tearDown (self):
+        fisdat.stats.BATCH          = self.batch
+        fisdat.stats.CATEGORY_LIMIT = self.limit
+
+    def test_stats0 (self):
+        print ("Stats case 1: Batches and merges")
+        fisdat.stats.BATCH = 7
+        values = [((k * 37) % 101) / 3 for k in range (100)]
+        (first, second) = (TableStats (), TableStats ())
+        for (n, k) in enumerate (values):
+            (first if n < 45 else second).add ({ "x": k })
+        first.merge (second)
+        column = first.to_dict () ["columns"] ["x"]
+        self.assertEqual ((first.rows, column ["count"], column ["min"], column ["max"]), (100, 100, min (values), max (values)))
+        self.assertAlmostEqual (column ["mean"], mean (values))
+        self.assertAlmostEqual (column ["variance"], variance (values))
+
+    def test_stats1 (self):
+        print ("Stats case 2: Missing values")
+        stats = TableStats ()
+        for instance in [{ "x": 1, "y": "a" }, { "x": float ("nan"), "y": "b" }, { "y": "a" }]:
+            stats.add (instance)
+        stats.flush (["x", "y", "z"])
+        columns = stats.to_dict () ["columns"]
+        self.assertEqual ((columns ["x"] ["count"], columns ["x"] ["nulls"], columns ["x"] ["numbers"]), (2, 1, 1))
+        self.assertEqual ((columns ["y"] ["top"], columns ["y"] ["top_exact"]), ([["a", 2], ["b", 1]], True))
+        self.assertEqual ((columns ["z"] ["count"], columns ["z"] ["nulls"]), (0, 3))
+
+    def test_stats2 (self):
+        print ("Stats case 3: Too many distinct values")
+        fisdat.stats.CATEGORY_LIMIT = 5
+        column = ColumnStats ()
+        column.update (["common"] * 50 + [f"rare{k}" for k in range (20)], 70)
+        entry = column.to_dict ()
+        self.assertLessEqual (len (column.categories), 5)
+        self.assertEqual (entry ["top"] [0] [0], "common")
+        self.assertFalse (entry ["top_exact"])
+
+    def test_stats3 (self):
+        print ("Stats case 4: Sidecar")
+        with tempfile.TemporaryDirectory () as directory:
+            target = os.path.join (directory, "data.csv")
+            with open (data, "rb") as fp, open (target, "wb") as copy:
+                copy.write (fp.read ())
+            stats = table_stats (target)
+            name  = write_stats (target, stats, "hash")
+            entry = read_stats (stats_path (target))
+        self.assertEqual (name, "data.csv.stats.json")
+        self.assertEqual ((entry ["file"], entry ["resource_hash"]), ("data.csv", "hash"))
+        self.assertEqual (entry ["rows"], len (list (CsvStreamLoader (data).iter_instances ())))
+        merged = TableStats.from_dict (entry)
+        merged.merge (TableStats.from_dict (entry))
+        self.assertEqual (merged.rows, 2 * entry ["rows"])
+        for (name, column) in entry ["columns"].items ():
+            self.assertEqual (merged.to_dict () ["columns"] [name] ["count"], 2 * column ["count"])
+            if ("mean" in column):
+                self.assertAlmostEqual (merged.to_dict () ["columns"] [name] ["mean"], column ["mean"])
+
+    def test_stats4 (self):
+        print ("Stats case 5: Sidecar of a table")
+        with tempfile.TemporaryDirectory () as directory:
+            target = os.path.join (directory, "data.csv")
+            table  = TableDesc (atomic_name = "data", resource_path = "data.csv", resource_hash = "hash", schema_path_yaml = "s.yaml")
+            self.assertIsNone (table_sidecar (table, f"{directory}/"))
+            write_stats (target, TableStats (), "other")
+            self.assertIsNone (table_sidecar (table, f"{directory}/"))
+            write_stats (target, TableStats (), "hash")
+            self.assertEqual (table_sidecar (table, f"{directory}/"), "data.csv.stats.json")
+            cwd = os.getcwd ()
+            os.chdir (directory)
+            try:
+                self.assertEqual (table_objects (table), ["data.csv", "s.yaml", "data.csv.stats.json"])
+            finally:
+                os.chdir (cwd)
@@ -0,0 +1,129 @@
+from fisdat.cmd_up     import upload_files
+from fisdat.commit     import read_marker
+from fisdat.data_model import JobDesc, ManifestDesc, ScopeDesc, TableDesc
+from fisdat.delta      import reuse_plan
+from fisdat.storage    import LocalStorage, Storage, local_digest, open_storage, url_path
+
+from linkml_runtime.dumpers import YAMLDumper
+
+import logging
+import os
+import tempfile
+from types import SimpleNamespace
+import unittest
+
+logging_format = "%(levelname)s [%(asctime)s] [`%(filename)s\' `%(funcName)s\' (l.%(lineno)d)] ``%(message)s\'\'"
+logging_level  = logging.DEBUG
+
+def write (name : str, text : str) -> None:
+    with open (name, "w") as fp:
+        fp.write (text)
+
+def write_manifest (hashes : list[str]) -> None:
+    tables = [TableDesc (atomic_name = f"d{k}", resource_path = f"d{k}.csv", resource_hash = h, schema_path_yaml = "s.yaml") for (k, h) in enumerate (hashes)]
+    jobs   = [JobDesc (atomic_name = "job", job_type = "ignore", job_scope_descriptive = [ScopeDesc (column = "a", variable = "count", table = "d0")])]
+    YAMLDumper ().dump (ManifestDesc (atomic_name = "RootManifest", tables = tables, jobs = jobs), "m.converted.yaml")
+    write (".index", "m.converted.yaml\nm.ttl\nbase\nuri")
+
+class TestStorage (unittest.TestCase):
+    '''
+    Case 1: Local storage          -> upload, copy, read and digest objects, no storage without them all
+    Case 2: Bundle URLs            -> path within the bucket, whatever its depth
+    Case 3: One table changed      -> other table and schema copied from earlier bundle
+    Case 4: No earlier bundle      -> everything uploaded
+    Case 5: Earlier bundle chunked -> chunk index copied in place of the data file, marker lists it
+    Case 6: Earlier bundle packed  -> packed files uploaded again
+    '''
+    def setUp (self):
+        self.directory = tempfile.TemporaryDirectory ()
+        self.cwd       = os.getcwd ()
+        os.chdir (self.directory.name)
+        self.bucket    = f"file://{self.directory.name}/bucket"
+        write ("d0.csv", "a,b\n1,2\n")
+        write ("d1.csv", "a,b\n3,4\n")
+        write ("s.yaml", "id: s\n")
+        self.files     = ["d0.csv", "d1.csv", "s.yaml"]
+
+    def tearDown (self):
+        os.chdir (self.cwd)
+        self.directory.cleanup ()
+
+    def upload (self, directory : str, reuse : dict = None, **options) -> str:
+        args = SimpleNamespace (bucket = self.bucket, directory = directory)
+        (_, url) = upload_files (args, ["m.converted.yaml", ".index"] + self.files, "owner", "20240101", False, reuse, **options)
+        return (url)
+
+    def tables (self) -> SimpleNamespace:
+        return (SimpleNamespace (tables = [TableDesc (atomic_name = f"d{k}", resource_path = f"d{k}.csv", resource_hash = f"h{k}", schema_path_yaml = "s.yaml") for k in range (2)]))
+
+    def test_storage0 (self):
+        print ("Storage case 1: Local storage")
+        storage = open_storage (self.bucket)
+        self.assertIsInstance (storage, LocalStorage)
+        storage.upload ("d0.csv", "a/d0.csv")
+        storage.copy ("a/d0.csv", "b/d0.csv")
+        self.assertEqual (storage.read ("b/d0.csv"), b"a,b\n1,2\n")
+        self.assertEqual (storage.digest ("b/d0.csv"), local_digest ("d0.csv"))
+        self.assertIsNone (storage.read ("c/d0.csv"))
+        self.assertIsNone (storage.digest ("c/d0.csv"))
+        self.assertRaises (TypeError, Storage)
+
+    def test_storage1 (self):
+        print ("Storage case 2: Bundle URLs")
+        self.assertEqual (url_path ("gs://saved-fisdat/owner/20240101/uuid", "saved-fisdat"), "owner/20240101/uuid")
+        self.assertEqual (url_path (f"{self.bucket}/owner/20240101/uuid/", self.bucket), "owner/20240101/uuid")
+        self.assertEqual (url_path (f"{self.bucket}/owner/20240101/team/run", self.bucket), "owner/20240101/team/run")
+        self.assertIsNone (url_path ("gs://other/owner/20240101/uuid", "saved-fisdat"))
+        self.assertIsNone (url_path ("gs://saved-fisdat-old/owner/20240101/uuid", "saved-fisdat"))
+
+    def test_storage2 (self):
+        print ("Storage case 3: Delta bundle")
+        write_manifest (["h0", "h1"])
+        path = url_path (self.upload ("team/first"), self.bucket)
+        self.assertIsNotNone (path)
+
+        write ("d1.csv", "a,b\n5,6\n")
+        write_manifest (["h0", "h1 changed"])
+        manifest = SimpleNamespace (tables = [TableDesc (atomic_name = "d0", resource_path = "d0.csv", resource_hash = "h0", schema_path_yaml = "s.yaml")
+                                            , TableDesc (atomic_name = "d1", resource_path = "d1.csv", resource_hash = "h1 changed", schema_path_yaml = "s.yaml")])
+        storage  = open_storage (self.bucket)
+        reuse    = reuse_plan (storage, path, ".index", manifest, self.files)
+        self.assertEqual (reuse, { "d0.csv": f"{path}/d0.csv", "s.yaml": f"{path}/s.yaml" })
+
+        second = url_path (self.upload ("second", reuse), self.bucket)
+        for name in self.files:
+            self.assertEqual (storage.digest (f"{second}/{name}"), local_digest (name))
+
+    def test_storage3 (self):
+        print ("Storage case 4: No earlier bundle")
+        write_manifest (["h0", "h1"])
+        manifest = SimpleNamespace (tables = [])
+        self.assertEqual (reuse_plan (open_storage (self.bucket), "owner/20240101/none", ".index", manifest, self.files), {})
+
+    def test_storage4 (self):
+        print ("Storage case 5: Earlier bundle chunked")
+        write_manifest (["h0", "h1"])
+        storage = open_storage (self.bucket)
+        path    = url_path (self.upload ("first", chunked = ["d0.csv"]), self.bucket)
+        reuse   = reuse_plan (storage, path, ".index", self.tables (), self.files)
+        self.assertEqual (reuse, { "d0.csv": f"{path}/d0.csv.chunks", "d1.csv": f"{path}/d1.csv", "s.yaml": f"{path}/s.yaml" })
+
+        second = url_path (self.upload ("second", reuse, tables = self.tables ().tables), self.bucket)
+        self.assertEqual (storage.read (f"{second}/d0.csv.chunks"), storage.read (f"{path}/d0.csv.chunks"))
+        self.assertIsNone (storage.digest (f"{second}/d0.csv"))
+        self.assertEqual (read_marker (storage, second, "d0") ["objects"] [0], "d0.csv.chunks")
+        self.assertEqual (read_marker (storage, second, "d1") ["objects"] [0], "d1.csv")
+
+    def test_storage5 (self):
+        print ("Storage case 6: Earlier bundle packed")
+        write_manifest (["h0", "h1"])
+        storage = open_storage (self.bucket)
+        # The data files and schema are packed, the manifest and index aren't
+        path    = url_path (self.upload ("first", pack = 16), self.bucket)
+        self.assertIsNone (storage.digest (f"{path}/d0.csv"))
+        reuse   = reuse_plan (storage, path, ".index", self.tables (), self.files)
+        self.assertEqual (reuse, {})
+
+        second = url_path (self.upload ("second", reuse), self.bucket)
+        for name in self.files:
+            self.assertEqual (storage.digest (f"{second}/{name}"), local_digest (name))
@@ -0,0 +1,108 @@
+from fisdat.stream import CsvSampleLoader
+from fisdat.tiered import fast_fail_helper, header_check, schema_slots
+
+import logging
+import os
+import unittest
+
+logging_format = "%(levelname)s [%(asctime)s] [`%(filename)s\' `%(funcName)s\' (l.%(lineno)d)] ``%(message)s\'\'"
+logging_level  = logging.DEBUG
+
+data0 = "examples/sentinel_cages/sentinel_cages_cleaned.csv"
+
+schema_text = """
+id: https://marine.gov.scot/metadata/saved/rap/tiered/
+name: tiered
+prefixes:
+  linkml: https://w3id.org/linkml/
+imports:
+  - linkml:types
+default_prefix: tiered
+default_range: string
+slots:
+  time:
+    range: integer
+    required: true
+  count:
+    range: integer
+  notes:
+    range: string
+classes:
+  TableSchema:
+    slots:
+      - time
+      - count
+      - notes
+"""
+
+tiered_schema = "/tmp/tiered.yaml"
+tiered_data   = "/tmp/tiered.csv"
+tiered_tsv    = "/tmp/tiered.tsv"
+
+class TestTiered (unittest.TestCase):
+    '''
+    Case 1: Slots and required slots read from the schema file alone
+    Case 2: Known-good header and rows                   -> True
+    Case 3: Unknown column in header                     -> False
+    Case 4: Required column missing from header          -> False
+    Case 5: Bad value in the first rows caught by sample -> False
+    Case 6: Sample is stratified, and includes the first rows
+    Case 7: TSV data file                                -> True, left to the full pass
+    '''
+    def setUp (self):
+        with open (tiered_schema, "w") as fp:
+            fp.write (schema_text)
+
+    def tearDown (self):
+        for path in [tiered_schema, tiered_data, tiered_tsv]:
+            if (os.path.isfile (path)):
+                os.remove (path)
+
+    def write_data (self, header, rows):
+        with open (tiered_data, "w") as fp:
+            fp.write (header + "\n")
+            for row in rows:
+                fp.write (row + "\n")
+
+    def test_tiered0 (self):
+        print ("Tiered validation case 1: Schema slots")
+        (names, required) = schema_slots (tiered_schema, "TableSchema")
+        self.assertEqual (names, ["time", "count", "notes"])
+        self.assertEqual (required, ["time"])
+
+    def test_tiered1 (self):
+        print ("Tiered validation case 2: Known-good data")
+        self.write_data ("time,count,notes", [f"{k},{k * 10},fine" for k in range (1000)])
+        self.assertTrue (fast_fail_helper (tiered_data, tiered_schema, "TableSchema", rows = 100, seed = 0))
+
+    def test_tiered2 (self):
+        print ("Tiered validation case 3: Unknown column")
+        self.write_data ("time,count,colour", ["1,10,red"])
+        self.assertFalse (header_check (tiered_data, tiered_schema, "TableSchema"))
+
+    def test_tiered3 (self):
+        print ("Tiered validation case 4: Missing required column")
+        self.write_data ("count,notes", ["10,fine"])
+        self.assertFalse (header_check (tiered_data, tiered_schema, "TableSchema"))
+
+    def test_tiered4 (self):
+        print ("Tiered validation case 5: Bad value in the first rows")
+        self.write_data ("time,count,notes", ["one,10,bad"] + [f"{k},{k * 10},fine" for k in range (1000)])
+        self.assertFalse (fast_fail_helper (tiered_data, tiered_schema, "TableSchema", rows = 100, seed = 0))
+
+    def test_tiered5 (self):
+        print ("Tiered validation case 6: Stratified sample")
+        loader    = CsvSampleLoader (data0, rows = 100, strata = 10, seed = 0)
+        instances = list (loader.iter_instances ())
+        begins    = [begin for (begin, _) in loader.offsets]
+        size      = os.path.getsize (data0)
+
+        self.assertEqual (len (instances), 100)
+        self.assertEqual (len (set (begins)), 100)
+        self.assertTrue (min (begins) < size / 10 and max (begins) > size * 9 / 10)
+
+    def test_tiered6 (self):
+        print ("Tiered validation case 7: TSV data file")
+        with open (tiered_tsv, "w") as fp:
+            fp.write ("time\tcount\tnotes\n1\t10\tfine\n")
+        self.assertTrue (fast_fail_helper (tiered_tsv, tiered_schema, "TableSchema", rows = 100, seed = 0))
@@ -0,0 +1,138 @@
+from fisdat.data_model import JobDesc, ManifestDesc, ScopeDesc, TableDesc
+from fisdat.turtle     import TurtleReader, TurtleWriter, turtle_loader
+
+from linkml_runtime.dumpers          import RDFLibDumper
+from linkml_runtime.loaders          import RDFLibLoader
+from linkml_runtime.utils.schemaview import SchemaView
+
+import logging
+import os
+import rdflib
+from rdflib.compare import isomorphic
+import tempfile
+import unittest
+
+logging_format = "%(levelname)s [%(asctime)s] [`%(filename)s\' `%(funcName)s\' (l.%(lineno)d)] ``%(message)s\'\'"
+logging_level  = logging.DEBUG
+
+data_model_uri = "https://marine.gov.scot/metadata/saved/schema/meta.yaml"
+
+prefixes = { "_base": "https://marine.gov.scot/metadata/saved/rap/"
+           , "rap"  : "https://marine.gov.scot/metadata/saved/rap/"
+           , "saved": "https://marine.gov.scot/metadata/saved/schema/" }
+
+def make_manifest (table : str = "d0") -> ManifestDesc:
+    return (ManifestDesc (atomic_name   = "RootManifest"
+                        , gcp_source    = "a@b.c"
+                        , local_version = "0.7"
+                        , tables        = [TableDesc (atomic_name      = table
+                                                    , resource_path    = "sub/d0.csv"
+                                                    , resource_hash    = "h"
+                                                    , schema_path_yaml = "s.yaml"
+                                                    , schema_path_ttl  = "s.ttl"
+                                                    , title            = "A \"q\"\nline"
+                                                    , description      = "x\\y")]
+                        , jobs          = [JobDesc (atomic_name           = "j"
+                                                  , job_type              = "ignore"
+                                                  , job_scope_descriptive = [ScopeDesc (column = "c", variable = "count", table = "d0")
+                                                                           , ScopeDesc (column = "c2", variable = "saved:time", table = "rap:d0")])]))
+
+def dumped_ttl (manifest : ManifestDesc) -> str:
+    # a fresh view each time: the dumper leaves the prefixes it was given in the view's namespaces
+    return (RDFLibDumper ().dumps (manifest, schemaview = SchemaView (data_model_uri), prefix_map = prefixes))
+
+def graph (text : str) -> rdflib.Graph:
+    return (rdflib.Graph ().parse (data = text, format = "turtle"))
+
+class TestTurtleWriter (unittest.TestCase):
+    '''
+    Case 1: Manifest                         -> same graph as RDFLibDumper
+    Case 2: Names given as CURIEs            -> same graph as RDFLibDumper with plain names
+    Case 3: Layout fast appends rely on      -> @base first, prefixes declared
+    Case 4: Name which can't be an IRI       -> ValueError
+    '''
+    def test_turtle0 (self):
+        print ("Turtle writer case 1: Same graph as RDFLibDumper")
+        written = graph (TurtleWriter (prefixes).dumps (make_manifest ()))
+        self.assertTrue (isomorphic (written, graph (dumped_ttl (make_manifest ()))))
+
+    def test_turtle1 (self):
+        print ("Turtle writer case 2: CURIEs")
+        written = graph (TurtleWriter (prefixes).dumps (make_manifest ("rap:d0")))
+        self.assertTrue (isomorphic (written, graph (dumped_ttl (make_manifest ()))))
+
+    def test_turtle2 (self):
+        print ("Turtle writer case 3: Layout")
+        text = TurtleWriter (prefixes).dumps (make_manifest ())
+        self.assertTrue (text.startswith ("@base <https://marine.gov.scot/metadata/saved/rap/> .\n"))
+        for k in ["dcterms", "saved", "xsd"]:
+            self.assertIn (f"\n@prefix {k}: ", text)
+        self.assertIn ("<RootManifest> a saved:ManifestDesc ;", text)
+
+    def test_turtle3 (self):
+        print ("Turtle writer case 4: Bad name")
+        with self.assertRaises (ValueError):
+            TurtleWriter (prefixes).dumps (make_manifest ("d 0"))
+
+def loaded (text : str) -> ManifestDesc:
+    # as `RDFLibLoader' reads it, the scopes in a fixed order since blank nodes have none
+    manifest = RDFLibLoader ().load (graph (text), ManifestDesc, schemaview = SchemaView (data_model_uri))
+    return (scopes_sorted (manifest))
+
+def scopes_sorted (manifest : ManifestDesc) -> ManifestDesc:
+    for job in manifest.jobs:
+        job.job_scope_descriptive.sort (key = lambda k : k.column)
+    return (manifest)
+
+class TestTurtleReader (unittest.TestCase):
+    '''
+    Case 1: Manifest written by RDFLibDumper   -> same as RDFLibLoader reads from it
+    Case 2: Manifest written by TurtleWriter   -> same
+    Case 3: Manifest as N-Triples              -> same
+    Case 4: Predicate which isn't a slot       -> ValueError
+    Case 5: Literal which isn't a string       -> ValueError
+    Case 6: Two values for a single value slot -> ValueError
+    Case 7: File which can't be read directly  -> loader falls back, same as RDFLibLoader reads from it
+    '''
+    @classmethod
+    def setUpClass (cls):
+        cls.dumped = dumped_ttl (make_manifest ())
+
+    def test_reader0 (self):
+        print ("Turtle reader case 1: RDFLibDumper output")
+        self.assertEqual (scopes_sorted (TurtleReader (self.dumped).manifest ()), loaded (self.dumped))
+
+    def test_reader1 (self):
+        print ("Turtle reader case 2: TurtleWriter output")
+        text = TurtleWriter (prefixes).dumps (make_manifest ())
+        self.assertEqual (scopes_sorted (TurtleReader (text).manifest ()), loaded (text))
+
+    def test_reader2 (self):
+        print ("Turtle reader case 3: N-Triples")
+        text = graph (self.dumped).serialize (format = "nt")
+        self.assertEqual (scopes_sorted (TurtleReader (text).manifest ()), loaded (text))
+
+    def test_reader3 (self):
+        print ("Turtle reader case 4: Unknown predicate")
+        with self.assertRaises (ValueError):
+            TurtleReader (self.dumped.replace ("saved:resource_hash", "saved:resource_hush")).manifest ()
+
+    def test_reader4 (self):
+        print ("Turtle reader case 5: Numeric literal")
+        with self.assertRaises (ValueError):
+            TurtleReader (self.dumped.replace ('"0.7"', "0.7")).manifest ()
+
+    def test_reader5 (self):
+        print ("Turtle reader case 6: Two values for a single value slot")
+        with self.assertRaises (ValueError):
+            TurtleReader (self.dumped.replace ('saved:resource_hash "h"', 'saved:resource_hash "h", "i"')).manifest ()
+
+    def test_reader6 (self):
+        print ("Turtle reader case 7: Fallback")
+        text = self.dumped.replace ('"0.7"', "0.7")
+        with tempfile.TemporaryDirectory () as directory:
+            source = os.path.join (directory, "manifest.ttl")
+            with open (source, "w") as fp:
+                fp.write (text)
+            manifest = turtle_loader (source, SchemaView (data_model_uri))
+        self.assertEqual (scopes_sorted (manifest), loaded (text))
@@ -110,7 +110,7 @@ class TestMisc (unittest.TestCase):
           , schema       = schema0
           , target_class = "TableMiscellanea"
         )
-        self.assertFalse (test)
+        self.assertIs (test, False)
             
     '''
     Extension helper case 1: "/etc/netstart.sh" -> "sh"